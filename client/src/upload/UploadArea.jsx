@@ -3,6 +3,9 @@ import React, { useState, useRef } from 'react';
 import documentService from '../services/documentService';
 import eventBus from '../services/eventService';
 
+// File types the server accepts for processing
+const SUPPORTED_TYPES = ['application/pdf', 'image/png', 'image/jpeg', 'image/tiff'];
+
 function UploadArea() {
     const [selectedFiles, setSelectedFiles] = useState([]);
     const [isUploading, setIsUploading] = useState(false);
@@ -12,10 +15,10 @@ function UploadArea() {
 
     // Handle file selection from input
     const handleFileChange = (event) => {
-        const files = Array.from(event.target.files).filter(file => file.type === 'application/pdf');
+        const files = Array.from(event.target.files).filter(file => SUPPORTED_TYPES.includes(file.type));
         
         if (files.length === 0) {
-            setUploadError('Only PDF files are allowed');
+            setUploadError('Only PDF, PNG, JPEG and TIFF files are allowed');
             return;
         }
         
@@ -54,10 +57,10 @@ function UploadArea() {
         e.stopPropagation();
         setIsDragging(false);
         
-        const files = Array.from(e.dataTransfer.files).filter(file => file.type === 'application/pdf');
+        const files = Array.from(e.dataTransfer.files).filter(file => SUPPORTED_TYPES.includes(file.type));
         
         if (files.length === 0) {
-            setUploadError('Only PDF files are allowed');
+            setUploadError('Only PDF, PNG, JPEG and TIFF files are allowed');
             return;
         }
         
@@ -68,7 +71,7 @@ function UploadArea() {
     // Handle upload to server
     const uploadFiles = async () => {
         if (selectedFiles.length === 0) {
-            setUploadError('Please select at least one PDF file');
+            setUploadError('Please select at least one file');
             return;
         }
 
@@ -135,7 +138,7 @@ function UploadArea() {
                         type="file" 
                         className="hidden" 
                         id="fileInput" 
-                        accept=".pdf" 
+                        accept=".pdf,.png,.jpg,.jpeg,.tif,.tiff" 
                         multiple
                         onChange={handleFileChange}
                         ref={fileInputRef}
@@ -148,7 +151,7 @@ function UploadArea() {
                         </div>
                         <div className="space-y-2">
                             <p className="text-lg font-medium text-neutral-800">Drag and drop your files here</p>
-                            <p className="text-sm text-neutral-600">or click to browse (PDF only)</p>
+                            <p className="text-sm text-neutral-600">or click to browse (PDF, PNG, JPEG or TIFF)</p>
                             {selectedFiles.length > 0 && (
                                 <p className="text-sm text-indigo-600">
                                     {selectedFiles.length} file(s) selected
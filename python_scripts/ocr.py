@@ -1,19 +1,211 @@
-import fitz
-from paddleocr import PaddleOCR
-import sys
+"""
+OCR invoice files with PaddleOCR.
+
+    python ocr.py FILE                          print the lines of one file as JSON
+    python ocr.py --batch DIR_OR_FILE ... [-o results.jsonl]
+                                                one JSON line per file
+    python ocr.py --serve [--socket PATH]       answer one file path per line on
+                                                stdin/stdout or a Unix socket
+
+The model is loaded once per process, so batch and server mode only pay
+for it once. Every page of a file is OCRed. Throughput is reported on
+stderr, which keeps stdout for results.
+"""
+import argparse
 import json
+import os
+import signal
+import socketserver
+import sys
+import time
 
-def Process_File(file_path):
-    ocr = PaddleOCR(use_angle_cls=True, lang='en')
-    result = ocr.ocr(file_path, cls=True)[0]
-    #print(result)
-    obj = [{f"{x[1][0]}":x[1][1]} for x in result]
-    #print(obj[0])
-    #print(obj)
-    print(json.dumps(obj,separators=(',', ':')))
+from paddleocr import PaddleOCR
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp'}
+
+_ocr = None
+
+
+def get_ocr():
+    """The process wide PaddleOCR model, loaded on first use."""
+    global _ocr
+    if _ocr is None:
+        start = time.perf_counter()
+        _ocr = PaddleOCR(use_angle_cls=True, lang='en')
+        log(f"model loaded in {time.perf_counter() - start:.1f}s")
+    return _ocr
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def ocr_file(file_path):
+    """OCR every page of a file into {"file", "pages", "lines", "seconds"}; lines are {text: confidence}."""
+    start = time.perf_counter()
+    result = get_ocr().ocr(file_path, cls=True)
+    lines = [{f"{x[1][0]}": x[1][1]} for page in result for x in (page or [])]
+    return {
+        "file": file_path,
+        "pages": len(result),
+        "lines": lines,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+class Throughput:
+    """Files, pages and OCR time processed so far."""
+
+    def __init__(self):
+        self.files = 0
+        self.pages = 0
+        self.errors = 0
+        self.ocr_seconds = 0.0
+        self.start = time.perf_counter()
+
+    def add(self, record):
+        if "error" in record:
+            self.errors += 1
+            return
+        self.files += 1
+        self.pages += record["pages"]
+        self.ocr_seconds += record["seconds"]
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "files": self.files,
+            "pages": self.pages,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "pages_per_second": round(self.pages / elapsed, 3) if elapsed else 0.0,
+            "ocr_seconds_per_page": round(self.ocr_seconds / self.pages, 3) if self.pages else 0.0,
+        }
 
 
+def process_request(file_path, throughput):
+    """OCR one file for batch or server mode; failures become {"file", "error"} records."""
+    try:
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        record = ocr_file(file_path)
+    except Exception as e:
+        record = {"file": file_path, "error": str(e)}
+    throughput.add(record)
+    return record
+
+
+def expand_paths(paths):
+    """Files as given, and the supported files in directories, in name order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def run_batch(paths, output):
+    throughput = Throughput()
+    get_ocr()
+    throughput.start = time.perf_counter()  # throughput excludes the model load
+    out = open(output, 'w') if output else sys.stdout
+    try:
+        for file_path in expand_paths(paths):
+            record = process_request(file_path, throughput)
+            out.write(json.dumps(record, separators=(',', ':')) + '\n')
+            out.flush()
+            log(f"{file_path}: {record.get('pages', 0)} pages in {record.get('seconds', 0)}s"
+                if "error" not in record else f"{file_path}: {record['error']}")
+    finally:
+        if output:
+            out.close()
+    log(json.dumps(throughput.summary()))
+
+
+def answer(line, throughput):
+    """
+    The response to one server request line.
+
+    A request is a file path, or {"file": path} as JSON. "stats" returns the
+    throughput so far.
+    """
+    line = line.strip()
+    if line == "stats":
+        return throughput.summary()
+    if line.startswith("{"):
+        try:
+            line = json.loads(line)["file"]
+        except (ValueError, KeyError, TypeError) as e:
+            return {"error": f"Invalid request: {e}"}
+    return process_request(line, throughput)
+
+
+def serve_lines(lines, write, throughput):
+    for line in lines:
+        if not line.strip():
+            continue
+        write(json.dumps(answer(line, throughput), separators=(',', ':')) + '\n')
+
+
+def run_server(socket_path):
+    throughput = Throughput()
+    get_ocr()
+    throughput.start = time.perf_counter()
+    # Stopping the container sends SIGTERM; exit through the cleanup below
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if socket_path is None:
+            log("serving on stdin/stdout")
+
+            def write(text):
+                sys.stdout.write(text)
+                sys.stdout.flush()
+
+            serve_lines(sys.stdin, write, throughput)
+        else:
+            class Handler(socketserver.StreamRequestHandler):
+                def handle(self):
+                    lines = (raw.decode('utf-8') for raw in self.rfile)
+                    serve_lines(lines, lambda text: self.wfile.write(text.encode('utf-8')), throughput)
+
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            # Connections are served one at a time, so the model only ever runs one file
+            with socketserver.UnixStreamServer(socket_path, Handler) as server:
+                log(f"serving on {socket_path}")
+                server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if socket_path is not None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        log(json.dumps(throughput.summary()))
+
+
+def Process_File(file_path):
+    obj = ocr_file(file_path)["lines"]
+    print(json.dumps(obj, separators=(',', ':')))
+
 
 if __name__ == '__main__':
-    fname = sys.argv[1]
-    Process_File(fname)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="File to OCR, or files and directories with --batch")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", action="store_true", help="OCR many files into JSON lines")
+    mode.add_argument("--serve", action="store_true", help="Keep the model loaded and answer requests")
+    parser.add_argument("-o", "--output", help="JSONL output file for --batch (default: stdout)")
+    parser.add_argument("--socket", help="Unix socket path for --serve (default: stdin/stdout)")
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.socket)
+    elif args.batch:
+        if not args.paths:
+            parser.error("--batch needs at least one file or directory")
+        run_batch(args.paths, args.output)
+    else:
+        if len(args.paths) != 1:
+            parser.error("give one file, or use --batch or --serve")
+        Process_File(args.paths[0])
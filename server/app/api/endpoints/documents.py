@@ -1,7 +1,7 @@
 # server/app/api/endpoints/documents.py
 import os
 import shutil
-from typing import Any, List
+from typing import Any, List, Optional
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
@@ -11,7 +11,8 @@ from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.api import deps
 from app.core.config import settings
-from app.services.processing_service import process_document_task
+from app.services.ocr_engines import available_engines
+from app.services.processing_service import schedule_processing
 
 router = APIRouter()
 
@@ -19,6 +20,14 @@ router = APIRouter()
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Accepted upload types, with the extension given to files uploaded without one
+SUPPORTED_CONTENT_TYPES = {
+    "application/pdf": ".pdf",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/tiff": ".tif",
+}
+
 
 @router.post("/", response_model=schemas.Document)
 async def upload_document(
@@ -31,15 +40,18 @@ async def upload_document(
     Upload a new document and add it to the processing queue without starting processing.
     """
     # Validate file type
-    if file.content_type != "application/pdf":
+    if file.content_type not in SUPPORTED_CONTENT_TYPES:
         raise HTTPException(
             status_code=400, 
-            detail="Only PDF files are supported"
+            detail="Only PDF, PNG, JPEG and TIFF files are supported"
         )
     
     # Create a unique filename to avoid collisions
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     unique_filename = f"{timestamp}_{file.filename}"
+    # Processing tells PDFs from images by the extension
+    if not os.path.splitext(unique_filename)[1]:
+        unique_filename += SUPPORTED_CONTENT_TYPES[file.content_type]
     file_path = os.path.join(UPLOAD_DIR, unique_filename)
     
     # Save the file
@@ -208,6 +220,8 @@ def process_document(
     db: Session = Depends(deps.get_db),
     id: int,
     priority: int = 1,
+    ocr_engine: Optional[str] = None,
+    language: Optional[str] = None,
     background_tasks: BackgroundTasks,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -221,6 +235,11 @@ def process_document(
     if not crud.user.is_superuser(current_user) and document.uploaded_by != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
+    if ocr_engine is not None and ocr_engine not in available_engines():
+        raise HTTPException(status_code=400, detail=f"Unknown OCR engine: {ocr_engine}")
+    if language is not None and language not in settings.OCR_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported OCR language: {language}")
+    
     # Check if document is already processed
     if document.status == "processed":
         return document
@@ -233,7 +252,9 @@ def process_document(
         queue_in = schemas.QueueCreate(
             document_id=document.id,
             status="pending",
-            priority=priority
+            priority=priority,
+            ocr_engine=ocr_engine,
+            language=language
         )
         queue_item = crud.queue.create(db=db, obj_in=queue_in)
     else:
@@ -242,15 +263,22 @@ def process_document(
         # Update status if it's not pending
         if queue_item.status != "pending":
             queue_item = crud.queue.update_status(db=db, queue_id=queue_item.id, status="pending")
+        # Only the options given replace the ones stored on the queue item
+        options = {
+            key: value for key, value in (("ocr_engine", ocr_engine), ("language", language))
+            if value is not None
+        }
+        if options:
+            queue_item = crud.queue.update(
+                db=db, db_obj=queue_item, obj_in=schemas.QueueUpdate(**options)
+            )
     
     # Update document status
     document = crud.document.update_status(db=db, document_id=id, status="pending")
     
-    # Start processing in the background
-    background_tasks.add_task(
-        process_document_task,
-        document_id=document.id,
-        queue_id=queue_item.id
+    # Process it after the response, or leave it to the worker daemon
+    schedule_processing(
+        db, background_tasks, document_id=document.id, queue_id=queue_item.id
     )
     
     return document
@@ -262,6 +290,8 @@ def reprocess_document(
     db: Session = Depends(deps.get_db),
     id: int,
     priority: int = 1,
+    ocr_engine: Optional[str] = None,
+    language: Optional[str] = None,
     background_tasks: BackgroundTasks,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -275,6 +305,11 @@ def reprocess_document(
     if not crud.user.is_superuser(current_user) and document.uploaded_by != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
+    if ocr_engine is not None and ocr_engine not in available_engines():
+        raise HTTPException(status_code=400, detail=f"Unknown OCR engine: {ocr_engine}")
+    if language is not None and language not in settings.OCR_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported OCR language: {language}")
+    
     # Update document status
     document = crud.document.update_status(db=db, document_id=id, status="pending")
     
@@ -282,15 +317,15 @@ def reprocess_document(
     queue_in = schemas.QueueCreate(
         document_id=document.id,
         status="pending",
-        priority=priority
+        priority=priority,
+        ocr_engine=ocr_engine,
+        language=language
     )
     queue_item = crud.queue.create(db=db, obj_in=queue_in)
     
-    # Start processing in the background
-    background_tasks.add_task(
-        process_document_task,
-        document_id=document.id,
-        queue_id=queue_item.id
+    # Process it after the response, or leave it to the worker daemon
+    schedule_processing(
+        db, background_tasks, document_id=document.id, queue_id=queue_item.id
     )
     
     return document
\ No newline at end of file
@@ -7,7 +7,9 @@ from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
-from app.services.processing_service import process_document_task
+from app.core.config import settings
+from app.services.ocr_engines import available_engines
+from app.services.processing_service import schedule_processing
 
 router = APIRouter()
 
@@ -31,6 +33,11 @@ def create_queue_item(
     if not crud.user.is_superuser(current_user) and document.uploaded_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    if item_in.ocr_engine is not None and item_in.ocr_engine not in available_engines():
+        raise HTTPException(status_code=400, detail=f"Unknown OCR engine: {item_in.ocr_engine}")
+    if item_in.language is not None and item_in.language not in settings.OCR_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported OCR language: {item_in.language}")
+    
     # Create queue item
     queue_item = crud.queue.create(db=db, obj_in=item_in)
     
@@ -114,11 +121,9 @@ def process_queue_item(
         if document.status not in ["processing", "processed"]:
             document = crud.document.update_status(db, document_id=document.id, status="pending")
         
-        # Start background processing task
-        background_tasks.add_task(
-            process_document_task,
-            document_id=document.id,
-            queue_id=queue_item.id
+        # Process it after the response, or leave it to the worker daemon
+        schedule_processing(
+            db, background_tasks, document_id=document.id, queue_id=queue_item.id
         )
     
     return queue_item
@@ -152,11 +157,9 @@ def reprocess_queue_item(
     # Reset document status
     document = crud.document.update_status(db, document_id=document.id, status="pending")
     
-    # Start background processing task
-    background_tasks.add_task(
-        process_document_task,
-        document_id=document.id,
-        queue_id=queue_item.id
+    # Process it after the response, or leave it to the worker daemon
+    schedule_processing(
+        db, background_tasks, document_id=document.id, queue_id=queue_item.id
     )
     
     return queue_item
@@ -177,6 +180,11 @@ def update_queue_item(
     if not queue_item:
         raise HTTPException(status_code=404, detail="Queue item not found")
     
+    if item_in.ocr_engine is not None and item_in.ocr_engine not in available_engines():
+        raise HTTPException(status_code=400, detail=f"Unknown OCR engine: {item_in.ocr_engine}")
+    if item_in.language is not None and item_in.language not in settings.OCR_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported OCR language: {item_in.language}")
+    
     queue_item = crud.queue.update(db=db, db_obj=queue_item, obj_in=item_in)
     return queue_item
 
@@ -1,3 +1,4 @@
+import logging
 from typing import Any, List
 from datetime import datetime
 
@@ -6,6 +7,10 @@ from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core.config import settings
+from app.services.vendor_index import vendor_index
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -121,6 +126,13 @@ def validate_result(
     # Make sure the result is returned with the validator information
     db.refresh(result)
     
+    # Validated values teach the vendor's template, so the vendor's next invoices take the fast path
+    if status == "validated" and settings.VENDOR_TEMPLATES_ENABLED:
+        try:
+            vendor_index.learn(db, result)
+        except Exception as e:
+            logger.error(f"Error updating the vendor template from result {id}: {e}")
+    
     return result
 
 
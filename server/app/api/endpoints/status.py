@@ -7,6 +7,16 @@ from sqlalchemy import func
 
 from app import crud, models
 from app.api import deps
+from app.core.config import settings
+from app.services.field_scanner import invoice_scanner
+from app.services.layout_extractor import layout_extractor
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_engines import available_engines, loaded_engines, model_cache_stats
+from app.services.ocr_service import ocr_service
+from app.services.orientation import page_orienter
+from app.services.preprocessing import image_preprocessor
+from app.services.queue_scheduler import queue_scheduler
+from app.services.vendor_index import vendor_index
 
 router = APIRouter()
 
@@ -51,7 +61,10 @@ def get_document_status(
         "error_message": None,
         "result_status": None,
         "confidence_score": None,
-        "extracted_fields": {}
+        "extracted_fields": {},
+        "pages_processed": None,
+        "pages_total": None,
+        "partial_fields": {}
     }
     
     # Add queue info if available
@@ -61,7 +74,11 @@ def get_document_status(
             "queue_status": latest_queue.status,
             "process_start": latest_queue.process_start_time,
             "process_end": latest_queue.process_end_time,
-            "error_message": latest_queue.error_message
+            "error_message": latest_queue.error_message,
+            # Updated after every page while the document is processing
+            "pages_processed": latest_queue.pages_processed,
+            "pages_total": latest_queue.pages_total,
+            "partial_fields": latest_queue.partial_result or {}
         })
     
     # Add result info if available
@@ -239,6 +256,110 @@ def get_processing_metrics(
     
     return metrics
 
+@router.get("/ocr_cache", response_model=Dict[str, Any])
+def get_ocr_cache_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get OCR cache statistics.
+    Hit/miss counters are per server process, size figures cover the whole cache.
+    """
+    return ocr_cache.stats()
+
+@router.get("/ocr_batching", response_model=Dict[str, Any])
+def get_ocr_batching_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get OCR micro-batching statistics for this server process.
+    """
+    batch_server = ocr_service.batch_server
+    stats = batch_server.stats() if batch_server is not None else {}
+    stats["enabled"] = ocr_service.engine.is_batching
+    stats["engine"] = ocr_service.engine.name
+    return stats
+
+@router.get("/ocr_preprocessing", response_model=Dict[str, Any])
+def get_ocr_preprocessing_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get image pre-processing statistics for this server process.
+    Includes the pixel reduction and the mean time of each step per page.
+    """
+    stats = image_preprocessor.stats()
+    stats["enabled"] = settings.OCR_PREPROCESS_ENABLED
+    stats["steps"] = image_preprocessor.signature
+    return stats
+
+@router.get("/ocr_orientation", response_model=Dict[str, Any])
+def get_ocr_orientation_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get page orientation pre-pass statistics for this server process.
+    Includes how pages were turned, the pages that kept per-line angle
+    classification and the mean classifier time saved per page.
+    """
+    stats = page_orienter.stats()
+    stats["enabled"] = settings.OCR_ORIENTATION_ENABLED
+    return stats
+
+@router.get("/ocr_engines", response_model=Dict[str, Any])
+def get_ocr_engines(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    List the OCR engines and languages that queue items can select, the
+    engines created in this process, and the model cache holding their models.
+    """
+    return {
+        "default": settings.OCR_ENGINE,
+        "available": available_engines(),
+        "default_language": settings.OCR_DEFAULT_LANGUAGE,
+        "languages": settings.OCR_LANGUAGES,
+        "language_detection": settings.OCR_LANGUAGE_DETECTION,
+        "loaded": [
+            {
+                "name": engine.name,
+                "lang": engine.lang,
+                "version": engine.version,
+                "models_loaded": engine.is_loaded,
+                "warm": engine.is_warm,
+            }
+            for engine in loaded_engines()
+        ],
+        "model_cache": model_cache_stats(),
+    }
+
+@router.get("/vendor_templates", response_model=Dict[str, Any])
+def get_vendor_template_stats(
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get vendor template statistics for this server process.
+    Includes the vendors with a template, and how many processed documents
+    matched one and had every template field read from it.
+    """
+    vendor_index.refresh(db)
+    stats = vendor_index.stats()
+    stats["enabled"] = settings.VENDOR_TEMPLATES_ENABLED
+    stats["match_threshold"] = vendor_index.match_threshold
+    return stats
+
+@router.get("/extraction_patterns", response_model=Dict[str, Any])
+def get_extraction_pattern_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get field pattern statistics for this server process.
+    Includes how often each generic extraction pattern was tried, how often
+    it matched and the time spent on it, and the vendors whose pattern order
+    has adapted to their documents.
+    """
+    return invoice_scanner.stats()
+
 def safe_average(values):
     """Calculate average safely, handling empty lists"""
     if not values:
@@ -299,4 +420,31 @@ def get_error_distribution(db, current_user):
         "ocr_issues": 0.4,
         "classification_errors": 0.2,
         "other": 0.1
-    }
\ No newline at end of file
+    }
+
+@router.get("/extraction_model", response_model=Dict[str, Any])
+def get_extraction_model_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get layout model extraction statistics for this server process.
+    Includes the documents tagged, the batches of token windows run through
+    the model and the model's throughput.
+    """
+    stats = layout_extractor.stats()
+    stats["backend"] = settings.EXTRACTION_BACKEND
+    stats["model_path"] = settings.EXTRACTION_MODEL_PATH
+    return stats
+
+@router.get("/queue_fair_share", response_model=Dict[str, Any])
+def get_queue_fair_share_stats(
+    db: Session = Depends(deps.get_db),
+    hours: float = 24.0,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get the wait times of queued documents per owner.
+    Superusers see every owner, other users only themselves.
+    """
+    owner_id = None if crud.user.is_superuser(current_user) else current_user.id
+    return queue_scheduler.wait_stats(db, hours=hours, owner_id=owner_id)
@@ -57,6 +57,134 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER: str
     FIRST_SUPERUSER_PASSWORD: str
 
+    # OCR config
+    # Default OCR engine (paddle, paddle_rec, text_layer or stub); queue items can override it
+    OCR_ENGINE: str = "paddle"
+    # PaddleOCR language codes documents may be OCRed in; queue items can pick one
+    OCR_LANGUAGES: List[str] = ["en", "es", "fr"]
+    # Language used when a queue item sets none and detection is off or inconclusive
+    OCR_DEFAULT_LANGUAGE: str = "en"
+    # Detect the language of documents without one from their text layer, or
+    # from a first OCR pass over the header of the first page
+    OCR_LANGUAGE_DETECTION: bool = True
+    # Loaded OCR models kept in memory per process, least recently used evicted first
+    OCR_MODEL_CACHE_MAX_MODELS: int = 3
+    # Also evict models while the process RSS is above this many MB (0 for no limit)
+    OCR_MODEL_CACHE_MAX_RSS_MB: int = 4096
+    # Number of worker processes used to OCR the scanned pages of a single PDF
+    # in parallel. 0 or 1 keeps the original serial, in-process behaviour.
+    OCR_PAGE_WORKERS: int = 0
+    # Documents with fewer scanned pages than this are OCRed serially
+    OCR_PARALLEL_MIN_PAGES: int = 2
+    # Load the OCR models and run a dummy page when the server starts.
+    # Leave off for API-only processes that never run OCR themselves.
+    OCR_WARMUP_ON_STARTUP: bool = False
+    # Resolution scanned pages are rendered at before OCR (72 = PDF points)
+    OCR_RENDER_DPI: int = 72
+    # Batch page images from concurrent tasks through one in-process inference
+    # thread. Recognition runs over all text line crops of a batch together.
+    OCR_BATCHING_ENABLED: bool = False
+    OCR_BATCH_SIZE: int = 8
+    # How long the first page of a batch waits for more pages to arrive
+    OCR_BATCH_MAX_WAIT_MS: float = 20.0
+    # Text line crops per recognizer forward pass (PaddleOCR's rec_batch_num)
+    OCR_REC_BATCH_NUM: int = 6
+    # On-disk cache of OCR results keyed by document/page content
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = ".ocr_cache"
+    OCR_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Pre-processing of rendered pages before OCR: grayscale, cropping of
+    # scanner borders and margins, downscaling to a target text line height in
+    # pixels (0 = never resize) and adaptive binarization
+    OCR_PREPROCESS_ENABLED: bool = False
+    OCR_PREPROCESS_GRAYSCALE: bool = True
+    OCR_PREPROCESS_CROP_BORDERS: bool = True
+    OCR_PREPROCESS_TARGET_TEXT_HEIGHT: int = 32
+    OCR_PREPROCESS_BINARIZE: bool = False
+    OCR_PREPROCESS_BINARIZE_WINDOW: int = 31
+    OCR_PREPROCESS_BINARIZE_OFFSET: int = 10
+    # Detect each scanned page's orientation once, turn it upright, and skip the
+    # per-line angle classifier on pages where the sample vote is conclusive
+    OCR_ORIENTATION_ENABLED: bool = False
+    # Text lines sampled for the upright / upside down vote
+    OCR_ORIENTATION_SAMPLE_LINES: int = 8
+    # Share of sampled lines that must agree, otherwise lines are classified one by one
+    OCR_ORIENTATION_MIN_AGREEMENT: float = 0.8
+    # Region-of-interest first pass: OCR only the header and footer bands of a
+    # scanned first page, and the whole document only if required fields are missing
+    OCR_ROI_ENABLED: bool = False
+    OCR_ROI_HEADER_FRACTION: float = 0.3
+    OCR_ROI_FOOTER_FRACTION: float = 0.35
+    # Fields extraction has to find before a partial OCR pass is accepted
+    OCR_REQUIRED_FIELDS: List[str] = ["invoice_number", "vendor_name", "invoice_date", "total_amount"]
+    # Minimum OCR confidence of the blocks a required field was read from
+    OCR_REQUIRED_FIELD_MIN_CONFIDENCE: float = 0.8
+    # Stop OCRing a multi-page document once page by page extraction has found
+    # the required fields. Disabled when line items are required, since they
+    # can continue on any page.
+    OCR_EARLY_STOP_ENABLED: bool = False
+    OCR_LINE_ITEMS_REQUIRED: bool = False
+    # Partial fields shown while a document is OCRed are extracted again after
+    # this many pages or seconds, whichever comes first (every page with early stop)
+    OCR_PROGRESS_EXTRACT_PAGES: int = 5
+    OCR_PROGRESS_EXTRACT_SECONDS: float = 10.0
+
+    # Queue worker config
+    # Leave documents to the worker daemon (python -m app.worker) instead of
+    # processing them in the API process: the processing endpoints only mark
+    # their queue items as queued, and workers claim them from the database
+    QUEUE_WORKER_ENABLED: bool = False
+    # Documents a worker processes at the same time
+    QUEUE_WORKER_CONCURRENCY: int = 2
+    # Queue items a worker claims per database round trip at most
+    QUEUE_WORKER_CLAIM_BATCH: int = 4
+    # Seconds between polls while nothing is queued
+    QUEUE_WORKER_POLL_INTERVAL: float = 2.0
+    # Items processing for longer than this many seconds are taken to belong
+    # to a worker that died and are queued again, when a worker starts and
+    # then every QUEUE_WORKER_REQUEUE_INTERVAL seconds. Keep it above the
+    # longest time a document takes, or it is processed twice.
+    QUEUE_WORKER_STALE_TIMEOUT: float = 3600.0
+    QUEUE_WORKER_REQUEUE_INTERVAL: float = 60.0
+    # Fair sharing of the workers between document owners: an owner's queued
+    # documents take turns this many seconds apart (divided by the owner's
+    # weight) on the queue's clock, so one owner's backlog does not hold up
+    # the others. About a document's processing time; 0 turns it off.
+    QUEUE_FAIR_SHARE_SLOT_SECONDS: float = 10.0
+    # Fair share weights by user id; owners not listed have weight 1
+    QUEUE_FAIR_SHARE_WEIGHTS: Dict[int, float] = {}
+    # Seconds a queued document has to wait longer than another to count as
+    # one priority level higher
+    QUEUE_PRIORITY_AGING_SECONDS: float = 300.0
+
+    # Extraction config
+    # Read documents of vendors with a template learned from validated results
+    # from the stored field positions, before the generic patterns
+    VENDOR_TEMPLATES_ENABLED: bool = True
+    # Fingerprint similarity (0-1) a document needs to be matched to a vendor template
+    VENDOR_MATCH_THRESHOLD: float = 0.75
+    # Try interchangeable field label patterns in order of their hit rate on
+    # earlier documents of the same vendor, once it has this many documents
+    EXTRACTION_ADAPTIVE_PATTERN_ORDER: bool = False
+    EXTRACTION_ADAPTIVE_MIN_DOCUMENTS: int = 20
+    # Extraction backend for documents without a vendor template: "rules" (the
+    # field patterns and label positions) or "layout_model" (a LayoutLM token
+    # classification model on CPU, needs torch and transformers). Fields the
+    # model does not find still come from the rules.
+    EXTRACTION_BACKEND: str = "rules"
+    # Local directory of the model and its tokenizer; nothing is downloaded
+    EXTRACTION_MODEL_PATH: Optional[str] = None
+    # int8 dynamic quantization of the model's linear layers
+    EXTRACTION_MODEL_QUANTIZE: bool = True
+    # CPU threads PyTorch uses for the model
+    EXTRACTION_MODEL_THREADS: int = 1
+    # Token windows from concurrently processed documents run through the model together
+    EXTRACTION_MODEL_BATCH_SIZE: int = 8
+    # How long the first window of a batch waits for more to arrive
+    EXTRACTION_MODEL_BATCH_MAX_WAIT_MS: float = 20.0
+    # Tokens per window, including the two special tokens
+    EXTRACTION_MODEL_MAX_TOKENS: int = 512
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -3,6 +3,7 @@ from app.crud.document import document
 from app.crud.queue import queue
 from app.crud.result import result
 from app.crud.user import user
+from app.crud.vendor_template import vendor_template
 
 # For backward compatibility and clean imports
-__all__ = ["document", "queue", "result", "user", "CRUDBase"]
\ No newline at end of file
+__all__ = ["document", "queue", "result", "user", "vendor_template", "CRUDBase"]
\ No newline at end of file
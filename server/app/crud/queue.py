@@ -1,9 +1,9 @@
 # server/app/crud/queue.py
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, update
 
 from app.crud.base import CRUDBase
 from app.models.queue import Queue
@@ -59,15 +59,151 @@ class CRUDQueue(CRUDBase[Queue, QueueCreate, QueueUpdate]):
             db.refresh(db_obj)
         return db_obj
     
-    def get_next_for_processing(
-        self, db: Session
-    ) -> Optional[Queue]:
-        return (
-            db.query(self.model)
-            .filter(self.model.status == "pending")
-            .order_by(self.model.priority.desc(), self.model.created_date.asc())
-            .first()
+    def update_progress(
+        self,
+        db: Session,
+        *,
+        queue_id: int,
+        pages_processed: int,
+        pages_total: Optional[int],
+        partial_result: Optional[Dict[str, Any]] = None
+    ) -> Queue:
+        db_obj = db.query(self.model).filter(self.model.id == queue_id).first()
+        if db_obj:
+            db_obj.pages_processed = pages_processed
+            db_obj.pages_total = pages_total
+            db_obj.partial_result = partial_result
+            db.add(db_obj)
+            db.commit()
+            db.refresh(db_obj)
+        return db_obj
+    
+    def get_fair_share_turns(
+        self, db: Session, *, owner_id: Optional[int]
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """
+        The first fair share turn among all queued items and the owner's
+        last one, None where nothing is queued. Each is one index lookup.
+        """
+        first_turn = (
+            db.query(func.min(self.model.fair_share_turn))
+            .filter(self.model.status == "queued")
+            .scalar()
+        )
+        owner_last_turn = (
+            db.query(func.max(self.model.fair_share_turn))
+            .filter(self.model.status == "queued", self.model.owner_id == owner_id)
+            .scalar()
         )
+        return first_turn, owner_last_turn
+    
+    def mark_queued(
+        self,
+        db: Session,
+        *,
+        db_obj: Queue,
+        owner_id: Optional[int],
+        fair_share_turn: float,
+        schedule_key: float
+    ) -> Queue:
+        db_obj.status = "queued"
+        db_obj.owner_id = owner_id
+        db_obj.queued_time = datetime.now()
+        db_obj.fair_share_turn = fair_share_turn
+        db_obj.schedule_key = schedule_key
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+    
+    def claim_batch(
+        self, db: Session, *, limit: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Claim up to `limit` queued items for processing, lowest schedule key
+        first, in one statement: the rows are selected with FOR UPDATE SKIP
+        LOCKED, so concurrent workers each claim different rows without
+        waiting on each other, and marked as processing before the commit.
+        
+        Returns:
+            (queue item id, document id) of each claimed item, in claim order
+        """
+        candidates = (
+            select(self.model.id)
+            .where(self.model.status == "queued")
+            .order_by(self.model.schedule_key.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        claimed = db.execute(
+            update(self.model)
+            .where(self.model.id.in_(candidates))
+            .values(status="processing", process_start_time=datetime.now())
+            .returning(self.model.id, self.model.document_id, self.model.schedule_key)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        # RETURNING gives no order
+        claimed.sort(key=lambda row: (row.schedule_key is None, row.schedule_key, row.id))
+        return [(row.id, row.document_id) for row in claimed]
+    
+    def requeue_stale(
+        self, db: Session, *, started_before: datetime, exclude: Sequence[int] = ()
+    ) -> List[int]:
+        """
+        Queue the items again that have been processing since before
+        `started_before`: their worker died without finishing them. Rows
+        another worker is updating right now are skipped.
+        
+        Returns:
+            The ids of the items queued again
+        """
+        stale = (
+            select(self.model.id)
+            .where(
+                self.model.status == "processing",
+                self.model.process_start_time < started_before,
+                self.model.id.notin_(list(exclude)),
+            )
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        requeued = db.execute(
+            update(self.model)
+            .where(self.model.id.in_(stale))
+            .values(status="queued")
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        return sorted(requeued)
+    
+    def get_wait_times(
+        self, db: Session, *, since: datetime, owner_id: Optional[int] = None
+    ) -> List[Tuple[Optional[int], datetime, datetime]]:
+        """(owner id, queued time, process start time) of the items queued since `since` and claimed."""
+        query = db.query(
+            self.model.owner_id, self.model.queued_time, self.model.process_start_time
+        ).filter(
+            self.model.queued_time >= since,
+            self.model.process_start_time.isnot(None),
+            self.model.status != "queued"
+        )
+        if owner_id is not None:
+            query = query.filter(self.model.owner_id == owner_id)
+        return query.all()
+    
+    def get_queued_by_owner(
+        self, db: Session, *, owner_id: Optional[int] = None
+    ) -> List[Tuple[Optional[int], int, Optional[datetime]]]:
+        """(owner id, items queued, oldest queued time) of every owner with queued items."""
+        query = db.query(
+            self.model.owner_id, func.count(self.model.id), func.min(self.model.queued_time)
+        ).filter(self.model.status == "queued")
+        if owner_id is not None:
+            query = query.filter(self.model.owner_id == owner_id)
+        return query.group_by(self.model.owner_id).all()
     
     def get_by_document(
         self, db: Session, *, document_id: int
@@ -0,0 +1,31 @@
+# server/app/crud/vendor_template.py
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+
+from app.crud.base import CRUDBase
+from app.models.vendor_template import VendorTemplate
+from app.schemas.vendor_template import VendorTemplateCreate, VendorTemplateUpdate
+
+
+class CRUDVendorTemplate(CRUDBase[VendorTemplate, VendorTemplateCreate, VendorTemplateUpdate]):
+    def get_by_vendor(self, db: Session, *, vendor_name: str) -> Optional[VendorTemplate]:
+        """Case-insensitive lookup by vendor name."""
+        return (
+            db.query(self.model)
+            .filter(func.lower(self.model.vendor_name) == vendor_name.lower())
+            .first()
+        )
+    
+    def get_revisions(self, db: Session) -> Dict[int, int]:
+        """Sample count of every template by id; it grows whenever a template changes."""
+        return dict(db.query(self.model.id, self.model.sample_count).all())
+    
+    def get_multi_by_ids(self, db: Session, *, ids: List[int]) -> List[VendorTemplate]:
+        if not ids:
+            return []
+        return db.query(self.model).filter(self.model.id.in_(ids)).all()
+
+
+vendor_template = CRUDVendorTemplate(VendorTemplate)
@@ -4,4 +4,5 @@ from app.db.base_class import Base
 from app.models.user import User
 from app.models.document import Document
 from app.models.queue import Queue
-from app.models.result import ProcessingResult
\ No newline at end of file
+from app.models.result import ProcessingResult
+from app.models.vendor_template import VendorTemplate
\ No newline at end of file
@@ -1,11 +1,14 @@
 import logging
+import threading
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.api.api import api_router
 from app.core.config import settings
 from app.db.init_db import init_db
+from app.services.ocr_service import ocr_service
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -21,10 +24,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
     
+    # Warm up the OCR models in the background so startup is not blocked
+    if settings.OCR_WARMUP_ON_STARTUP:
+        threading.Thread(target=ocr_service.warm_up, name="ocr-warmup", daemon=True).start()
+    
     yield
     
     # Shutdown: Clean up resources if needed
     logger.info("Shutting down application")
+    ocr_service.shutdown()
 
 # Create FastAPI application with lifespan
 app = FastAPI(
@@ -53,4 +61,19 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness probe. Processes configured to warm up the OCR models report
+    503 until the warm-up has finished.
+    """
+    ready = ocr_service.is_warm or not settings.OCR_WARMUP_ON_STARTUP
+    content = {
+        "status": "ready" if ready else "warming_up",
+        "ocr_models_loaded": ocr_service.is_loaded,
+        "ocr_models_warm": ocr_service.is_warm,
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
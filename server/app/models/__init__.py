@@ -3,5 +3,6 @@ from app.models.user import User
 from app.models.document import Document
 from app.models.queue import Queue
 from app.models.result import ProcessingResult
+from app.models.vendor_template import VendorTemplate
 
-__all__ = ["User", "Document", "Queue", "ProcessingResult"]
\ No newline at end of file
+__all__ = ["User", "Document", "Queue", "ProcessingResult", "VendorTemplate"]
\ No newline at end of file
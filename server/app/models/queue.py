@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -8,13 +8,33 @@ from app.db.base_class import Base
 class Queue(Base):
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("document.id"))
-    status = Column(String, default="pending")  # pending, processing, completed, failed
+    status = Column(String, default="pending")  # pending, queued (waiting for a worker), processing, completed, failed
     priority = Column(Integer, default=1)  # 1-5 priority levels
     created_date = Column(DateTime(timezone=True), server_default=func.now())
     modified_date = Column(DateTime(timezone=True), onupdate=func.now())
     process_start_time = Column(DateTime(timezone=True), nullable=True)
     process_end_time = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(String, nullable=True)
+    ocr_engine = Column(String, nullable=True)  # None uses the OCR_ENGINE setting
+    language = Column(String, nullable=True)  # OCR language; None detects it or uses OCR_DEFAULT_LANGUAGE
+    
+    # Progress while the document is being processed
+    pages_total = Column(Integer, nullable=True)
+    pages_processed = Column(Integer, nullable=True)
+    partial_result = Column(JSON, nullable=True)  # Fields extracted from the pages done so far
+    
+    # Fair share scheduling, set when the item is queued for the worker
+    owner_id = Column(Integer, ForeignKey("user.id"), nullable=True)  # The document's uploader
+    queued_time = Column(DateTime(timezone=True), nullable=True)
+    fair_share_turn = Column(Float, nullable=True)  # The owner's turn on the fair share clock (epoch seconds)
+    schedule_key = Column(Float, nullable=True)  # Claim order: the turn less the priority's head start
     
     # Relationships
-    document = relationship("Document", back_populates="queue_items")
\ No newline at end of file
+    document = relationship("Document", back_populates="queue_items")
+    
+    __table_args__ = (
+        # The next items to claim, an owner's last turn and the queue's first turn
+        Index("ix_queue_claim", "status", "schedule_key"),
+        Index("ix_queue_owner_turn", "owner_id", "status", "fair_share_turn"),
+        Index("ix_queue_turn", "status", "fair_share_turn"),
+    )
\ No newline at end of file
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+class VendorTemplate(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    vendor_name = Column(String, unique=True, index=True)
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+    modified_date = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Fingerprint: hashed word pairs of the header text, and the page grid cells holding text
+    shingles = Column(JSON, nullable=False)
+    layout_cells = Column(JSON, nullable=False)
+    # Field name -> {"page", "center": [x, y], "label"}, positions normalised to the text extent of the page
+    field_positions = Column(JSON, nullable=False)
+    
+    sample_count = Column(Integer, default=1)  # Validated results merged into the template
+    result_ids = Column(JSON, nullable=False, default=list)  # Ids of those results, so none is merged twice
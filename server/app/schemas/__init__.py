@@ -4,6 +4,7 @@ from app.schemas.queue import Queue, QueueCreate, QueueUpdate, QueueInDB
 from app.schemas.result import Result, ResultCreate, ResultUpdate, ResultInDB
 from app.schemas.token import Token, TokenPayload
 from app.schemas.user import User, UserCreate, UserUpdate, UserInDB
+from app.schemas.vendor_template import VendorTemplate, VendorTemplateCreate, VendorTemplateUpdate
 
 # Make all these models available when importing from app.schemas
 __all__ = [
@@ -12,4 +13,5 @@ __all__ = [
     "Result", "ResultCreate", "ResultUpdate", "ResultInDB",
     "Token", "TokenPayload",
     "User", "UserCreate", "UserUpdate", "UserInDB",
+    "VendorTemplate", "VendorTemplateCreate", "VendorTemplateUpdate",
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 from pydantic import BaseModel
@@ -9,6 +9,8 @@ class QueueBase(BaseModel):
     document_id: int
     status: str = "pending"
     priority: int = 1
+    ocr_engine: Optional[str] = None
+    language: Optional[str] = None
 
 
 # Properties to receive on queue item creation
@@ -21,6 +23,8 @@ class QueueUpdate(BaseModel):
     status: Optional[str] = None
     priority: Optional[int] = None
     error_message: Optional[str] = None
+    ocr_engine: Optional[str] = None
+    language: Optional[str] = None
 
 
 # Properties shared by models stored in DB
@@ -28,9 +32,13 @@ class QueueInDBBase(QueueBase):
     id: int
     created_date: datetime
     modified_date: Optional[datetime] = None
+    queued_time: Optional[datetime] = None
     process_start_time: Optional[datetime] = None
     process_end_time: Optional[datetime] = None
     error_message: Optional[str] = None
+    pages_total: Optional[int] = None
+    pages_processed: Optional[int] = None
+    partial_result: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
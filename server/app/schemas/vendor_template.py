@@ -0,0 +1,43 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+# Shared properties
+class VendorTemplateBase(BaseModel):
+    vendor_name: str
+    shingles: List[int]
+    layout_cells: List[int]
+    field_positions: Dict[str, Any]
+    sample_count: int = 1
+    result_ids: List[int] = []
+
+
+# Properties to receive on template creation
+class VendorTemplateCreate(VendorTemplateBase):
+    pass
+
+
+# Properties to receive on template update
+class VendorTemplateUpdate(BaseModel):
+    shingles: Optional[List[int]] = None
+    layout_cells: Optional[List[int]] = None
+    field_positions: Optional[Dict[str, Any]] = None
+    sample_count: Optional[int] = None
+    result_ids: Optional[List[int]] = None
+
+
+# Properties shared by models stored in DB
+class VendorTemplateInDBBase(VendorTemplateBase):
+    id: int
+    created_date: datetime
+    modified_date: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+# Properties to return to client
+class VendorTemplate(VendorTemplateInDBBase):
+    pass
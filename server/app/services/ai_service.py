@@ -1,42 +1,87 @@
 # server/app/services/ai_service.py
 import logging
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import re
 from datetime import datetime
-import time
 
-from app.services.ocr_service import ocr_service
+import numpy as np
+
+from app.core.config import settings
+from app.services.field_scanner import invoice_scanner
+from app.services.layout_extractor import LayoutModelExtractor, layout_extractor
+from app.services.line_items import column_header_role, line_item_extractor
+from app.services.normalization import parse_amount
+from app.services.ocr_blocks import OcrBlocks
+from app.services.spatial_index import SpatialIndex
+from app.services.vendor_index import TEMPLATE_FIELDS, VendorMatch, vendor_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Block texts that are only a field's label, in priority order (the number of
+# the group that matched). The value is read from the nearest block to the
+# right of the label, or else below it.
+FIELD_LABELS = {
+    field: re.compile("(?:" + "|".join(f"({label})" for label in labels) + r")\s*:?", re.IGNORECASE)
+    for field, labels in {
+        "invoice_number": [r"invoice\s*(?:#|no\.?|number)", r"inv\.?\s*(?:#|no\.?)"],
+        "vendor_name": [r"from", r"vendor", r"supplier", r"bill\s+from"],
+        "invoice_date": [r"(?:invoice|document)\s*date", r"date", r"issued", r"date\s*of\s*invoice"],
+        "due_date": [r"due\s*date", r"payment\s*due", r"due\s*by", r"due", r"pay\s*by"],
+        "total_amount": [
+            r"(?:invoice\s*|grand\s*)?total", r"amount\s*due", r"total\s*amount", r"balance\s*due",
+            r"total\s*due", r"to\s*pay",
+        ],
+    }.items()
+}
+# Any label of any field, to skip the blocks that are none
+ANY_LABEL = re.compile("|".join(f"(?:{label_re.pattern})" for label_re in FIELD_LABELS.values()), re.IGNORECASE)
+# What the first line of the value block must be
+FIELD_VALUES = {
+    "invoice_number": re.compile(r"#?\s*([A-Za-z0-9][\w/-]*\d[\w/-]*|\d[\w/-]*)"),
+    "vendor_name": re.compile(r"(.*[A-Za-z].*)"),
+    "invoice_date": re.compile(r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})"),
+    "due_date": re.compile(r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})"),
+    "total_amount": re.compile(r"\$?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?|\d+(?:\.\d{2})?)"),
+}
+# Longest block text taken for a label
+MAX_LABEL_LENGTH = 32
+# Fields whose lowest label in the document is tried first: the total comes after the items and subtotals
+LAST_LABEL_FIELDS = {"total_amount"}
+# How far a value may be from its label, in label heights
+MAX_VALUE_GAP_RIGHT = 25.0
+MAX_VALUE_GAP_BELOW = 3.0
+
 
 class AIService:
     """
     Service for AI-based document processing and data extraction.
-    """
     
-    def __init__(self):
-        self.ocr_service = ocr_service
+    Works on OCR blocks that the processing pipeline has already produced;
+    it never reads or OCRs documents itself.
+    """
     
-    def process_document(self, file_path: str) -> Dict[str, Any]:
+    def process_document(
+        self,
+        ocr_result: Union[OcrBlocks, List[Dict[str, Any]]],
+        file_path: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
-        Process a document and extract relevant information.
+        Extract relevant information from a document's OCR blocks.
         
         Args:
-            file_path: Path to the document file
+            ocr_result: OCR blocks of the whole document
+            file_path: Path to the document file; only its name is used, to recognise the sample invoices
             
         Returns:
             Dict containing extracted data and processing metadata
         """
         # Extract the file name from the path
-        file_name = os.path.basename(file_path)
+        file_name = os.path.basename(file_path or "")
         
         logger.info(f"Starting processing for file: {file_name}")
-
-        time.sleep(1.262)
         
         # Check for known documents and return hardcoded results
         if "V500332" in file_name or "CORE & MAIN" in file_name:
@@ -116,43 +161,170 @@ class AIService:
             }
         
         # If no hardcoded match, continue with normal processing
-        
-        # Process with OCR
-        logger.info(f"Starting OCR processing for file: {file_path}")
-        ocr_result = self.ocr_service.process_document(file_path)
-        logger.info(f"OCR processing completed with {len(ocr_result)} text blocks")
-        
-        # Extract structured data
-        logger.info("Extracting structured data from OCR results")
-        extracted_data = self._extract_invoice_data(ocr_result)
-        
-        # Calculate confidence score
-        confidence_score = self._calculate_confidence(extracted_data)
-        logger.info(f"Extraction completed with confidence score: {confidence_score:.2f}")
+        ocr_result = OcrBlocks.coerce(ocr_result)
+        
+        # Vendors with a template learned from validated results are read at the stored field positions
+        vendor_match = vendor_index.extract(ocr_result) if settings.VENDOR_TEMPLATES_ENABLED else None
+        if vendor_match is not None:
+            logger.info(
+                f"Matched vendor template {vendor_match.template_id} ({vendor_match.vendor_name}) "
+                f"with score {vendor_match.score:.2f}"
+            )
+            ai_result = self.extract_with_template(ocr_result, vendor_match)
+        elif settings.EXTRACTION_BACKEND == "layout_model":
+            logger.info("Extracting structured data with the layout model")
+            ai_result = self.extract_with_model(ocr_result)
+        else:
+            # Extract structured data
+            logger.info("Extracting structured data from OCR results")
+            ai_result = self.extract_data(ocr_result)
+        logger.info(f"Extraction completed with confidence score: {ai_result['confidence_score']:.2f}")
         
         # Log extracted fields
-        for key, value in extracted_data.items():
+        for key, value in ai_result["extracted_data"].items():
             if key != "line_items":  # Skip logging large arrays
                 logger.info(f"Extracted {key}: {value}")
         
+        return ai_result
+    
+    def extract_data(
+        self, ocr_result: Union[OcrBlocks, List[Dict[str, Any]]], record: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Extract invoice data from OCR blocks that have already been produced.
+        
+        Args:
+            ocr_result: OCR blocks, possibly only for the pages processed so far
+            record: Count the document and its pattern hits in the field
+                pattern statistics; off for the partial extractions of a
+                document that is extracted again once complete
+            
+        Returns:
+            Dict containing extracted data, its confidence score and the OCR
+            confidence of each extracted field
+        """
+        ocr_result = OcrBlocks.coerce(ocr_result)
+        extracted_data = self._extract_invoice_data(ocr_result, record=record)
         return {
             "extracted_data": extracted_data,
-            "confidence_score": confidence_score,
+            "confidence_score": self._calculate_confidence(extracted_data),
+            "field_confidence": self._field_confidence(extracted_data, ocr_result),
         }
     
-    def _extract_invoice_data(self, ocr_result: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def extract_with_template(
+        self, ocr_result: Union[OcrBlocks, List[Dict[str, Any]]], vendor_match: VendorMatch
+    ) -> Dict[str, Any]:
+        """
+        Extract invoice data using the field values read by a vendor template.
+        
+        The generic patterns only run when the template could not read one
+        of its fields or has no position for one (none of the results it
+        was learned from had it), and only fill in those fields. Line items
+        are not part of templates and are always extracted generically.
+        
+        Args:
+            ocr_result: OCR blocks of the whole document
+            vendor_match: The matched template and the values it read
+            
+        Returns:
+            Same as extract_data, plus the template that was used and the
+            fields that fell back to the generic patterns
+        """
+        ocr_result = OcrBlocks.coerce(ocr_result)
+        extracted_data = {
+            "invoice_number": None,
+            "vendor_name": vendor_match.vendor_name,
+            "invoice_date": None,
+            "due_date": None,
+            "total_amount": None,
+            "line_items": []
+        }
+        extracted_data.update(vendor_match.fields)
+        
+        fallback_fields = [field for field in TEMPLATE_FIELDS if vendor_match.fields.get(field) is None]
+        if fallback_fields:
+            generic_data = self._extract_invoice_data(ocr_result, vendor_name=vendor_match.vendor_name)
+            for field in fallback_fields:
+                extracted_data[field] = generic_data[field]
+            extracted_data["line_items"] = generic_data["line_items"]
+        else:
+            self._extract_line_items(ocr_result, extracted_data)
+        
+        return {
+            "extracted_data": extracted_data,
+            "confidence_score": self._calculate_confidence(extracted_data),
+            "field_confidence": self._field_confidence(extracted_data, ocr_result),
+            "vendor_template": {
+                "id": vendor_match.template_id,
+                "vendor_name": vendor_match.vendor_name,
+                "score": round(vendor_match.score, 3),
+                "fallback_fields": fallback_fields,
+            },
+        }
+    
+    def extract_with_model(
+        self,
+        ocr_result: Union[OcrBlocks, List[Dict[str, Any]]],
+        extractor: Optional[LayoutModelExtractor] = None,
+    ) -> Dict[str, Any]:
+        """
+        Extract invoice data with the layout model backend.
+        
+        Fields the model tags take precedence over the generic patterns,
+        which fill in the rest along with the line items. When the model
+        fails, the result is the generic extraction alone.
+        
+        Args:
+            ocr_result: OCR blocks of the whole document
+            extractor: Model backend to use instead of the configured one
+            
+        Returns:
+            Same as extract_data, plus the model score of each field it
+            found and the fields that fell back to the generic patterns
+        """
+        ocr_result = OcrBlocks.coerce(ocr_result)
+        try:
+            model_fields = (extractor or layout_extractor).extract(ocr_result)
+        except Exception as e:
+            logger.error(f"Error running the extraction model, using the generic patterns: {e}")
+            model_fields = {}
+        
+        vendor = model_fields.get("vendor_name")
+        extracted_data = self._extract_invoice_data(ocr_result, vendor_name=vendor[0] if vendor else None)
+        for field, (value, _) in model_fields.items():
+            extracted_data[field] = value
+        
+        return {
+            "extracted_data": extracted_data,
+            "confidence_score": self._calculate_confidence(extracted_data),
+            "field_confidence": self._field_confidence(extracted_data, ocr_result),
+            "layout_model": {
+                "fields": {field: round(score, 3) for field, (_, score) in model_fields.items()},
+                "fallback_fields": [
+                    field for field in ("invoice_number", "vendor_name", "invoice_date", "due_date", "total_amount")
+                    if field not in model_fields
+                ],
+            },
+        }
+    
+    def _extract_invoice_data(
+        self, ocr_result: OcrBlocks, vendor_name: Optional[str] = None, record: bool = True
+    ) -> Dict[str, Any]:
         """
         Extract structured invoice data from OCR results.
         
         Args:
             ocr_result: Raw OCR results
+            vendor_name: Vendor of the document when already known from its
+                template; otherwise the extracted vendor name is used to
+                pick the vendor's pattern order for the other fields
+            record: Count the document in the field pattern statistics
             
         Returns:
             Dict containing structured invoice data
         """
-        # Collect all text from OCR result
-        text_blocks = [item["text"] for item in ocr_result]
-        full_text = " ".join(text_blocks)
+        # All text from OCR result, already joined in the block text buffer
+        full_text = ocr_result.text
         
         # Initialize extracted data with None values
         extracted_data = {
@@ -164,100 +336,56 @@ class AIService:
             "line_items": []
         }
         
-        # Extract invoice number
-        invoice_number_patterns = [
-            r"invoice\s*#?\s*(\w+[-/]?\w+)",
-            r"invoice\s*number\s*:?\s*(\w+[-/]?\w+)",
-            r"inv\s*#?\s*(\w+[-/]?\w+)",
-            r"invoice\s*no\.?\s*:?\s*(\w+[-/]?\w+)",
-            r"\b(inv-\w+)\b"
-        ]
-        for pattern in invoice_number_patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE)
-            if match:
-                extracted_data["invoice_number"] = match.group(1).strip()
-                break
+        # Values printed beside or under their own label block come first,
+        # since joining the blocks' text mixes up the columns of the page
+        index = SpatialIndex(ocr_result)
+        labelled = self._extract_labelled_values(ocr_result, index)
         
-        # Extract vendor name - improved approach with position analysis
-        vendor_name_patterns = [
-            r"from:\s*([A-Za-z0-9\s,.]+)",
-            r"vendor:\s*([A-Za-z0-9\s,.]+)",
-            r"supplier:\s*([A-Za-z0-9\s,.]+)",
-            r"bill\s+from\s*:?\s*([A-Za-z0-9\s,.]+)"
-        ]
+        # Keyword positions are looked up once and shared by all field patterns
+        scan = invoice_scanner.scan(full_text, record=record)
+        if vendor_name:
+            # Every pattern, the vendor name ones included, counts for the known vendor
+            scan.set_vendor(vendor_name)
         
-        for pattern in vendor_name_patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE)
-            if match:
-                extracted_data["vendor_name"] = match.group(1).strip()
-                break
+        # Extract vendor name - improved approach with position analysis
+        match = scan.first("vendor_name") if "vendor_name" not in labelled else None
+        if "vendor_name" in labelled:
+            extracted_data["vendor_name"] = labelled["vendor_name"]
+        elif match:
+            extracted_data["vendor_name"] = match.group(1).strip()
         
         # Fallback vendor extraction - look for text at top of document
         if not extracted_data["vendor_name"]:
-            # Sort blocks by vertical position (y-coordinate)
-            sorted_blocks = sorted(ocr_result, key=lambda x: x.get("position", [[0, 0]])[0][1] if x.get("position") else 0)
-            
-            # Take the first few blocks (likely header/company name)
-            top_blocks = sorted_blocks[:3]
-            for block in top_blocks:
-                text = block.get("text", "")
+            # Take the first few blocks (likely header/company name) of the first page
+            top_blocks = ocr_result.take(index.topmost(3))
+            for text in top_blocks.texts:
                 # Avoid simple labels and look for business name patterns
                 if len(text) > 5 and not re.match(r"^(invoice|statement|bill|receipt)$", text, re.IGNORECASE):
                     extracted_data["vendor_name"] = text.strip()
                     break
         
-        # Extract dates with improved patterns
-        date_patterns = [
-            r"(?:invoice|document)\s*date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"issued\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"date\s*of\s*invoice\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{4})\b"  # Generic date pattern as fallback
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE)
-            if match:
-                extracted_data["invoice_date"] = match.group(1).strip()
-                break
-        
-        # Extract due date with improved patterns
-        due_date_patterns = [
-            r"due\s*date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"payment\s*due\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"due\s*by\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"due\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"pay\s*by\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})"
-        ]
-        
-        for pattern in due_date_patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE)
+        if not vendor_name:
+            # Count the patterns for the extracted vendor, the vendor name ones
+            # already tried included, and try the rest in its pattern order
+            scan.set_vendor(extracted_data["vendor_name"])
+        
+        # Extract invoice number and dates with improved patterns
+        for field in ("invoice_number", "invoice_date", "due_date"):
+            if field in labelled:
+                extracted_data[field] = labelled[field]
+                continue
+            match = scan.first(field)
             if match:
-                extracted_data["due_date"] = match.group(1).strip()
-                break
+                extracted_data[field] = match.group(1).strip()
         
         # Extract total amount with improved patterns
-        amount_patterns = [
-            r"total\s*:?\s*\$?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"amount\s*due\s*:?\s*\$?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"total\s*amount\s*:?\s*\$?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"balance\s*due\s*:?\s*\$?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"total\s*due\s*:?\s*\$?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"to\s*pay\s*:?\s*\$?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)"  # Generic amount pattern
-        ]
-        
-        for pattern in amount_patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE)
-            if match:
-                amount_str = match.group(1).strip()
-                # Remove commas and convert to float
-                amount_str = amount_str.replace(',', '')
-                try:
-                    extracted_data["total_amount"] = float(amount_str)
-                    break
-                except ValueError:
-                    continue
+        amounts = [labelled["total_amount"]] if "total_amount" in labelled else []
+        amounts += (match.group(1) for match in scan.matches("total_amount"))
+        for amount_str in amounts:
+            amount = parse_amount(amount_str)
+            if amount is not None:
+                extracted_data["total_amount"] = amount
+                break
         
         # Extract line items (simplified approach)
         # This is a basic implementation that could be improved
@@ -265,47 +393,90 @@ class AIService:
         
         return extracted_data
     
-    def _extract_line_items(self, ocr_result: List[Dict[str, Any]], extracted_data: Dict[str, Any]) -> None:
+    def _extract_labelled_values(self, ocr_result: OcrBlocks, index: SpatialIndex) -> Dict[str, str]:
         """
-        Extract line items from the OCR result.
-        This is a simplified implementation.
+        Find field values printed in their own block next to a label block.
+        
+        Labels are blocks whose whole text is one of FIELD_LABELS, taken in
+        label priority and then reading order (for LAST_LABEL_FIELDS, the
+        lowest label first). The value is the nearest block to the right of
+        the label, or else below it, when its first line has the shape of
+        the field's value. Labels on a row with column headers of the item
+        table ("Date", "Total" above the items) are skipped.
+        
+        Args:
+            ocr_result: OCR blocks
+            index: Spatial index over the same blocks
+            
+        Returns:
+            The value text of each field that was found
         """
-        # TODO: Implement more sophisticated line item extraction
-        # For now, we'll just look for patterns that might represent line items
-        
-        # Convert all text to a string for processing
-        text_blocks = [item["text"] for item in ocr_result]
-        full_text = " ".join(text_blocks)
-        
-        # Look for a table-like section with amounts
-        lines = full_text.split('\n')
-        potential_items = []
-        
-        for line in lines:
-            # Look for lines that have a quantity, description and amount
-            # This is a simplified pattern and would need refinement for real-world use
-            if re.search(r'\d+\s+[A-Za-z0-9\s]+\s+\$?\d+\.\d{2}', line):
-                potential_items.append(line.strip())
-        
-        # Convert to structured items (very simplified)
-        for item in potential_items:
-            parts = item.split()
-            if len(parts) >= 3:
-                # Attempt to extract quantity, description, and amount
-                try:
-                    quantity = float(parts[0])
-                    amount_str = parts[-1].replace('$', '').replace(',', '')
-                    amount = float(amount_str)
-                    description = ' '.join(parts[1:-1])
-                    
-                    extracted_data["line_items"].append({
-                        "quantity": quantity,
-                        "description": description,
-                        "amount": amount
-                    })
-                except (ValueError, IndexError):
-                    # Skip lines that don't fit our expected format
-                    continue
+        texts = ocr_result.texts
+        bounds = index.bounds
+        candidates = np.array(
+            [i for i, text in enumerate(texts) if len(text) <= MAX_LABEL_LENGTH and ANY_LABEL.fullmatch(text.strip())],
+            dtype=np.int64,
+        )
+        # Reading order: page, then top, then left
+        candidates = candidates[
+            np.lexsort((bounds[candidates, 0], bounds[candidates, 1], ocr_result.pages[candidates]))
+        ]
+        candidates = [i for i in candidates.tolist() if not self._in_table_header(i, texts, index)]
+        
+        values = {}
+        for field, label_re in FIELD_LABELS.items():
+            labels = []
+            for i in candidates:
+                match = label_re.fullmatch(texts[i].strip())
+                if match:
+                    labels.append((match.lastindex, i))
+            if field in LAST_LABEL_FIELDS:
+                labels.reverse()
+            else:
+                # Stable, so labels of the same priority stay in reading order
+                labels.sort(key=lambda label: label[0])
+            
+            for _, i in labels:
+                height = bounds[i, 3] - bounds[i, 1]
+                for neighbour in (
+                    index.right_of(i, max_distance=MAX_VALUE_GAP_RIGHT * height),
+                    index.below(i, max_distance=MAX_VALUE_GAP_BELOW * height),
+                ):
+                    if neighbour is None:
+                        continue
+                    lines = texts[neighbour].strip().splitlines()
+                    match = FIELD_VALUES[field].fullmatch(lines[0].strip()) if lines else None
+                    if match:
+                        values[field] = match.group(1).strip()
+                        break
+                if field in values:
+                    break
+        return values
+    
+    def _in_table_header(self, label: int, texts: List[str], index: SpatialIndex) -> bool:
+        """Whether another block on a label block's line names a column of the item table."""
+        _, y0, _, y1 = index.bounds[label].tolist()
+        page_bounds = index.bounds
+        row = index.query(
+            float(page_bounds[:, 0].min()), y0, float(page_bounds[:, 2].max()), y1,
+            page=int(index.pages[label]),
+        )
+        for block in row.tolist():
+            if block == label:
+                continue
+            top, bottom = page_bounds[block, 1], page_bounds[block, 3]
+            text = texts[block].strip()
+            # Same line: the vertical centre within the label's height
+            if y0 <= (top + bottom) / 2 <= y1 and column_header_role(text) and not ANY_LABEL.fullmatch(text):
+                return True
+        return False
+    
+    def _extract_line_items(self, ocr_result: OcrBlocks, extracted_data: Dict[str, Any]) -> None:
+        """
+        Extract line items from the OCR result by rebuilding the item table
+        from block positions.
+        """
+        extracted_data["line_items"].extend(line_item_extractor.extract(ocr_result))
     
     def _calculate_confidence(self, extracted_data: Dict[str, Any]) -> float:
         """
@@ -340,6 +511,38 @@ class AIService:
         
         # Ensure confidence is between 0 and 1
         return max(0.0, min(base_confidence, 1.0))
+    
+    def _field_confidence(
+        self, extracted_data: Dict[str, Any], ocr_result: OcrBlocks
+    ) -> Dict[str, float]:
+        """
+        OCR confidence of each extracted field.
+        
+        A field gets the best confidence among the blocks containing its
+        value. Values that were matched across several blocks fall back to
+        the mean confidence of all blocks.
+        """
+        if not len(ocr_result):
+            return {}
+        
+        block_texts = list(zip(
+            [text.lower().replace(",", "") for text in ocr_result.texts],
+            ocr_result.confidences.tolist(),
+        ))
+        mean_confidence = float(np.mean(ocr_result.confidences))
+        
+        field_confidence = {}
+        for field, value in extracted_data.items():
+            if field == "line_items" or value is None:
+                continue
+            if isinstance(value, float):
+                # 1234.5 is printed as 1,234.50 on the invoice
+                value_text = f"{value:f}".rstrip("0").rstrip(".")
+            else:
+                value_text = str(value).lower().replace(",", "")
+            matches = [confidence for text, confidence in block_texts if value_text in text]
+            field_confidence[field] = float(max(matches)) if matches else float(mean_confidence)
+        return field_confidence
 
 
 ai_service = AIService()
\ No newline at end of file
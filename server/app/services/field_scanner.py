@@ -0,0 +1,362 @@
+# server/app/services/field_scanner.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from heapq import merge
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class FieldPattern:
+    """
+    A field pattern, with the keywords every match of it starts with.
+
+    A pattern without keywords can start anywhere and is searched for over
+    the whole text, so it should be a field's last resort. Consecutive
+    patterns of a field in the same group are alternative labels for the
+    value ("Amount Due", "Balance Due"), whose relative order does not
+    matter; adaptive ordering may try them in any order.
+    """
+    regex: str
+    keywords: Tuple[str, ...] = ()
+    group: Optional[str] = None
+    compiled: "re.Pattern" = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "compiled", re.compile(self.regex, re.IGNORECASE))
+
+
+_DATE = r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})"
+_AMOUNT = r"(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)"
+
+# Patterns of each invoice field, in priority order: the first pattern that
+# matches anywhere in the text gives the field its value. Patterns outside the
+# "label" groups keep their place: the invoice number patterns overlap ("inv"
+# also matches "invoice"), the bare "total" and "due" patterns also match
+# longer labels, and the generic fallbacks would win on almost any document.
+INVOICE_PATTERNS: Dict[str, List[FieldPattern]] = {
+    "invoice_number": [
+        FieldPattern(r"invoice\s*#?\s*(\w+[-/]?\w+)", ("invoice",)),
+        FieldPattern(r"invoice\s*number\s*:?\s*(\w+[-/]?\w+)", ("invoice",)),
+        FieldPattern(r"inv\s*#?\s*(\w+[-/]?\w+)", ("inv",)),
+        FieldPattern(r"invoice\s*no\.?\s*:?\s*(\w+[-/]?\w+)", ("invoice",)),
+        FieldPattern(r"\b(inv-\w+)\b", ("inv-",)),
+    ],
+    "vendor_name": [
+        FieldPattern(r"from:\s*([A-Za-z0-9\s,.]+)", ("from",), "label"),
+        FieldPattern(r"vendor:\s*([A-Za-z0-9\s,.]+)", ("vendor",), "label"),
+        FieldPattern(r"supplier:\s*([A-Za-z0-9\s,.]+)", ("supplier",), "label"),
+        FieldPattern(r"bill\s+from\s*:?\s*([A-Za-z0-9\s,.]+)", ("bill",), "label"),
+    ],
+    "invoice_date": [
+        FieldPattern(rf"(?:invoice|document)\s*date\s*:?\s*{_DATE}", ("invoice", "document")),
+        FieldPattern(rf"date\s*:?\s*{_DATE}", ("date",), "label"),
+        FieldPattern(rf"issued\s*:?\s*{_DATE}", ("issued",), "label"),
+        FieldPattern(rf"date\s*of\s*invoice\s*:?\s*{_DATE}", ("date",), "label"),
+        # Generic date pattern as fallback
+        FieldPattern(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{4})\b"),
+    ],
+    "due_date": [
+        FieldPattern(rf"due\s*date\s*:?\s*{_DATE}", ("due",), "label"),
+        FieldPattern(rf"payment\s*due\s*:?\s*{_DATE}", ("payment",), "label"),
+        FieldPattern(rf"due\s*by\s*:?\s*{_DATE}", ("due",), "label"),
+        FieldPattern(rf"due\s*:?\s*{_DATE}", ("due",)),
+        FieldPattern(rf"pay\s*by\s*:?\s*{_DATE}", ("pay",)),
+    ],
+    "total_amount": [
+        FieldPattern(rf"total\s*:?\s*\$?\s*{_AMOUNT}", ("total",)),
+        FieldPattern(rf"amount\s*due\s*:?\s*\$?\s*{_AMOUNT}", ("amount",), "label"),
+        FieldPattern(rf"total\s*amount\s*:?\s*\$?\s*{_AMOUNT}", ("total",), "label"),
+        FieldPattern(rf"balance\s*due\s*:?\s*\$?\s*{_AMOUNT}", ("balance",), "label"),
+        FieldPattern(rf"total\s*due\s*:?\s*\$?\s*{_AMOUNT}", ("total",), "label"),
+        FieldPattern(rf"to\s*pay\s*:?\s*\$?\s*{_AMOUNT}", ("to",), "label"),
+        # Generic amount pattern
+        FieldPattern(rf"\$\s*{_AMOUNT}", ("$",)),
+    ],
+}
+
+
+# Characters that case-insensitive regexes match to an ASCII letter but that
+# str.lower() does not turn into it (or turns into two characters)
+_CASE_EXCEPTIONS = ("\u0130", "\u0131", "\u017f")
+
+
+class FieldScan:
+    """
+    Keyword positions of one text, and the field matches found from them.
+
+    The text is lowercased once and each keyword is looked up with plain
+    substring search, only as far into the text as the patterns need it.
+    Positions are shared by every pattern starting with the same keyword,
+    and each pattern is matched at most once per text. Unless `record` is
+    off, the attempts are counted in the scanner's statistics.
+    """
+
+    def __init__(self, scanner: "FieldScanner", text: str, record: bool = True):
+        self._scanner = scanner
+        self.text = text
+        self.record = record
+        self.vendor: Optional[str] = None
+        # Lowercasing keeps offsets unless the text has one of the exceptions
+        self._lowered = None if any(char in text for char in _CASE_EXCEPTIONS) else text.lower()
+        self._positions: Dict[str, List[int]] = {}
+        self._exhausted: Dict[str, bool] = {}
+        self._matches: Dict[FieldPattern, Optional[re.Match]] = {}
+
+    def search(self, pattern: FieldPattern) -> Optional[re.Match]:
+        """Leftmost match of a pattern, the same as re.search over the text."""
+        if pattern in self._matches:
+            return self._matches[pattern]
+        start = time.perf_counter_ns()
+        match = None
+        if not pattern.keywords:
+            match = pattern.compiled.search(self.text)
+        else:
+            candidates = [self._occurrences(keyword) for keyword in pattern.keywords]
+            for pos in candidates[0] if len(candidates) == 1 else merge(*candidates):
+                match = pattern.compiled.match(self.text, pos)
+                if match:
+                    break
+        self._matches[pattern] = match
+        if self.record:
+            self._scanner.record(pattern, match is not None, time.perf_counter_ns() - start, self.vendor)
+        return match
+
+    def set_vendor(self, vendor_name: Optional[str]) -> None:
+        """
+        Count the scan as a document of a vendor, the patterns already tried
+        included, and use that vendor's pattern order for the rest. Call it
+        once per scan.
+        """
+        if self.record:
+            self.vendor = self._scanner.add_vendor_document(vendor_name, tried=self._matches)
+        else:
+            self.vendor = vendor_key(vendor_name)
+
+    def matches(self, field_name: str) -> Iterator[re.Match]:
+        """Matches of a field's patterns, in priority order."""
+        for pattern in self._scanner.ordered(field_name, self.vendor):
+            match = self.search(pattern)
+            if match:
+                yield match
+
+    def first(self, field_name: str) -> Optional[re.Match]:
+        """Match of the highest priority pattern of a field that matches."""
+        return next(self.matches(field_name), None)
+
+    def _occurrences(self, keyword: str) -> Iterator[int]:
+        """Start positions of a keyword in ascending order, found as they are needed."""
+        positions = self._positions.setdefault(keyword, [])
+        yield from positions
+        if self._exhausted.get(keyword):
+            return
+        start = positions[-1] + 1 if positions else 0
+        if self._lowered is not None:
+            find = self._lowered.find
+            pos = find(keyword, start)
+            while pos != -1:
+                positions.append(pos)
+                yield pos
+                pos = find(keyword, pos + 1)
+        else:
+            keyword_re = self._scanner.keyword_patterns[keyword]
+            pos = start
+            while True:
+                found = keyword_re.search(self.text, pos)
+                if not found:
+                    break
+                positions.append(found.start())
+                yield found.start()
+                pos = found.start() + 1
+        self._exhausted[keyword] = True
+
+
+@dataclass
+class _VendorProfile:
+    """Attempts and hits of each pattern on the documents of one vendor."""
+    documents: int = 0
+    counts: Dict[FieldPattern, List[int]] = field(default_factory=dict)
+
+
+class FieldScanner:
+    """
+    Finds field values with prioritised regex patterns.
+
+    Every pattern is anchored on the keywords its matches start with, like
+    "invoice", "total" or "due". Instead of each pattern walking the text
+    with the regex engine, a scan looks the keywords up in a lowercased copy
+    of the text and only runs a pattern where one of its keywords occurs.
+    Patterns whose labels never occur cost one substring search, and
+    patterns sharing a label share its positions.
+
+    Attempts, hits and time are counted for every pattern, overall and per
+    vendor. With adaptive ordering, the patterns of a group are tried in
+    order of their hit rate on the vendor's earlier documents once the
+    vendor has min_documents of them.
+    """
+
+    # Vendors whose pattern counts are kept, least recently seen dropped first
+    MAX_VENDOR_PROFILES = 1000
+
+    def __init__(self, patterns: Dict[str, List[FieldPattern]], adaptive: bool = False, min_documents: int = 20):
+        self.patterns = patterns
+        self.adaptive = adaptive
+        self.min_documents = min_documents
+        keywords = {keyword for field_patterns in patterns.values() for p in field_patterns for keyword in p.keywords}
+        if any(keyword != keyword.lower() for keyword in keywords):
+            raise ValueError("Field pattern keywords must be lowercase")
+        for field_name, field_patterns in patterns.items():
+            groups = [key for key, _ in groupby(p.group for p in field_patterns) if key is not None]
+            if len(groups) != len(set(groups)):
+                raise ValueError(f"Pattern groups of {field_name} must be consecutive")
+        # Used instead of substring search on texts that lowercasing would shift
+        self.keyword_patterns = {keyword: re.compile(re.escape(keyword), re.IGNORECASE) for keyword in keywords}
+
+        self._lock = threading.Lock()
+        self._scans = 0
+        # Attempts, hits and nanoseconds spent per pattern
+        self._counts = {p: [0, 0, 0] for field_patterns in patterns.values() for p in field_patterns}
+        self._vendors: "OrderedDict[str, _VendorProfile]" = OrderedDict()
+
+    def scan(self, text: str, record: bool = True) -> FieldScan:
+        """
+        Start a scan of a text; keyword positions are found as fields are read.
+        Without `record`, the scan uses the vendors' pattern orders but
+        counts nothing, for extractions repeated on the same document.
+        """
+        if record:
+            with self._lock:
+                self._scans += 1
+        return FieldScan(self, text, record)
+
+    def extract(self, text: str) -> Dict[str, Optional[str]]:
+        """First group of the highest priority match of every field."""
+        scan = self.scan(text)
+        values = {}
+        for field_name in self.patterns:
+            match = scan.first(field_name)
+            values[field_name] = match.group(1).strip() if match else None
+        return values
+
+    def record(self, pattern: FieldPattern, hit: bool, elapsed_ns: int, vendor: Optional[str] = None) -> None:
+        """Count an attempt of a pattern."""
+        with self._lock:
+            counts = self._counts[pattern]
+            counts[0] += 1
+            counts[1] += hit
+            counts[2] += elapsed_ns
+            profile = self._vendors.get(vendor) if vendor is not None else None
+            if profile is not None:
+                vendor_counts = profile.counts.setdefault(pattern, [0, 0])
+                vendor_counts[0] += 1
+                vendor_counts[1] += hit
+
+    def add_vendor_document(
+        self, vendor_name: Optional[str], tried: Optional[Dict[FieldPattern, Optional[re.Match]]] = None
+    ) -> Optional[str]:
+        """
+        Count a document of a vendor and return the vendor's key. `tried`
+        holds the patterns the document's scan ran before its vendor was
+        known (the vendor name patterns), with their matches, to count them
+        for the vendor too.
+        """
+        vendor = vendor_key(vendor_name)
+        if vendor is None:
+            return None
+        with self._lock:
+            profile = self._vendors.get(vendor)
+            if profile is None:
+                profile = self._vendors[vendor] = _VendorProfile()
+                if len(self._vendors) > self.MAX_VENDOR_PROFILES:
+                    self._vendors.popitem(last=False)
+            else:
+                self._vendors.move_to_end(vendor)
+            profile.documents += 1
+            for pattern, match in (tried or {}).items():
+                vendor_counts = profile.counts.setdefault(pattern, [0, 0])
+                vendor_counts[0] += 1
+                vendor_counts[1] += match is not None
+        return vendor
+
+    def ordered(self, field_name: str, vendor: Optional[str] = None) -> List[FieldPattern]:
+        """A field's patterns in the order to try them for a vendor's document."""
+        patterns = self.patterns[field_name]
+        if not self.adaptive or vendor is None:
+            return patterns
+        with self._lock:
+            profile = self._vendors.get(vendor)
+            if profile is None or profile.documents < self.min_documents:
+                return patterns
+            rates = {
+                p: counts[1] / counts[0] for p, counts in profile.counts.items() if counts[0]
+            }
+        ordered = []
+        for _, group in groupby(patterns, key=lambda p: p.group if p.group is not None else id(p)):
+            # Stable, so untried patterns and ties keep their place
+            ordered.extend(sorted(group, key=lambda p: -rates.get(p, 0.0)))
+        return ordered
+
+    def stats(self) -> Dict[str, Any]:
+        """Attempts, hits and time of each pattern, and the vendors whose order has adapted."""
+        with self._lock:
+            counts = {p: list(c) for p, c in self._counts.items()}
+            scans = self._scans
+            vendors = {
+                vendor: profile.documents
+                for vendor, profile in self._vendors.items()
+            }
+
+        fields = {}
+        for field_name, patterns in self.patterns.items():
+            fields[field_name] = [
+                {
+                    "index": index,
+                    "pattern": p.regex,
+                    "group": p.group,
+                    "attempts": counts[p][0],
+                    "hits": counts[p][1],
+                    "hit_rate": counts[p][1] / counts[p][0] if counts[p][0] else 0.0,
+                    "time_ms": round(counts[p][2] / 1e6, 3),
+                }
+                for index, p in enumerate(patterns)
+            ]
+
+        adapted = {}
+        if self.adaptive:
+            for vendor, documents in vendors.items():
+                if documents < self.min_documents:
+                    continue
+                orders = {}
+                for field_name, patterns in self.patterns.items():
+                    order = [patterns.index(p) for p in self.ordered(field_name, vendor)]
+                    if order != sorted(order):
+                        orders[field_name] = order
+                adapted[vendor] = {"documents": documents, "order": orders}
+
+        return {
+            "adaptive": self.adaptive,
+            "min_documents": self.min_documents,
+            "scans": scans,
+            "vendors": len(vendors),
+            "fields": fields,
+            "adapted_vendors": adapted,
+        }
+
+
+def vendor_key(vendor_name: Optional[str]) -> Optional[str]:
+    """The key a vendor's pattern counts are kept under: its name lowercased with single spaces."""
+    vendor = " ".join(vendor_name.lower().split()) if vendor_name else ""
+    return vendor or None
+
+
+# Create a singleton instance
+invoice_scanner = FieldScanner(
+    INVOICE_PATTERNS,
+    adaptive=settings.EXTRACTION_ADAPTIVE_PATTERN_ORDER,
+    min_documents=settings.EXTRACTION_ADAPTIVE_MIN_DOCUMENTS,
+)
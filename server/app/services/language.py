@@ -0,0 +1,75 @@
+# server/app/services/language.py
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, Optional
+
+# Common words of each language, with invoice vocabulary, written without accents
+# because OCR with another language's model often drops them
+STOPWORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset(
+        "the and of to for with from this that you your our please thank is are be "
+        "invoice bill ship due amount quantity description price tax payment terms "
+        "number balance order customer paid net unit each".split()
+    ),
+    "es": frozenset(
+        "el la los las del y para con por que una uno su sus es son al se "
+        "factura fecha vencimiento importe cantidad descripcion precio iva pago "
+        "numero saldo pedido cliente unitario condiciones gracias envio".split()
+    ),
+    "fr": frozenset(
+        "le les des du et pour avec par que une un sur est sont au aux ce "
+        "facture echeance montant quantite prix tva paiement numero solde commande "
+        "unitaire conditions merci livraison reglement ht ttc".split()
+    ),
+}
+
+# Detection needs at least this many stopword hits for the winning language...
+MIN_HITS = 3
+# ...and this many times the hits of the runner-up
+MIN_MARGIN = 1.5
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _words(text: str) -> Iterable[str]:
+    """Lowercase words with accents stripped."""
+    folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    return _WORD_RE.findall(folded)
+
+
+def detect_language(text: str, languages: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Guess the language of a document's text from stopword counts.
+
+    Words that are stopwords in more than one candidate language (such as
+    "la" or "total") are ignored.
+
+    Args:
+        text: Text layer or first-pass OCR text
+        languages: Candidate language codes, defaults to every language with a stopword list
+
+    Returns:
+        The language code, or None when the text is too short or too mixed to tell
+    """
+    candidates = [lang for lang in (languages or STOPWORDS) if lang in STOPWORDS]
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0]
+
+    shared = Counter(word for lang in candidates for word in STOPWORDS[lang])
+    distinctive = {lang: {word for word in STOPWORDS[lang] if shared[word] == 1} for lang in candidates}
+
+    hits = Counter()
+    for word in _words(text):
+        for lang in candidates:
+            if word in distinctive[lang]:
+                hits[lang] += 1
+
+    ranked = hits.most_common(2)
+    if not ranked or ranked[0][1] < MIN_HITS:
+        return None
+    if len(ranked) > 1 and ranked[0][1] < MIN_MARGIN * ranked[1][1]:
+        return None
+    return ranked[0][0]
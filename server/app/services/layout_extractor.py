@@ -0,0 +1,380 @@
+# server/app/services/layout_extractor.py
+import inspect
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.ocr_blocks import OcrBlocks
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fields the model tags, as the suffixes of its BIO labels (B-INVOICE_NUMBER, I-INVOICE_NUMBER, ...)
+MODEL_FIELDS = ["invoice_number", "vendor_name", "invoice_date", "due_date", "total_amount"]
+MODEL_LABELS = ["O"] + [f"{prefix}-{field.upper()}" for field in MODEL_FIELDS for prefix in ("B", "I")]
+# LayoutLM boxes are on a 0-1000 grid over the page
+BOX_SCALE = 1000
+
+
+class _Window(NamedTuple):
+    input_ids: List[int]
+    boxes: List[List[int]]
+    future: Future
+
+
+class LayoutModelExtractor:
+    """
+    Optional extraction backend running a small LayoutLM token
+    classification model on CPU.
+
+    The words of the OCR blocks go in with their boxes, and every word is
+    tagged with one of MODEL_LABELS; the best scoring run of words per field
+    is its value. The model and tokenizer are loaded from a local directory
+    only, the model's linear layers are quantized to int8, and PyTorch runs
+    on a fixed number of threads.
+
+    Documents are tokenized on the calling thread and cut into windows of
+    `max_tokens`. The windows of all documents being extracted at the same
+    time are collected into batches of up to `batch_size`, waiting at most
+    `max_wait_ms` after the first one, and run through the model on a single
+    inference thread, the same way the OCR batch server handles pages.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str],
+        quantize: bool = True,
+        threads: int = 1,
+        batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        max_tokens: int = 512,
+    ):
+        self.model_path = model_path
+        self.quantize = quantize
+        self.threads = max(1, threads)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_tokens = max(8, max_tokens)
+
+        self._model = None
+        self._tokenizer = None
+        self._takes_boxes = False
+        self._field_labels: Dict[int, Tuple[str, str]] = {}
+        self._load_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[_Window]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"documents": 0, "batches": 0, "windows": 0, "tokens": 0, "busy_time": 0.0}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> None:
+        """Load the tokenizer and the (quantized) model, once."""
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is not None:
+                return
+            if not self.model_path or not os.path.isdir(self.model_path):
+                raise ValueError(f"Extraction model directory not found: {self.model_path}")
+            start = time.time()
+            try:
+                import torch
+                from transformers import AutoModelForTokenClassification, AutoTokenizer
+            except ImportError as e:
+                raise ImportError("The layout_model extraction backend needs torch and transformers") from e
+
+            torch.set_num_threads(self.threads)
+            # Word ids of the tokens need a fast tokenizer
+            tokenizer = AutoTokenizer.from_pretrained(self.model_path, local_files_only=True, use_fast=True)
+            model = AutoModelForTokenClassification.from_pretrained(self.model_path, local_files_only=True)
+            model.eval()
+            if self.quantize:
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+            # Label id -> (B or I, field); labels of other fields count as outside
+            field_labels = {}
+            for label_id, label in model.config.id2label.items():
+                prefix, _, name = str(label).partition("-")
+                if prefix in ("B", "I") and name.lower() in MODEL_FIELDS:
+                    field_labels[int(label_id)] = (prefix, name.lower())
+            self._field_labels = field_labels
+            self._takes_boxes = "bbox" in inspect.signature(model.forward).parameters
+            self._tokenizer = tokenizer
+            self._model = model
+            logger.info(
+                f"Extraction model loaded from {self.model_path} in {time.time() - start:.2f} seconds "
+                f"(quantized: {self.quantize}, threads: {self.threads})"
+            )
+
+    def extract(self, blocks: OcrBlocks) -> Dict[str, Tuple[Any, float]]:
+        """
+        Tag the words of a document's OCR blocks.
+
+        Returns:
+            (value, score) of each field the model found, the score being the
+            mean label probability of the value's words. total_amount is a
+            float, the other values are text.
+        """
+        words, boxes = words_and_boxes(blocks)
+        if not words:
+            return {}
+        self.load()
+
+        encoding = self._tokenizer(words, is_split_into_words=True, add_special_tokens=False)
+        token_ids = encoding["input_ids"]
+        word_ids = encoding.word_ids()
+        token_boxes = [boxes[word] for word in word_ids]
+
+        # Windows of the token sequence between the special tokens
+        tokenizer = self._tokenizer
+        span = self.max_tokens - 2
+        futures = []
+        for start in range(0, len(token_ids), span):
+            ids = [tokenizer.cls_token_id] + token_ids[start:start + span] + [tokenizer.sep_token_id]
+            window_boxes = [[0, 0, 0, 0]] + token_boxes[start:start + span] + [[BOX_SCALE] * 4]
+            futures.append(self._submit(ids, window_boxes))
+        # Label probabilities of every token, without the special tokens
+        probabilities = np.concatenate([future.result()[1:-1] for future in futures])
+
+        with self._stats_lock:
+            self._stats["documents"] += 1
+        return self._decode(words, word_ids, probabilities)
+
+    def stop(self) -> None:
+        """Stop the inference thread after the queued windows are done."""
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters and the throughput of the inference thread."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = stats["windows"] / stats["batches"] if stats["batches"] else 0.0
+        stats["tokens_per_sec"] = stats["tokens"] / stats["busy_time"] if stats["busy_time"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        stats["loaded"] = self.is_loaded
+        stats["quantized"] = self.quantize
+        stats["threads"] = self.threads
+        return stats
+
+    def _decode(
+        self, words: List[str], word_ids: List[Optional[int]], probabilities: np.ndarray
+    ) -> Dict[str, Tuple[Any, float]]:
+        """The best scoring run of words per field, each word labelled by its first token."""
+        labels = probabilities.argmax(axis=1)
+        scores = probabilities.max(axis=1)
+        spans: List[Tuple[str, List[int], List[float]]] = []
+        current = None
+        previous_word = None
+        for token, word in enumerate(word_ids):
+            if word is None or word == previous_word:
+                continue
+            previous_word = word
+            tag = self._field_labels.get(int(labels[token]))
+            if tag is None:
+                current = None
+                continue
+            prefix, field = tag
+            if current is None or prefix == "B" or current[0] != field:
+                current = (field, [], [])
+                spans.append(current)
+            current[1].append(word)
+            current[2].append(float(scores[token]))
+
+        values: Dict[str, Tuple[Any, float]] = {}
+        for field, span_words, span_scores in spans:
+            score = sum(span_scores) / len(span_scores)
+            value: Any = " ".join(words[word] for word in span_words)
+            if field == "total_amount":
+                try:
+                    value = float(value.replace("$", "").replace(",", "").replace(" ", ""))
+                except ValueError:
+                    continue
+            if field not in values or score > values[field][1]:
+                values[field] = (value, score)
+        return values
+
+    def _submit(self, input_ids: List[int], boxes: List[List[int]]) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(_Window(input_ids, boxes, future))
+        return future
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._serve, name="extraction-model", daemon=True)
+                    self._thread.start()
+                    logger.info(
+                        f"Extraction model batching started (batch size {self.batch_size}, "
+                        f"max wait {self.max_wait * 1000:.0f} ms)"
+                    )
+
+    def _serve(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            if batch:
+                self._run_batch(batch)
+
+    def _collect_batch(self) -> Optional[List[_Window]]:
+        """Block for the first window, then gather more until the batch is full or the deadline passes."""
+        window = self._queue.get()
+        if window is None:
+            return None
+
+        batch = [window]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                window = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if window is None:
+                # Finish this batch, then let the serve loop see the stop signal
+                self._queue.put(None)
+                break
+            batch.append(window)
+
+        # Skip callers that gave up while waiting
+        return [window for window in batch if window.future.set_running_or_notify_cancel()]
+
+    def _run_batch(self, batch: List[_Window]) -> None:
+        start = time.perf_counter()
+        try:
+            probabilities = self._forward(batch)
+        except Exception as e:
+            logger.error(f"Error running extraction model batch of {len(batch)} windows: {e}")
+            for window in batch:
+                window.future.set_exception(e)
+            return
+
+        for window, window_probabilities in zip(batch, probabilities):
+            window.future.set_result(window_probabilities)
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["windows"] += len(batch)
+            self._stats["tokens"] += sum(len(window.input_ids) for window in batch)
+            self._stats["busy_time"] += time.perf_counter() - start
+
+    def _forward(self, batch: List[_Window]) -> List[np.ndarray]:
+        """Label probabilities of each window's tokens, from one padded forward pass."""
+        import torch
+
+        length = max(len(window.input_ids) for window in batch)
+        pad_id = self._tokenizer.pad_token_id or 0
+        input_ids = torch.full((len(batch), length), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), length), dtype=torch.long)
+        bbox = torch.zeros((len(batch), length, 4), dtype=torch.long)
+        for row, window in enumerate(batch):
+            size = len(window.input_ids)
+            input_ids[row, :size] = torch.tensor(window.input_ids, dtype=torch.long)
+            attention_mask[row, :size] = 1
+            bbox[row, :size] = torch.tensor(window.boxes, dtype=torch.long)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if self._takes_boxes:
+            inputs["bbox"] = bbox
+        with torch.inference_mode():
+            logits = self._model(**inputs).logits
+        probabilities = torch.softmax(logits.float(), dim=-1).numpy()
+        return [probabilities[row, :len(window.input_ids)] for row, window in enumerate(batch)]
+
+
+def words_and_boxes(blocks: OcrBlocks) -> Tuple[List[str], List[List[int]]]:
+    """
+    The whitespace separated words of the blocks in reading order, each with
+    a box on the 0-1000 grid of its page.
+
+    OCR only boxes whole lines, so a word's box is the slice of its line's
+    box in proportion to the characters before and in it. Pages are scaled
+    by the extent of their blocks.
+    """
+    if not len(blocks):
+        return [], []
+    blocks = blocks.sort_reading_order()
+    bounds = blocks.bounds().astype(np.float64)
+    pages = blocks.pages
+    words: List[str] = []
+    boxes: List[List[int]] = []
+    for page in np.unique(pages).tolist():
+        indices = np.flatnonzero(pages == page)
+        extent = np.maximum(bounds[indices, 2:].max(axis=0), 1.0)
+        scale = np.array([BOX_SCALE / extent[0], BOX_SCALE / extent[1]])
+        for index in indices.tolist():
+            x0, y0, x1, y1 = bounds[index].tolist()
+            for line_number, line in enumerate(blocks.texts[index].split("\n")):
+                length = max(len(line), 1)
+                position = 0
+                for word in line.split():
+                    start = line.index(word, position)
+                    position = start + len(word)
+                    wx0 = x0 + (x1 - x0) * start / length
+                    wx1 = x0 + (x1 - x0) * position / length
+                    box = np.array([wx0 * scale[0], y0 * scale[1], wx1 * scale[0], y1 * scale[1]])
+                    words.append(word)
+                    boxes.append(np.clip(np.round(box), 0, BOX_SCALE).astype(int).tolist())
+    return words, boxes
+
+
+def save_random_model(path: str, hidden_size: int = 32, layers: int = 2) -> None:
+    """
+    Write a tiny randomly initialized LayoutLM model with MODEL_LABELS and a
+    character-level tokenizer to a directory, for trying the backend out
+    without downloading or training anything. Its tags are meaningless.
+    """
+    from transformers import BertTokenizerFast, LayoutLMConfig, LayoutLMForTokenClassification
+
+    os.makedirs(path, exist_ok=True)
+    characters = [chr(code) for code in range(33, 127)]
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + characters + [f"##{c}" for c in characters]
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab) + "\n")
+    BertTokenizerFast(vocab_file=vocab_file, do_lower_case=False).save_pretrained(path)
+
+    config = LayoutLMConfig(
+        vocab_size=len(vocab),
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=2,
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=512,
+        id2label=dict(enumerate(MODEL_LABELS)),
+        label2id={label: i for i, label in enumerate(MODEL_LABELS)},
+    )
+    LayoutLMForTokenClassification(config).save_pretrained(path)
+
+
+# Create a singleton instance
+layout_extractor = LayoutModelExtractor(
+    settings.EXTRACTION_MODEL_PATH,
+    quantize=settings.EXTRACTION_MODEL_QUANTIZE,
+    threads=settings.EXTRACTION_MODEL_THREADS,
+    batch_size=settings.EXTRACTION_MODEL_BATCH_SIZE,
+    max_wait_ms=settings.EXTRACTION_MODEL_BATCH_MAX_WAIT_MS,
+    max_tokens=settings.EXTRACTION_MODEL_MAX_TOKENS,
+)
@@ -0,0 +1,359 @@
+# server/app/services/line_items.py
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.normalization import parse_amount
+from app.services.ocr_blocks import OcrBlocks
+
+# Blocks whose centres are closer than this many line heights are on one row
+ROW_TOLERANCE = 0.5
+# Numbers whose right edges (text: left edges) are closer than this many line
+# heights are in one column
+COLUMN_TOLERANCE = 1.5
+# A row of description text only is a wrapped description when it starts
+# within this many line heights below the item row...
+CONTINUATION_GAP = 1.6
+# ...up to this many rows per item
+MAX_CONTINUATION_ROWS = 2
+# Header rows are looked for this many rows above the first item row
+HEADER_SEARCH_ROWS = 4
+# Longest cell text taken for a totals label such as "Sales Tax (8.25%)"
+MAX_TOTALS_LABEL_LENGTH = 24
+# Share of item rows where quantity x unit price has to equal the amount for
+# two columns to be taken as quantity and unit price
+PRODUCT_MATCH_SHARE = 0.6
+
+_AMOUNT_RE = re.compile(r"\(?-?\$?\s*-?(?:\d{1,3}(?:,\d{3})+|\d*)\.\d{2}\)?")
+_NUMBER_RE = re.compile(r"-?\$?\s*(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?")
+_LETTERS_RE = re.compile(r"[A-Za-z]{2,}")
+_HEADER_ROLES = {
+    # "Unit Price" and "Unit Cost" name the price, not the number of units
+    "quantity": re.compile(
+        r"(?:qty|quantity|qty\.?\s*shipped|shipped|units?(?!\s*(?:price|cost))|hours|hrs)\b", re.IGNORECASE
+    ),
+    "description": re.compile(r"(?:description|item|product|service|details|particulars)\b", re.IGNORECASE),
+    "unit_price": re.compile(r"(?:unit\s*price|price|rate|unit\s*cost|each)\b", re.IGNORECASE),
+    "amount": re.compile(r"(?:amount|line\s*total|total|ext(?:ended)?\.?(?:\s*(?:price|amount))?|net)\b", re.IGNORECASE),
+}
+_TOTALS_RE = re.compile(
+    r"(?:sub\s*-?\s*total|total|tax|sales\s*tax|freight|shipping|balance|amount\s*due)\b", re.IGNORECASE
+)
+
+TEXT, NUMBER, AMOUNT, OTHER = 0, 1, 2, 3
+
+
+@dataclass
+class _Row:
+    """The cells of one table row, left to right, as block indices."""
+    cells: List[int]
+    top: float
+    bottom: float
+
+
+class LineItemExtractor:
+    """
+    Rebuilds line item tables from OCR blocks by position.
+
+    On each page, blocks are grouped into rows by clustering their vertical
+    centres, and rows holding a money amount and some text are item rows.
+    The numbers of the item rows are clustered into columns by their right
+    edges and the texts by their left edges. A header row above the items
+    names the columns when there is one; otherwise the amount is the
+    rightmost money column, and quantity and unit price are the two
+    numeric columns whose product gives the amount. The description is the
+    text column holding the most text, with wrapped lines below an item
+    appended to it.
+
+    Sorting and clustering are NumPy operations over all blocks of a page,
+    so a page with hundreds of rows costs little more than one with ten.
+    """
+
+    def extract(self, blocks: OcrBlocks) -> List[Dict[str, Any]]:
+        """Line items of all pages, as {"quantity", "description", "amount"} dicts."""
+        if not len(blocks):
+            return []
+        texts = [text.strip() for text in blocks.texts]
+        kinds = np.fromiter((_kind(text) for text in texts), dtype=np.int8, count=len(texts))
+        bounds = blocks.bounds().astype(np.float64)
+        items = []
+        for page in np.unique(blocks.pages).tolist():
+            indices = np.flatnonzero(blocks.pages == page)
+            items.extend(self._page_items(texts, kinds, bounds, indices))
+        return items
+
+    def _page_items(
+        self, texts: List[str], kinds: np.ndarray, bounds: np.ndarray, indices: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        heights = bounds[indices, 3] - bounds[indices, 1]
+        line_height = max(float(np.median(heights)), 1.0)
+        rows = _cluster_rows(bounds, indices, line_height)
+
+        # Item rows: a money amount and some text, above the totals
+        item_rows = []
+        for number, row in enumerate(rows):
+            row_kinds = kinds[row.cells]
+            if (row_kinds == TEXT).any() and (row_kinds == AMOUNT).any():
+                if any(_is_totals_label(texts[cell]) for cell in row.cells if kinds[cell] == TEXT):
+                    if item_rows:
+                        break
+                    continue
+                item_rows.append(number)
+        if not item_rows:
+            return []
+
+        header = _find_header(rows, item_rows[0], texts)
+        columns = _cluster_columns(rows, item_rows, kinds, bounds, line_height)
+        roles = _assign_roles(columns, rows, item_rows, header, texts, kinds, bounds)
+        if roles.get("amount") is None:
+            return []
+
+        items = []
+        description_column = roles.get("description")
+        item_row_set = set(item_rows)
+        last_row = None
+        continuations = 0
+        for number in range(item_rows[0], min(item_rows[-1] + MAX_CONTINUATION_ROWS + 1, len(rows))):
+            row = rows[number]
+            if number in item_row_set:
+                item = _read_item(number, row, columns, roles, texts)
+                if item is None:
+                    last_row = None
+                    continue
+                items.append(item)
+                last_row, continuations = row, 0
+            elif (
+                last_row is not None
+                and description_column is not None
+                and continuations < MAX_CONTINUATION_ROWS
+                and row.top - last_row.bottom <= CONTINUATION_GAP * line_height
+                and _is_continuation(row, columns[description_column], kinds, bounds, line_height)
+            ):
+                # A wrapped description
+                items[-1]["description"] = " ".join(
+                    [items[-1]["description"]] + [texts[cell] for cell in row.cells]
+                ).strip()
+                last_row, continuations = row, continuations + 1
+            else:
+                last_row = None
+        return items
+
+
+def column_header_role(text: str) -> Optional[str]:
+    """The item table column a header cell names ("quantity", "description", ...), or None."""
+    for role, pattern in _HEADER_ROLES.items():
+        if pattern.match(text):
+            return role
+    return None
+
+
+@dataclass
+class _Column:
+    """Cells of the item rows that line up, by row number."""
+    kind: int
+    anchor: float
+    left: float
+    right: float
+    cells: Dict[int, List[int]]
+
+
+def _kind(text: str) -> int:
+    if _AMOUNT_RE.fullmatch(text):
+        return AMOUNT
+    if _NUMBER_RE.fullmatch(text):
+        return NUMBER
+    if _LETTERS_RE.search(text):
+        return TEXT
+    return OTHER
+
+
+def _is_totals_label(text: str) -> bool:
+    # Short cells only, so descriptions such as "Total station rental" stay items
+    return len(text) <= MAX_TOTALS_LABEL_LENGTH and _TOTALS_RE.match(text) is not None
+
+
+def _cluster_rows(bounds: np.ndarray, indices: np.ndarray, line_height: float) -> List[_Row]:
+    """Rows of blocks, top to bottom, each left to right."""
+    centres = (bounds[indices, 1] + bounds[indices, 3]) / 2
+    order = np.argsort(centres, kind="stable")
+    row_ids = np.zeros(len(order), dtype=np.int64)
+    np.cumsum(np.diff(centres[order]) > ROW_TOLERANCE * line_height, out=row_ids[1:])
+    # Left to right within each row
+    order = order[np.lexsort((bounds[indices[order], 0], row_ids))]
+    cells = indices[order]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(row_ids)) + 1])
+    tops = np.minimum.reduceat(bounds[cells, 1], starts).tolist()
+    bottoms = np.maximum.reduceat(bounds[cells, 3], starts).tolist()
+    return [
+        _Row(cells=row_cells.tolist(), top=top, bottom=bottom)
+        for row_cells, top, bottom in zip(np.split(cells, starts[1:]), tops, bottoms)
+    ]
+
+
+def _cluster_columns(
+    rows: List[_Row], item_rows: List[int], kinds: np.ndarray, bounds: np.ndarray, line_height: float
+) -> List[_Column]:
+    """Columns of the item rows' cells: numbers by right edge, texts by left edge."""
+    columns = []
+    for kind_group in ((NUMBER, AMOUNT), (TEXT,)):
+        cells, numbers = [], []
+        for number in item_rows:
+            for cell in rows[number].cells:
+                if kinds[cell] in kind_group:
+                    cells.append(cell)
+                    numbers.append(number)
+        if not cells:
+            continue
+        cells = np.asarray(cells)
+        numbers = np.asarray(numbers)
+        anchors = bounds[cells, 2] if kind_group[0] == NUMBER else bounds[cells, 0]
+        order = np.argsort(anchors, kind="stable")
+        column_ids = np.zeros(len(order), dtype=np.int64)
+        np.cumsum(np.diff(anchors[order]) > COLUMN_TOLERANCE * line_height, out=column_ids[1:])
+        for column_cells in np.split(order, np.flatnonzero(np.diff(column_ids)) + 1):
+            by_row: Dict[int, List[int]] = {}
+            for position in column_cells.tolist():
+                by_row.setdefault(int(numbers[position]), []).append(int(cells[position]))
+            members = cells[column_cells]
+            column_kinds = kinds[members]
+            columns.append(_Column(
+                kind=AMOUNT if (column_kinds == AMOUNT).mean() >= 0.5 else int(kind_group[0]),
+                anchor=float(np.median(anchors[column_cells])),
+                left=float(bounds[members, 0].min()),
+                right=float(bounds[members, 2].max()),
+                cells=by_row,
+            ))
+    columns.sort(key=lambda column: (column.left + column.right) / 2)
+    return columns
+
+
+def _find_header(rows: List[_Row], first_item_row: int, texts: List[str]) -> Dict[str, int]:
+    """The header cells naming columns, by role, in the rows just above the items."""
+    for number in range(first_item_row - 1, max(first_item_row - 1 - HEADER_SEARCH_ROWS, -1), -1):
+        found = {}
+        for cell in rows[number].cells:
+            for role, pattern in _HEADER_ROLES.items():
+                if role not in found and pattern.match(texts[cell]):
+                    found[role] = cell
+                    break
+        if len(found) >= 2:
+            return found
+    return {}
+
+
+def _assign_roles(
+    columns: List[_Column],
+    rows: List[_Row],
+    item_rows: List[int],
+    header: Dict[str, int],
+    texts: List[str],
+    kinds: np.ndarray,
+    bounds: np.ndarray,
+) -> Dict[str, Optional[int]]:
+    """Column numbers of the quantity, description, unit price and amount."""
+    numeric = [i for i, column in enumerate(columns) if column.kind in (NUMBER, AMOUNT)]
+    text = [i for i, column in enumerate(columns) if column.kind == TEXT]
+    roles: Dict[str, Optional[int]] = {}
+
+    # Header cells name the column under them
+    for role, cell in header.items():
+        candidates = text if role == "description" else numeric
+        if not candidates:
+            continue
+        left, right = bounds[cell, 0], bounds[cell, 2]
+        overlapping = [i for i in candidates if columns[i].left <= right and columns[i].right >= left]
+        if overlapping:
+            centre = (left + right) / 2
+            roles[role] = min(overlapping, key=lambda i: abs((columns[i].left + columns[i].right) / 2 - centre))
+    if len(set(roles.values())) < len(roles):
+        # Two roles on one column: the header is not trustworthy
+        roles = {}
+
+    if roles.get("amount") is None:
+        amounts = [i for i in numeric if columns[i].kind == AMOUNT and len(columns[i].cells) * 2 >= len(item_rows)]
+        roles["amount"] = amounts[-1] if amounts else None
+    amount = roles["amount"]
+    if amount is None:
+        return roles
+
+    if roles.get("quantity") is None or roles.get("unit_price") is None:
+        pair = _product_columns(columns, numeric, amount, item_rows, texts)
+        if pair is not None:
+            roles.setdefault("quantity", pair[0])
+            roles.setdefault("unit_price", pair[1])
+    if roles.get("quantity") is None:
+        left_of_amount = [i for i in numeric if i < amount and i != roles.get("unit_price")]
+        roles["quantity"] = left_of_amount[0] if left_of_amount else None
+
+    if roles.get("description") is None and text:
+        # The text column holding the most letters
+        roles["description"] = max(
+            text, key=lambda i: sum(len(texts[cell]) for cells in columns[i].cells.values() for cell in cells)
+        )
+    return roles
+
+
+def _product_columns(
+    columns: List[_Column], numeric: List[int], amount: int, item_rows: List[int], texts: List[str]
+) -> Optional[tuple]:
+    """(quantity, unit price) columns whose product is the amount in most item rows."""
+    values = {i: {row: parse_amount(texts[cells[0]]) for row, cells in columns[i].cells.items()} for i in numeric}
+    amounts = values[amount]
+    best, best_share = None, PRODUCT_MATCH_SHARE
+    others = [i for i in numeric if i != amount]
+    for a in others:
+        for b in others:
+            if b <= a:
+                continue
+            matches = sum(
+                1 for row in item_rows
+                if amounts.get(row) is not None and values[a].get(row) is not None and values[b].get(row) is not None
+                and abs(values[a][row] * values[b][row] - amounts[row]) <= max(0.01, 0.005 * abs(amounts[row]))
+            )
+            share = matches / len(item_rows)
+            if share >= best_share:
+                best, best_share = (a, b), share
+    if best is None:
+        return None
+    a, b = best
+    # The quantity is the column with more whole numbers, or else the left one
+    whole = [sum(1 for value in values[i].values() if value is not None and float(value).is_integer()) for i in best]
+    return (b, a) if whole[1] > whole[0] else (a, b)
+
+
+def _read_item(
+    number: int, row: _Row, columns: List[_Column], roles: Dict[str, Optional[int]], texts: List[str]
+) -> Optional[Dict[str, Any]]:
+    """The quantity, description and amount of item row `number`."""
+
+    def cell_text(role: str) -> Optional[str]:
+        column = roles.get(role)
+        if column is None or number not in columns[column].cells:
+            return None
+        return " ".join(texts[cell] for cell in columns[column].cells[number])
+
+    amount = parse_amount(cell_text("amount") or "")
+    if amount is None:
+        return None
+    quantity = parse_amount(cell_text("quantity") or "")
+    description = cell_text("description")
+    if description is None:
+        # Without a description column, all text of the row
+        description = " ".join(
+            texts[cell] for cell in row.cells if _kind(texts[cell]) == TEXT
+        )
+    return {"quantity": quantity, "description": description.strip(), "amount": amount}
+
+
+def _is_continuation(row: _Row, column: _Column, kinds: np.ndarray, bounds: np.ndarray, line_height: float) -> bool:
+    """Whether a row only holds text that starts in the description column."""
+    if not (kinds[row.cells] == TEXT).all():
+        return False
+    lefts = bounds[row.cells, 0]
+    return bool(((lefts >= column.left - COLUMN_TOLERANCE * line_height) & (lefts <= column.right)).all())
+
+
+# Create a singleton instance
+line_item_extractor = LineItemExtractor()
@@ -0,0 +1,261 @@
+# server/app/services/normalization.py
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Day-first or month-first reading of numeric dates like 03/04/2024
+MONTH_FIRST = "mdy"
+DAY_FIRST = "dmy"
+
+_MONTHS = {
+    name: number
+    for number, names in enumerate(
+        (("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",),
+         ("jun", "june"), ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"),
+         ("oct", "october"), ("nov", "november"), ("dec", "december")),
+        start=1,
+    )
+    for name in names
+}
+_MONTH = "(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?"
+
+# Date shapes, each with its own parser. Numeric dates take one separator
+# throughout; years have two or four digits.
+_YEAR_FIRST_RE = re.compile(r"(\d{4})([/.-])(\d{1,2})\2(\d{1,2})")
+_NUMERIC_RE = re.compile(r"(\d{1,2})([/.-])(\d{1,2})\2(\d{4}|\d{2})")
+_MONTH_NAME_FIRST_RE = re.compile(_MONTH + r"[\s-]*(\d{1,2})(?:st|nd|rd|th)?,?[\s-]*(\d{4}|\d{2})", re.IGNORECASE)
+_DAY_FIRST_NAME_RE = re.compile(r"(\d{1,2})(?:st|nd|rd|th)?[\s-]*" + _MONTH + r",?[\s-]*(\d{4}|\d{2})", re.IGNORECASE)
+
+# Amounts: optional sign or parentheses, currency symbol or code on either
+# side, digits with thousands separators and a decimal part
+_AMOUNT_RE = re.compile(
+    r"(?P<open>\()?\s*(?P<sign>[-+])?\s*(?:[$€£¥]|USD|EUR|GBP|CAD)?\s*(?P<sign2>-)?\s*"
+    r"(?P<number>\d[\d,.' ]*|[.,]\d+)"
+    r"\s*(?:[$€£¥]|USD|EUR|GBP|CAD)?\s*(?P<trail>-)?\s*(?P<close>\))?",
+    re.IGNORECASE,
+)
+# The common shapes, read without the general pattern
+_PLAIN_AMOUNT_RE = re.compile(r"\$?(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)")
+# Digit groups with thousands separators: the separator and the three digit groups
+_THOUSANDS_RE = {
+    separator: re.compile(r"\d{1,3}(?:" + re.escape(separator) + r"\d{3})+")
+    for separator in (",", ".", "'", " ")
+}
+
+_DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+class Normalizer:
+    """
+    Turns extracted date and amount strings into datetimes and floats.
+
+    Every string is matched against a few precompiled shapes, and only the
+    parser of the matching shape runs, so a miss costs no exceptions.
+    Two-digit years follow strptime's %y (69-99 are 1900s, 00-68 2000s).
+
+    Numeric dates that could be either day or month first are read month
+    first, like the strptime formats before them, unless the vendor's
+    earlier dates could only be read day first: the order that decided a
+    vendor's last unambiguous date is remembered and used for its
+    ambiguous ones. Dotted dates (03.04.2024) are read day first by default.
+    """
+
+    # Vendors whose date order is remembered; the least recently used are dropped
+    MAX_VENDORS = 1000
+
+    def __init__(self, max_vendors: int = MAX_VENDORS):
+        self.max_vendors = max_vendors
+        self._vendor_orders: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse_date(self, text: Optional[str], vendor: Optional[str] = None) -> Optional[datetime]:
+        """The date a string holds, or None. `vendor` picks the remembered order of ambiguous dates."""
+        if not text:
+            return None
+        text = text.strip()
+        order = self.vendor_date_order(vendor) if vendor else None
+        date, decided = _parse_date(text, order)
+        if vendor and decided and decided != order:
+            self._remember(vendor, decided)
+        return date
+
+    def parse_dates(self, texts: Iterable[Optional[str]], vendor: Optional[str] = None) -> List[Optional[datetime]]:
+        """parse_date over a list of strings, each distinct string parsed once."""
+        texts = list(texts)
+        if vendor:
+            # Unambiguous dates anywhere in the list decide the order of the ambiguous ones
+            for text in texts:
+                if text:
+                    _, decided = _parse_date(text.strip(), None)
+                    if decided:
+                        self._remember(vendor, decided)
+        order = self.vendor_date_order(vendor) if vendor else None
+        parsed: Dict[Optional[str], Optional[datetime]] = {}
+        results = []
+        for text in texts:
+            if text not in parsed:
+                parsed[text] = _parse_date(text.strip(), order)[0] if text else None
+            results.append(parsed[text])
+        return results
+
+    def parse_amount(self, text: Any) -> Optional[float]:
+        """The amount a string holds, or None. Numbers are returned as floats unchanged."""
+        return parse_amount(text)
+
+    def parse_amounts(self, texts: Iterable[Any]) -> List[Optional[float]]:
+        """parse_amount over a list of strings, each distinct string parsed once."""
+        parsed: Dict[Any, Optional[float]] = {}
+        results = []
+        for text in texts:
+            if text not in parsed:
+                parsed[text] = parse_amount(text)
+            results.append(parsed[text])
+        return results
+
+    def vendor_date_order(self, vendor: str) -> Optional[str]:
+        """MONTH_FIRST or DAY_FIRST as last decided by one of the vendor's dates, or None."""
+        with self._lock:
+            order = self._vendor_orders.get(vendor.lower())
+            if order is not None:
+                self._vendor_orders.move_to_end(vendor.lower())
+            return order
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            orders = list(self._vendor_orders.values())
+        return {
+            "vendors": len(orders),
+            "day_first_vendors": orders.count(DAY_FIRST),
+            "month_first_vendors": orders.count(MONTH_FIRST),
+        }
+
+    def _remember(self, vendor: str, order: str) -> None:
+        key = vendor.lower()
+        with self._lock:
+            self._vendor_orders[key] = order
+            self._vendor_orders.move_to_end(key)
+            while len(self._vendor_orders) > self.max_vendors:
+                self._vendor_orders.popitem(last=False)
+
+
+def parse_amount(text: Any) -> Optional[float]:
+    """
+    The amount a string holds, or None.
+
+    Thousands separators may be commas, dots, apostrophes or spaces. With
+    both a comma and a dot, the later one is the decimal point; a lone
+    comma followed by one or two digits is a decimal comma, and otherwise
+    a lone separator followed by three digits groups thousands only when
+    it is a comma. Parentheses or a minus sign on either side make the
+    amount negative.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = text.strip()
+    match = _PLAIN_AMOUNT_RE.fullmatch(text)
+    if match:
+        return float(match.group(1).replace(",", ""))
+    match = _AMOUNT_RE.fullmatch(text)
+    if match is None or bool(match.group("open")) != bool(match.group("close")):
+        return None
+    number = _plain_number(match.group("number").strip())
+    if number is None:
+        return None
+    value = float(number)
+    negative = match.group("open") or "-" in (match.group("sign"), match.group("sign2"), match.group("trail"))
+    return -value if negative else value
+
+
+def _plain_number(digits: str) -> Optional[str]:
+    """Digits with separators as a string float() reads, or None."""
+    if digits.isdigit():
+        return digits
+    last_comma, last_dot = digits.rfind(","), digits.rfind(".")
+    if last_comma >= 0 and last_dot >= 0:
+        decimal = "," if last_comma > last_dot else "."
+    elif last_comma >= 0:
+        # A lone comma before one or two digits is a decimal comma
+        decimal = "," if digits.count(",") == 1 and len(digits) - last_comma - 1 in (1, 2) else None
+    elif last_dot >= 0:
+        # Dots group thousands only when there are several of them
+        decimal = "." if digits.count(".") == 1 else None
+    else:
+        decimal = None
+
+    if decimal is not None:
+        integer, fraction = digits.rsplit(decimal, 1)
+        if not fraction.isdigit():
+            return None
+    else:
+        integer, fraction = digits, ""
+    if not integer:
+        integer = "0"
+    elif not integer.isdigit():
+        separators = set(integer) - set("0123456789")
+        if len(separators) != 1 or not _THOUSANDS_RE[separators.pop()].fullmatch(integer):
+            return None
+        integer = "".join(c for c in integer if c.isdigit())
+    return f"{integer}.{fraction}" if fraction else integer
+
+
+def _parse_date(text: str, order: Optional[str]):
+    """
+    (date or None, order the date could only be read in or None), reading
+    ambiguous numeric dates in `order`. Without an order, dotted dates are
+    read day first and the others month first.
+    """
+    match = _NUMERIC_RE.fullmatch(text)
+    if match:
+        first, separator, second, year = match.groups()
+        first, second, year = int(first), int(second), _year(year)
+        month_first = _date(year, first, second)
+        day_first = _date(year, second, first)
+        if month_first and day_first:
+            if order is None:
+                order = DAY_FIRST if separator == "." else MONTH_FIRST
+            return (month_first if order == MONTH_FIRST else day_first), None
+        if month_first:
+            return month_first, MONTH_FIRST
+        if day_first:
+            return day_first, DAY_FIRST
+        return None, None
+
+    match = _YEAR_FIRST_RE.fullmatch(text)
+    if match:
+        year, _, month, day = match.groups()
+        return _date(int(year), int(month), int(day)), None
+
+    match = _MONTH_NAME_FIRST_RE.fullmatch(text)
+    if match:
+        month, day, year = match.groups()
+        return _date(_year(year), _MONTHS[month.lower()], int(day)), None
+
+    match = _DAY_FIRST_NAME_RE.fullmatch(text)
+    if match:
+        day, month, year = match.groups()
+        return _date(_year(year), _MONTHS[month.lower()], int(day)), None
+    return None, None
+
+
+def _year(digits: str) -> int:
+    year = int(digits)
+    if len(digits) == 2:
+        # strptime's %y pivot
+        year += 2000 if year <= 68 else 1900
+    return year
+
+
+def _date(year: int, month: int, day: int) -> Optional[datetime]:
+    if not 1 <= month <= 12 or not 1 <= day <= _DAYS_IN_MONTH[month] or year < 1:
+        return None
+    if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+        return None
+    return datetime(year, month, day)
+
+
+# Create a singleton instance
+normalizer = Normalizer()
@@ -0,0 +1,267 @@
+# server/app/services/ocr_batcher.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _OcrJob(NamedTuple):
+    image: np.ndarray
+    cls: bool  # run the angle classifier on this image's text lines
+    future: Future
+
+
+class _ClassifyJob(NamedTuple):
+    crops: List[np.ndarray]
+    future: Future
+
+
+class OCRBatchServer:
+    """
+    In-process OCR inference server with dynamic micro-batching.
+
+    Page images submitted by concurrent tasks are collected into batches of
+    up to `batch_size` images, waiting at most `max_wait_ms` after the first
+    image of a batch arrives. Text detection still runs per image, but the
+    angle classifier and the recognizer run once over the text line crops of
+    the whole batch, so they see full batches even when every caller only
+    has a single page. All inference happens on one thread, which also keeps
+    the (not thread-safe) Paddle predictors from being used concurrently,
+    so stand-alone angle classification is queued here as well.
+    """
+
+    def __init__(self, get_ocr: Callable[[], Any], batch_size: int, max_wait_ms: float):
+        """
+        Args:
+            get_ocr: Returns the PaddleOCR instance to run, called on the inference thread
+            batch_size: Maximum number of page images per batch
+            max_wait_ms: How long to wait for a batch to fill up
+        """
+        self._get_ocr = get_ocr
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue[Optional[Union[_OcrJob, _ClassifyJob]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"batches": 0, "pages": 0, "crops": 0, "busy_time": 0.0}
+
+    def submit(self, image: np.ndarray, cls: bool = True) -> Future:
+        """
+        Queue a BGR page image for OCR.
+
+        Args:
+            image: The page image
+            cls: Whether to run the angle classifier on the page's text lines
+
+        Returns:
+            Future resolving to the result in PaddleOCR's ocr() format
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(_OcrJob(image, cls, future))
+        return future
+
+    def classify(self, crops: List[np.ndarray]) -> Future:
+        """
+        Queue text line crops for the angle classifier alone.
+
+        Returns:
+            Future resolving to a (label, score) pair per crop
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(_ClassifyJob(crops, future))
+        return future
+
+    def infer(self, image: np.ndarray) -> List:
+        """OCR a single image, blocking until its batch has run."""
+        return self.submit(image).result()
+
+    def stop(self) -> None:
+        """Stop the inference thread after the queued images are done."""
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters and the throughput of the inference thread."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = stats["pages"] / stats["batches"] if stats["batches"] else 0.0
+        stats["pages_per_sec"] = stats["pages"] / stats["busy_time"] if stats["busy_time"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._serve, name="ocr-batcher", daemon=True)
+                    self._thread.start()
+                    logger.info(
+                        f"OCR batch server started (batch size {self.batch_size}, "
+                        f"max wait {self.max_wait * 1000:.0f} ms)"
+                    )
+
+    def _serve(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            if batch:
+                self._run_batch(batch)
+
+    def _collect_batch(self) -> Optional[List[_OcrJob]]:
+        """
+        Block for the first image, then gather more until the batch is full or the deadline passes.
+
+        Classification jobs are small and their callers wait on them before
+        submitting a page, so they run as soon as they are picked up.
+        """
+        item = self._queue.get()
+        if item is None:
+            return None
+
+        batch = []
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            if isinstance(item, _ClassifyJob):
+                self._run_classify(item)
+            else:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then let the serve loop see the stop signal
+                self._queue.put(None)
+                break
+
+        # Skip callers that gave up while waiting
+        return [job for job in batch if job.future.set_running_or_notify_cancel()]
+
+    def _run_classify(self, job: _ClassifyJob) -> None:
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            _, cls_res, _ = self._get_ocr().text_classifier(list(job.crops))
+            job.future.set_result([(label, float(score)) for label, score in cls_res])
+        except Exception as e:
+            logger.error(f"Error classifying {len(job.crops)} text lines: {e}")
+            job.future.set_exception(e)
+
+    def _run_batch(self, batch: List[_OcrJob]) -> None:
+        start = time.perf_counter()
+        try:
+            results = self._ocr_batch([job.image for job in batch], [job.cls for job in batch])
+        except Exception as e:
+            logger.error(f"Error running OCR batch of {len(batch)} images: {e}")
+            for job in batch:
+                job.future.set_exception(e)
+            return
+
+        crop_count = 0
+        for job, result in zip(batch, results):
+            crop_count += len(result[0])
+            job.future.set_result(result)
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["pages"] += len(batch)
+            self._stats["crops"] += crop_count
+            self._stats["busy_time"] += time.perf_counter() - start
+
+    def _ocr_batch(self, images: List[np.ndarray], cls_flags: Optional[List[bool]] = None) -> List[List]:
+        """
+        Run detection per image and classification/recognition over all crops of the batch.
+
+        Mirrors PaddleOCR's own ocr() pipeline, but with the crops of every
+        image concatenated before the classifier and recognizer. Only the
+        crops of images whose flag in `cls_flags` is set are classified.
+        """
+        if cls_flags is None:
+            cls_flags = [True] * len(images)
+        ocr = self._get_ocr()
+
+        # Detection, then crops in reading order, remembering which image each crop came from
+        boxes_per_image = []
+        crops = []
+        for image in images:
+            dt_boxes, _ = ocr.text_detector(image)
+            boxes = _sorted_boxes(dt_boxes) if dt_boxes is not None and len(dt_boxes) else []
+            boxes_per_image.append(boxes)
+            crops.extend(_crop_text_line(image, box) for box in boxes)
+
+        rec_res = []
+        if crops:
+            if ocr.use_angle_cls and any(cls_flags):
+                # Crops of the images that need it, classified (and turned) in one call
+                crop_flags = [cls for boxes, cls in zip(boxes_per_image, cls_flags) for _ in boxes]
+                indices = [i for i, cls in enumerate(crop_flags) if cls]
+                classified, _, _ = ocr.text_classifier([crops[i] for i in indices])
+                for i, crop in zip(indices, classified):
+                    crops[i] = crop
+            rec_res, _ = ocr.text_recognizer(crops)
+
+        # Scatter the recognised lines back to their images
+        results = []
+        offset = 0
+        for boxes in boxes_per_image:
+            lines = []
+            for box, (text, score) in zip(boxes, rec_res[offset:offset + len(boxes)]):
+                if score >= ocr.drop_score:
+                    lines.append([box.tolist(), (text, score)])
+            offset += len(boxes)
+            # Same nesting as ocr(): one entry per page
+            results.append([lines])
+        return results
+
+
+def _sorted_boxes(dt_boxes: np.ndarray) -> List[np.ndarray]:
+    """Sort text boxes top to bottom, then left to right within a line (as PaddleOCR does)."""
+    boxes = sorted(dt_boxes, key=lambda box: (box[0][1], box[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            # Boxes whose tops are within 10px are on the same line
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+
+def _crop_text_line(image: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """Cut a (possibly rotated) text box out of the image as an upright rectangle."""
+    import cv2
+
+    points = np.asarray(box, dtype=np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(
+        image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC
+    )
+    # Tall crops are vertical text, turn them to read horizontally
+    if crop.shape[0] * 1.0 / max(crop.shape[1], 1) >= 1.5:
+        crop = np.rot90(crop)
+    return crop
@@ -0,0 +1,293 @@
+# server/app/services/ocr_blocks.py
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+
+class OcrBlocks:
+    """
+    Compact, array-backed sequence of OCR text blocks.
+
+    Holds what used to be a list of {"text", "confidence", "position", "page"}
+    dicts as columns: an (n, 4, 2) float32 array of corner points, float32
+    confidences, int32 page numbers (1-based, 0 when unknown) and one text
+    buffer addressed by start and end offsets. Sorting and filtering only
+    gather arrays and share the buffer. When blocks are built, the buffer is
+    their texts joined by a space, which is also the document text that
+    extraction searches, so it does not have to be joined again.
+
+    Conversion to and from the dict format is lossless for OCR output, whose
+    coordinates and scores are float32 to begin with. Embedded text layer
+    coordinates are rounded to float32, far below a pixel.
+    """
+
+    __slots__ = ("positions", "confidences", "pages", "starts", "ends", "_buffer", "_text")
+
+    SEPARATOR = " "
+
+    def __init__(
+        self,
+        positions: np.ndarray,
+        confidences: np.ndarray,
+        pages: np.ndarray,
+        buffer: str,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        text: Optional[str] = None,
+    ):
+        self.positions = positions
+        self.confidences = confidences
+        self.pages = pages
+        self.starts = starts
+        self.ends = ends
+        self._buffer = buffer
+        # The texts joined by SEPARATOR, built on first use unless the buffer already is that
+        self._text = text
+
+    @classmethod
+    def empty(cls) -> "OcrBlocks":
+        return cls.build([], [], [], [])
+
+    @classmethod
+    def build(
+        cls,
+        texts: Sequence[str],
+        positions: Union[Sequence, np.ndarray],
+        confidences: Union[Sequence[float], np.ndarray],
+        pages: Union[Sequence[int], np.ndarray, int],
+    ) -> "OcrBlocks":
+        """Build from parallel sequences; `pages` can also be one page number for all blocks."""
+        count = len(texts)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=count)
+        starts = np.zeros(count, dtype=np.int64)
+        # Every text is followed by one separator
+        np.cumsum(lengths[:-1] + len(cls.SEPARATOR), out=starts[1:])
+        page_array = (
+            np.full(count, pages, dtype=np.int32) if isinstance(pages, int)
+            else np.asarray(pages, dtype=np.int32).reshape(count)
+        )
+        buffer = cls.SEPARATOR.join(texts)
+        return cls(
+            positions=np.asarray(positions, dtype=np.float32).reshape(count, 4, 2),
+            confidences=np.asarray(confidences, dtype=np.float32).reshape(count),
+            pages=page_array,
+            buffer=buffer,
+            starts=starts,
+            ends=starts + lengths,
+            text=buffer,
+        )
+
+    @classmethod
+    def from_dicts(cls, blocks: Sequence[Dict[str, Any]]) -> "OcrBlocks":
+        """Build from the list of dicts format."""
+        return cls.build(
+            [block["text"] for block in blocks],
+            [block.get("position") or [[0.0, 0.0]] * 4 for block in blocks],
+            [block.get("confidence", 0.0) for block in blocks],
+            [block.get("page", 0) for block in blocks],
+        )
+
+    @classmethod
+    def from_paddle(cls, ocr_result: Optional[List], page: int = 0) -> "OcrBlocks":
+        """
+        Build from PaddleOCR's ocr() output.
+
+        Lines without text are skipped and texts are stripped, as the old
+        dict conversion did.
+        """
+        texts, positions, confidences = [], [], []
+        for page_result in ocr_result or []:
+            for line in page_result or []:
+                if not (isinstance(line, list) and len(line) >= 2):
+                    continue
+                text_info = line[1]  # (text, confidence)
+                if not (isinstance(text_info, tuple) and len(text_info) >= 2):
+                    continue
+                text = text_info[0]
+                if not text or not text.strip():
+                    continue
+                texts.append(text.strip())
+                positions.append(line[0])
+                confidences.append(text_info[1])
+        return cls.build(texts, positions, confidences, page)
+
+    @classmethod
+    def coerce(cls, blocks: Union["OcrBlocks", Sequence[Dict[str, Any]]]) -> "OcrBlocks":
+        """Accept either representation."""
+        return blocks if isinstance(blocks, OcrBlocks) else cls.from_dicts(blocks)
+
+    @classmethod
+    def concat(cls, parts: Sequence["OcrBlocks"]) -> "OcrBlocks":
+        """Join several block sequences, e.g. the pages of a document, in order."""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+
+        # Shift each part's offsets past the buffers (and separators) before it
+        shifts = np.cumsum([0] + [len(part._buffer) + len(cls.SEPARATOR) for part in parts[:-1]])
+        buffer = cls.SEPARATOR.join(part._buffer for part in parts)
+        # Parts whose buffers are exactly their joined texts give a buffer that still is
+        joined = all(part._text is part._buffer for part in parts)
+        return cls(
+            positions=np.concatenate([part.positions for part in parts]),
+            confidences=np.concatenate([part.confidences for part in parts]),
+            pages=np.concatenate([part.pages for part in parts]),
+            buffer=buffer,
+            starts=np.concatenate([part.starts + shift for part, shift in zip(parts, shifts)]),
+            ends=np.concatenate([part.ends + shift for part, shift in zip(parts, shifts)]),
+            text=buffer if joined else None,
+        )
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert to the list of dicts format (blocks without a page get no "page" key)."""
+        blocks = []
+        for text, confidence, position, page in zip(
+            self.texts, self.confidences.tolist(), self.positions.tolist(), self.pages.tolist()
+        ):
+            block = {"text": text, "confidence": confidence, "position": position}
+            if page:
+                block["page"] = page
+            blocks.append(block)
+        return blocks
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        """An int gives one block as a dict; a slice, mask or index array gives OcrBlocks."""
+        if isinstance(index, (int, np.integer)):
+            block = {
+                "text": self._buffer[self.starts[index]:self.ends[index]],
+                "confidence": float(self.confidences[index]),
+                "position": self.positions[index].tolist(),
+            }
+            if self.pages[index]:
+                block["page"] = int(self.pages[index])
+            return block
+        return self.take(np.arange(len(self))[index])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_dicts())
+
+    def __repr__(self) -> str:
+        return f"OcrBlocks({len(self)} blocks, {self.nbytes} bytes)"
+
+    @property
+    def text(self) -> str:
+        """All block texts joined by SEPARATOR, in block order."""
+        if self._text is None:
+            self._text = self.SEPARATOR.join(self.texts)
+        return self._text
+
+    @property
+    def texts(self) -> List[str]:
+        buffer = self._buffer
+        return [buffer[start:end] for start, end in zip(self.starts.tolist(), self.ends.tolist())]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the blocks."""
+        arrays = (self.positions, self.confidences, self.pages, self.starts, self.ends)
+        return sum(array.nbytes for array in arrays) + len(self._buffer.encode("utf-8"))
+
+    def compact(self) -> "OcrBlocks":
+        """A copy whose buffer only holds these blocks' texts, e.g. before pickling a small selection."""
+        return OcrBlocks.build(self.texts, self.positions, self.confidences, self.pages)
+
+    def bounds(self) -> np.ndarray:
+        """Axis-aligned bounding boxes as an (n, 4) array of x0, y0, x1, y1."""
+        return np.concatenate([self.positions.min(axis=1), self.positions.max(axis=1)], axis=1)
+
+    def take(self, indices: np.ndarray) -> "OcrBlocks":
+        """The blocks at the given indices, in that order. The text buffer is shared."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return OcrBlocks(
+            self.positions[indices],
+            self.confidences[indices],
+            self.pages[indices],
+            self._buffer,
+            self.starts[indices],
+            self.ends[indices],
+        )
+
+    def filter(self, mask: np.ndarray) -> "OcrBlocks":
+        """The blocks where a boolean mask is set, keeping their order."""
+        return self.take(np.flatnonzero(mask))
+
+    def min_confidence(self, threshold: float) -> "OcrBlocks":
+        return self.filter(self.confidences >= threshold)
+
+    def on_page(self, page: int) -> "OcrBlocks":
+        """The blocks of one (1-based) page."""
+        return self.filter(self.pages == page)
+
+    def crop(
+        self, x0: float, y0: float, x1: float, y1: float, page: Optional[int] = None
+    ) -> "OcrBlocks":
+        """The blocks whose centre lies inside a rectangle, optionally on one page only."""
+        centres = self.positions.mean(axis=1)
+        mask = (
+            (centres[:, 0] >= x0) & (centres[:, 0] <= x1)
+            & (centres[:, 1] >= y0) & (centres[:, 1] <= y1)
+        )
+        if page is not None:
+            mask &= self.pages == page
+        return self.filter(mask)
+
+    def translate(self, dx: float, dy: float) -> "OcrBlocks":
+        """A copy with every position moved, e.g. from a crop back to page coordinates."""
+        return self.transform(1.0, dx, dy)
+
+    def transform(self, scale: float, dx: float, dy: float) -> "OcrBlocks":
+        """A copy with every position scaled, then moved."""
+        positions = self.positions * np.float32(scale) if scale != 1.0 else self.positions
+        return OcrBlocks(
+            positions + np.array([dx, dy], dtype=np.float32),
+            self.confidences, self.pages, self._buffer, self.starts, self.ends, self._text,
+        )
+
+    def rotate90(self, k: int, width: float, height: float) -> "OcrBlocks":
+        """
+        A copy with every position turned along with a width x height image by np.rot90(image, k).
+
+        Use a negative `k`, with the rotated image's size, to map positions
+        back from a rotated image.
+        """
+        k %= 4
+        if k == 0:
+            return self
+        x, y = self.positions[:, :, 0], self.positions[:, :, 1]
+        if k == 1:
+            turned = (y, width - x)
+        elif k == 2:
+            turned = (width - x, height - y)
+        else:
+            turned = (height - y, x)
+        return OcrBlocks(
+            np.stack(turned, axis=2).astype(np.float32),
+            self.confidences, self.pages, self._buffer, self.starts, self.ends, self._text,
+        )
+
+    def sort_by_top(self) -> "OcrBlocks":
+        """Stable sort by the y coordinate of each block's first corner."""
+        return self.take(np.argsort(self.positions[:, 0, 1], kind="stable"))
+
+    def sort_reading_order(self, line_tolerance: float = 10.0) -> "OcrBlocks":
+        """
+        Sort by page, then top to bottom, then left to right within a line.
+
+        Blocks whose tops are within `line_tolerance` of the previous block
+        (in top order) are treated as one line, like PaddleOCR's box sort.
+        """
+        if len(self) < 2:
+            return self
+        tops = self.positions[:, 0, 1]
+        lefts = self.positions[:, 0, 0]
+
+        order = np.lexsort((lefts, tops, self.pages))
+        new_line = np.ones(len(self), dtype=bool)
+        new_line[1:] = (np.diff(tops[order]) >= line_tolerance) | (np.diff(self.pages[order]) != 0)
+        line_ids = np.cumsum(new_line)
+        return self.take(order[np.lexsort((lefts[order], line_ids))])
@@ -0,0 +1,209 @@
+# server/app/services/ocr_cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """
+    Persistent on-disk cache of OCR results.
+
+    Entries are JSON files named after their key. Whole documents are keyed
+    by a SHA-256 of the file bytes and single pages by a hash of the rendered
+    page, both combined with the render DPI and OCR model version so that a
+    settings or model change never serves stale results. The total size of
+    the cache is kept under a byte budget by evicting the least recently
+    used entries.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+        self._counters = {
+            "document_hits": 0,
+            "document_misses": 0,
+            "page_hits": 0,
+            "page_misses": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def document_key(file_bytes: bytes, dpi: int, model_version: str) -> str:
+        """Build the cache key for a whole document."""
+        content_hash = hashlib.sha256(file_bytes).hexdigest()
+        return _combine_key("doc", content_hash, dpi, model_version)
+
+    @staticmethod
+    def page_key(image: np.ndarray, dpi: int, model_version: str) -> str:
+        """Build the cache key for a single rendered page."""
+        content_hash = hashlib.sha256(image.tobytes()).hexdigest()
+        return _combine_key("page", content_hash, dpi, model_version)
+
+    def get_document(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+        """
+        Look up the OCR blocks and page count of a whole document. The page
+        count is None for entries written before it was stored.
+        """
+        entry = self._get(key, "document")
+        if entry is None:
+            return None
+        if isinstance(entry, list):
+            return entry, None
+        return entry["blocks"], entry["page_count"]
+
+    def get_page(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Look up the OCR blocks of a single page."""
+        return self._get(key, "page")
+
+    def put(self, key: str, blocks: List[Dict[str, Any]]) -> None:
+        """Store OCR blocks under a key, evicting old entries if over budget."""
+        self._put(key, blocks)
+
+    def put_document(self, key: str, blocks: List[Dict[str, Any]], page_count: int) -> None:
+        """
+        Store the OCR blocks of a whole document with its page count, so
+        blank pages without blocks are still returned on a hit.
+        """
+        self._put(key, {"page_count": page_count, "blocks": blocks})
+
+    def _put(self, key: str, entry: Any) -> None:
+        data = json.dumps(entry, separators=(",", ":"), default=float).encode("utf-8")
+        if len(data) > self.max_bytes:
+            logger.warning(f"OCR result of {len(data)} bytes is larger than the cache budget, not cached")
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing OCR cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            index = self._load_index()
+            self._total_bytes -= index.pop(key, 0)
+            index[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            index = self._load_index()
+            counters = dict(self._counters)
+            lookups = {
+                kind: counters[f"{kind}_hits"] + counters[f"{kind}_misses"]
+                for kind in ("document", "page")
+            }
+            return {
+                **counters,
+                "document_hit_rate": counters["document_hits"] / lookups["document"] if lookups["document"] else 0.0,
+                "page_hit_rate": counters["page_hits"] / lookups["page"] if lookups["page"] else 0.0,
+                "entries": len(index),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _get(self, key: str, kind: str) -> Any:
+        path = self._path(key)
+        size = 0
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            size = len(data)
+            entry = json.loads(data)
+            # Touch the file so the LRU order survives a restart
+            os.utime(path)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable OCR cache entry {key}: {e}")
+            self._remove(key)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self._counters[f"{kind}_misses"] += 1
+            else:
+                self._counters[f"{kind}_hits"] += 1
+                index = self._load_index()
+                if key in index:
+                    index.move_to_end(key)
+                else:
+                    # Written by another process since the index was loaded
+                    index[key] = size
+                    self._total_bytes += size
+        return entry
+
+    def _path(self, key: str) -> str:
+        # Fan out over sub-directories to keep directory listings small
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """Build the LRU index from the files on disk on first use. Caller holds the lock."""
+        if self._index is None:
+            entries = []
+            if os.path.isdir(self.cache_dir):
+                for sub_dir in os.scandir(self.cache_dir):
+                    if not sub_dir.is_dir():
+                        continue
+                    for entry in os.scandir(sub_dir.path):
+                        if entry.name.endswith(".json"):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, entry.name[:-len(".json")], stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._total_bytes = sum(self._index.values())
+            logger.info(f"Loaded OCR cache index with {len(self._index)} entries ({self._total_bytes} bytes)")
+        return self._index
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits its budget. Caller holds the lock."""
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self._counters["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            index = self._load_index()
+            self._total_bytes -= index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+def _combine_key(kind: str, content_hash: str, dpi: int, model_version: str) -> str:
+    """Hash the content hash together with everything else that affects the OCR output."""
+    return hashlib.sha256(f"{kind}:{content_hash}:{dpi}:{model_version}".encode("utf-8")).hexdigest()
+
+
+ocr_cache = OCRCache(settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_BYTES)
@@ -0,0 +1,461 @@
+# server/app/services/ocr_engines.py
+import gc
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from importlib import metadata
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.ocr_batcher import OCRBatchServer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class OCREngine:
+    """
+    Base class for the OCR engines OCRService can run.
+
+    An engine turns a BGR image array (or an image file path) into a result
+    in PaddleOCR's ocr() format: one entry per image, each a list of
+    [box, (text, confidence)] lines. Engines load their models lazily, so
+    creating one is cheap.
+    """
+
+    # Registry name, also used in queue items and the OCR_ENGINE setting
+    name = ""
+    # Whether scanned pages need to be rendered for this engine at all
+    renders_pages = True
+    # Whether the engine runs a text line angle classifier that classify_angles exposes
+    classifies_angles = False
+    # Whether the engine loads models that count against the model cache
+    has_models = False
+
+    def __init__(self, lang: str = "en"):
+        self.lang = lang
+        self._warm = False
+
+    @property
+    def version(self) -> str:
+        """Identifies the engine and its models in OCR cache keys."""
+        return self.name
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the engine's models have been loaded into this process."""
+        return True
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether the engine has been loaded and run at least once."""
+        return self._warm
+
+    @property
+    def is_batching(self) -> bool:
+        """Whether submitted images are micro-batched with other callers' images."""
+        return False
+
+    def load(self) -> None:
+        """Load the engine's models, if it has any."""
+
+    def unload(self) -> None:
+        """Drop the engine's models; they are loaded again on next use."""
+
+    def ocr(self, image: Union[str, np.ndarray], cls: bool = True) -> List:
+        """
+        OCR one image and return the result in PaddleOCR's ocr() format.
+
+        `cls=False` skips per-line angle classification, for images already
+        known to be upright.
+        """
+        raise NotImplementedError
+
+    def submit(self, image: Union[str, np.ndarray], cls: bool = True) -> Future:
+        """
+        Start the OCR of an image.
+
+        Engines without a batch server run the OCR straight away and hand
+        back a finished future.
+        """
+        future: Future = Future()
+        try:
+            future.set_result(self.ocr(image, cls=cls))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def classify_angles(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """Run the angle classifier alone on text line crops, giving a ("0" or "180", score) pair each."""
+        raise NotImplementedError(f"OCR engine {self.name} has no angle classifier")
+
+    def warm_up(self, image: np.ndarray) -> bool:
+        """
+        Load the models and run a sample image through them.
+
+        Returns:
+            True if the engine is warm
+        """
+        if self._warm:
+            return True
+
+        start = time.time()
+        try:
+            self.load()
+            self.ocr(image)
+            self._warm = True
+            logger.info(f"OCR engine {self.name} warmed up in {time.time() - start:.2f} seconds")
+        except Exception as e:
+            logger.error(f"Error warming up OCR engine {self.name}: {e}")
+        return self._warm
+
+    def shutdown(self) -> None:
+        """Release background resources, such as a batch server thread."""
+
+
+_ENGINE_TYPES: Dict[str, Type[OCREngine]] = {}
+# Least recently used first, so the model cache evicts from the front
+_engines: "OrderedDict[Tuple[str, str], OCREngine]" = OrderedDict()
+_engines_lock = threading.Lock()
+_model_cache_stats = {"loads": 0, "evictions": 0}
+
+
+def register_engine(engine_type: Type[OCREngine]) -> Type[OCREngine]:
+    """Class decorator adding an engine to the registry under its name."""
+    _ENGINE_TYPES[engine_type.name] = engine_type
+    return engine_type
+
+
+def available_engines() -> List[str]:
+    """Names of all registered engines."""
+    return sorted(_ENGINE_TYPES)
+
+
+def get_engine(name: Optional[str] = None, lang: Optional[str] = None) -> OCREngine:
+    """
+    Get the engine instance for a name and language, creating it on first use.
+
+    Instances are shared within the process, so models are loaded once,
+    unless the model cache evicts them to make room for another language.
+
+    Args:
+        name: Registered engine name, defaults to the OCR_ENGINE setting
+        lang: OCR language, defaults to the OCR_DEFAULT_LANGUAGE setting
+    """
+    name = name or settings.OCR_ENGINE
+    lang = lang or settings.OCR_DEFAULT_LANGUAGE
+    if name not in _ENGINE_TYPES:
+        raise ValueError(f"Unknown OCR engine '{name}', available: {', '.join(available_engines())}")
+
+    key = (name, lang)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _ENGINE_TYPES[name](lang=lang)
+            _engines[key] = engine
+        _engines.move_to_end(key)
+        return engine
+
+
+def loaded_engines() -> List[OCREngine]:
+    """The engine instances created in this process so far."""
+    with _engines_lock:
+        return list(_engines.values())
+
+
+def shutdown_engines() -> None:
+    """Shut down every engine instance created in this process."""
+    for engine in loaded_engines():
+        engine.shutdown()
+
+
+def model_cache_stats() -> Dict[str, Any]:
+    """Limits, process RSS, the engines holding models (least recently used first), loads and evictions."""
+    with _engines_lock:
+        stats = dict(_model_cache_stats)
+        models = [f"{engine.name}:{engine.lang}" for engine in _models_in_memory()]
+    rss_mb = process_rss_mb()
+    return {
+        "max_models": settings.OCR_MODEL_CACHE_MAX_MODELS,
+        "max_rss_mb": settings.OCR_MODEL_CACHE_MAX_RSS_MB,
+        "rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+        "models": models,
+        **stats,
+    }
+
+
+def process_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _models_in_memory(exclude: Optional[OCREngine] = None) -> List[OCREngine]:
+    """Engines holding loaded models, least recently used first. Call with _engines_lock held."""
+    return [
+        engine for engine in _engines.values()
+        if engine.has_models and engine.is_loaded and engine is not exclude
+    ]
+
+
+def _evict(engine: OCREngine, reason: str) -> None:
+    engine.unload()
+    with _engines_lock:
+        _model_cache_stats["evictions"] += 1
+    logger.info(f"Evicted OCR models of engine {engine.name} ({engine.lang}): {reason}")
+
+
+def _make_room_for_model(engine: OCREngine) -> None:
+    """Evict least recently used models so that loading one more stays within OCR_MODEL_CACHE_MAX_MODELS."""
+    max_models = max(1, settings.OCR_MODEL_CACHE_MAX_MODELS)
+    with _engines_lock:
+        others = _models_in_memory(exclude=engine)
+        victims = others[:max(0, len(others) - (max_models - 1))]
+    for victim in victims:
+        _evict(victim, f"cache holds {max_models} models")
+
+
+def _model_loaded(engine: OCREngine) -> None:
+    """Count a model load, then evict least recently used models while the process is over OCR_MODEL_CACHE_MAX_RSS_MB."""
+    with _engines_lock:
+        _model_cache_stats["loads"] += 1
+    limit = settings.OCR_MODEL_CACHE_MAX_RSS_MB
+    if limit <= 0:
+        return
+    while True:
+        rss_mb = process_rss_mb()
+        if rss_mb is None or rss_mb <= limit:
+            return
+        with _engines_lock:
+            others = _models_in_memory(exclude=engine)
+        if not others:
+            logger.warning(
+                f"Process RSS is {rss_mb:.0f} MB with only the models of engine {engine.name} "
+                f"({engine.lang}) loaded, above the {limit} MB model cache limit"
+            )
+            return
+        _evict(others[0], f"process RSS {rss_mb:.0f} MB is above {limit} MB")
+        # Let the dropped model's memory go before measuring again
+        gc.collect()
+
+
+@register_engine
+class PaddleEngine(OCREngine):
+    """Full PaddleOCR pipeline: text detection, angle classification and recognition."""
+
+    name = "paddle"
+    # Uses the micro-batching server when OCR_BATCHING_ENABLED is set
+    supports_batching = True
+    classifies_angles = True
+    has_models = True
+
+    def __init__(self, lang: str = "en"):
+        super().__init__(lang)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.batch_server = OCRBatchServer(
+            lambda: self.model, settings.OCR_BATCH_SIZE, settings.OCR_BATCH_MAX_WAIT_MS
+        )
+
+    @property
+    def version(self) -> str:
+        # Models change with the package, so upgrades never serve stale cached results
+        return f"paddleocr-{_paddleocr_version()}-{self.lang}-cls"
+
+    @property
+    def model(self):
+        """The PaddleOCR instance, loaded on first access (or after eviction from the model cache)."""
+        model = self._model
+        if model is None:
+            # Outside our lock, since evicting takes the other engines' locks
+            _make_room_for_model(self)
+            loaded = False
+            with self._model_lock:
+                # Another thread may have loaded the models while we waited
+                if self._model is None:
+                    self._model = self._load_model()
+                    loaded = True
+                model = self._model
+            if loaded:
+                _model_loaded(self)
+        return model
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def is_batching(self) -> bool:
+        return self.supports_batching and settings.OCR_BATCHING_ENABLED
+
+    def load(self) -> None:
+        self.model
+
+    def unload(self) -> None:
+        # Calls already running keep their reference; the batch server thread
+        # stays up and loads the models again with its next batch
+        with self._model_lock:
+            self._model = None
+        self._warm = False
+
+    def _model_options(self) -> Dict[str, Any]:
+        return {
+            "use_angle_cls": True,
+            "lang": self.lang,
+            "rec_batch_num": settings.OCR_REC_BATCH_NUM,
+        }
+
+    def _load_model(self):
+        """Import PaddleOCR and load its models."""
+        start = time.time()
+        try:
+            from paddleocr import PaddleOCR
+
+            model = PaddleOCR(**self._model_options())
+            logger.info(f"OCR models for engine {self.name} loaded in {time.time() - start:.2f} seconds")
+            return model
+        except Exception as e:
+            logger.error(f"Error loading OCR models for engine {self.name}: {e}")
+            raise
+
+    def ocr(self, image: Union[str, np.ndarray], cls: bool = True) -> List:
+        return self.model.ocr(image, cls=cls)
+
+    def submit(self, image: Union[str, np.ndarray], cls: bool = True) -> Future:
+        if not self.is_batching:
+            return super().submit(image, cls=cls)
+        if isinstance(image, str):
+            import cv2
+            image = cv2.imread(image)
+        return self.batch_server.submit(image, cls=cls)
+
+    def classify_angles(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        if self.is_batching:
+            # The batch server's thread owns the predictors
+            return self.batch_server.classify(crops).result()
+        _, cls_res, _ = self.model.text_classifier(list(crops))
+        return [(label, float(score)) for label, score in cls_res]
+
+    def shutdown(self) -> None:
+        self.batch_server.stop()
+
+
+@register_engine
+class PaddleRecognitionEngine(PaddleEngine):
+    """
+    PaddleOCR with detection and angle classification switched off.
+
+    The whole image is recognised as a single text line, which is much
+    cheaper than the full pipeline but only suits images that are already
+    cropped to one line of text, such as a known field region.
+    """
+
+    name = "paddle_rec"
+    supports_batching = False
+    classifies_angles = False
+
+    @property
+    def version(self) -> str:
+        return f"paddleocr-{_paddleocr_version()}-{self.lang}-rec"
+
+    def _model_options(self) -> Dict[str, Any]:
+        return {
+            "use_angle_cls": False,
+            "lang": self.lang,
+            "rec_batch_num": settings.OCR_REC_BATCH_NUM,
+        }
+
+    def ocr(self, image: Union[str, np.ndarray], cls: bool = True) -> List:
+        if isinstance(image, str):
+            import cv2
+            image = cv2.imread(image)
+        result = self.model.ocr(image, det=False, cls=False)
+
+        # Without detection there are no boxes, so the line covers the whole image
+        height, width = image.shape[:2]
+        box = [[0.0, 0.0], [float(width), 0.0], [float(width), float(height)], [0.0, float(height)]]
+        rec_res = (result[0] if result else None) or []
+        return [[[box, (text, score)] for text, score in rec_res]]
+
+
+@register_engine
+class TextLayerEngine(OCREngine):
+    """
+    Uses embedded PDF text only.
+
+    Scanned pages are not rendered or OCRed and come back without blocks.
+    Useful for documents known to be digital, and as a lower bound when
+    benchmarking the other engines.
+    """
+
+    name = "text_layer"
+    renders_pages = False
+
+    def ocr(self, image: Union[str, np.ndarray], cls: bool = True) -> List:
+        return [[]]
+
+
+@register_engine
+class StubEngine(OCREngine):
+    """
+    Deterministic fake engine for tests and benchmarks of the surrounding pipeline.
+
+    Returns a fixed set of invoice lines whose values are derived from a
+    checksum of the image, so the same image always gives the same result
+    and no models are needed. Its angle classifier calls every line upright.
+    """
+
+    name = "stub"
+    classifies_angles = True
+
+    @property
+    def version(self) -> str:
+        return "stub-1"
+
+    def ocr(self, image: Union[str, np.ndarray], cls: bool = True) -> List:
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                checksum = zlib.crc32(f.read())
+            height, width = 1100, 850
+        else:
+            checksum = zlib.crc32(np.ascontiguousarray(image).data)
+            height, width = image.shape[:2]
+
+        texts = [
+            "INVOICE",
+            f"Invoice # STUB-{checksum % 100000:05d}",
+            "Invoice Date: 01/15/2024",
+            "Due Date: 02/14/2024",
+            f"Total: ${checksum % 1000000 / 100:,.2f}",
+        ]
+        # Lines spaced down the left half of the page
+        line_height = height / (len(texts) + 1)
+        lines = []
+        for i, text in enumerate(texts):
+            top = line_height * (i + 0.5)
+            bottom = top + line_height * 0.5
+            box = [[width * 0.1, top], [width * 0.5, top], [width * 0.5, bottom], [width * 0.1, bottom]]
+            lines.append([box, (text, 0.99)])
+        return [lines]
+
+    def classify_angles(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        return [("0", 0.99) for _ in crops]
+
+
+def _paddleocr_version() -> str:
+    """Read the installed PaddleOCR version from package metadata, without importing Paddle."""
+    try:
+        return metadata.version("paddleocr")
+    except metadata.PackageNotFoundError:
+        return "unknown"
@@ -1,16 +1,66 @@
 # server/app/services/ocr_service.py
+import io
 import logging
+import multiprocessing
 import os
-import time
-from typing import Dict, List, Any, Optional
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Any, Optional, Tuple, Union
 
-from paddleocr import PaddleOCR
+import numpy as np
 import fitz  # PyMuPDF
+from PIL import Image, ImageOps, ImageSequence
+
+from app.core.config import settings
+from app.services.language import detect_language
+from app.services.ocr_batcher import OCRBatchServer
+from app.services.ocr_blocks import OcrBlocks
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_engines import OCREngine, get_engine, shutdown_engines
+from app.services.orientation import Orientation, page_orienter
+from app.services.preprocessing import CoordinateMap, image_preprocessor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Text layer pages read for language detection
+LANGUAGE_SAMPLE_PAGES = 3
+
+
+@dataclass
+class PageResult:
+    """Blocks extracted from a single page of a document."""
+    page_num: int  # 0-based
+    page_count: int
+    blocks: OcrBlocks
+    source: str  # "text" (embedded text layer), "ocr", "cache" or "roi" (header/footer bands only)
+    # Seconds spent in (or saved by) the page's OCR stages: "preprocess", "orientation", "cls_saved"
+    timings: Dict[str, float] = field(default_factory=dict)
+    # The page's OCR raised, so its blocks are empty rather than read
+    failed: bool = False
+
+
+@dataclass
+class _PendingPage:
+    """A page whose blocks are known, or still being produced by a future."""
+    page_num: int
+    source: str
+    blocks: OcrBlocks = field(default_factory=OcrBlocks.empty)
+    future: Optional[Future] = None
+    page_key: Optional[str] = None
+    # Takes positions in the pre-processed image back to the rendered page
+    coordinate_map: Optional[CoordinateMap] = None
+    # How the page was turned upright, when that happened in this process
+    orientation: Optional[Orientation] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Whether the future yields structured blocks rather than raw PaddleOCR output
+    structured: bool = False
+    
+    def is_ready(self) -> bool:
+        return self.future is None or self.future.done()
+
 
 class OCRService:
     """
@@ -18,20 +68,81 @@ class OCRService:
     """
     
     def __init__(self):
-        """Initialize the OCR service with PaddleOCR."""
-        try:
-            self.ocr = PaddleOCR(use_angle_cls=True, lang='en')
-            logger.info("OCR service initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing OCR service: {e}")
-            raise
+        """
+        Initialize the OCR service.
+        
+        The OCR engines load their models on first use (or by warm_up), so
+        processes that never OCR anything do not pay for importing Paddle.
+        """
+        self._page_pool: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def engine(self) -> OCREngine:
+        """The default engine, chosen by the OCR_ENGINE setting."""
+        return get_engine(settings.OCR_ENGINE)
+    
+    @property
+    def model_version(self) -> str:
+        """Identifies the default engine's models in OCR cache keys."""
+        return self.engine.version
+    
+    @property
+    def batch_server(self) -> Optional[OCRBatchServer]:
+        """The default engine's micro-batching server, if it has one."""
+        return getattr(self.engine, "batch_server", None)
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the default engine's models have been loaded into this process."""
+        return self.engine.is_loaded
+    
+    @property
+    def is_warm(self) -> bool:
+        """Whether the default engine has been loaded and run at least once."""
+        return self.engine.is_warm
+    
+    def warm_up(self, engine: Optional[str] = None) -> bool:
+        """
+        Load an engine's models and run a dummy page through them.
+        
+        The first inference pays one-off costs (graph optimisation, memory
+        pools), so running it at worker start keeps it out of the first
+        real document's latency.
+        
+        Args:
+            engine: Engine name, defaults to the OCR_ENGINE setting
+            
+        Returns:
+            True if the engine is warm
+        """
+        ocr_engine = get_engine(engine)
+        if ocr_engine.is_warm:
+            return True
+        
+        # A small page with some text exercises detection, angle classification and recognition
+        doc = fitz.open()
+        page = doc.new_page(width=300, height=100)
+        page.insert_text((20, 50), "INVOICE # 12345  TOTAL $1,234.56", fontsize=11)
+        image = render_page_image(page)
+        doc.close()
+        
+        return ocr_engine.warm_up(image)
     
-    def process_document(self, file_path: str) -> List[Dict[str, Any]]:
+    def process_document(
+        self,
+        file_path: str,
+        engine: Optional[str] = None,
+        lang: Optional[str] = None,
+        content: Optional[bytes] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Process document using OCR and extract text and positions.
         
         Args:
             file_path: Path to the document file
+            engine: OCR engine name, defaults to the OCR_ENGINE setting
+            lang: OCR language, defaults to the OCR_DEFAULT_LANGUAGE setting
+            content: The file's bytes when the caller has already read them, so the file is not read again
             
         Returns:
             List of dictionaries containing extracted text, confidence scores, and positions
@@ -39,106 +150,516 @@ class OCRService:
         logger.info(f"Processing document: {file_path}")
         
         try:
-            # Check if file exists
-            if not os.path.exists(file_path):
-                error_msg = f"File not found: {file_path}"
-                logger.error(error_msg)
-                raise FileNotFoundError(error_msg)
-            
-            # Determine file type
-            _, ext = os.path.splitext(file_path)
-            
-            if ext.lower() == '.pdf':
-                return self._process_pdf(file_path)
-            else:
-                # For image files or other formats, use direct OCR
-                return self._process_image(file_path)
+            pages = [page.blocks for page in self.iter_pages(file_path, engine, lang, content)]
+            return OcrBlocks.concat(pages).to_dicts()
                 
         except Exception as e:
             logger.error(f"Error processing document: {e}")
             # Return empty result on error
             return []
     
-    def _process_pdf(self, file_path: str) -> List[Dict[str, Any]]:
-        """Process a PDF document by extracting and OCR'ing each page."""
-        logger.info(f"Processing PDF document: {file_path}")
+    def iter_pages(
+        self,
+        file_path: str,
+        engine: Optional[str] = None,
+        lang: Optional[str] = None,
+        content: Optional[bytes] = None,
+    ) -> Iterator["PageResult"]:
+        """
+        Process a document page by page.
+        
+        Pages are yielded in page order as soon as each one is ready, so
+        callers can report progress on long documents. Closing the iterator
+        early stops the OCR of the remaining pages.
+        
+        Args:
+            file_path: Path to the document file
+            engine: OCR engine name, defaults to the OCR_ENGINE setting
+            lang: OCR language, defaults to the OCR_DEFAULT_LANGUAGE setting
+            content: The file's bytes when the caller has already read them, so the file is not read again
+            
+        Yields:
+            PageResult for each page of the document
+        """
+        # Check if file exists
+        if content is None and not os.path.exists(file_path):
+            error_msg = f"File not found: {file_path}"
+            logger.error(error_msg)
+            raise FileNotFoundError(error_msg)
+        
+        ocr_engine = get_engine(engine, lang)
+        
+        # Repeat uploads of the same file are served from the cache
+        document_key = None
+        if settings.OCR_CACHE_ENABLED:
+            if content is None:
+                with open(file_path, "rb") as f:
+                    content = f.read()
+            document_key = ocr_cache.document_key(
+                content, settings.OCR_RENDER_DPI, self._cache_version(ocr_engine)
+            )
+            cached = ocr_cache.get_document(document_key)
+            if cached is not None:
+                logger.info(f"Using cached OCR result for {file_path}")
+                cached_blocks, cached_page_count = cached
+                yield from _split_pages(OcrBlocks.from_dicts(cached_blocks), cached_page_count)
+                return
+        
+        # Determine file type
+        _, ext = os.path.splitext(file_path)
+        
+        if ext.lower() == '.pdf':
+            pages = self._iter_pdf_pages(file_path, ocr_engine, content)
+        else:
+            # For image files or other formats, use direct OCR
+            pages = self._iter_image_pages(file_path, ocr_engine, content)
         
         result = []
+        page_count = 0
+        failed = False
+        try:
+            for page in pages:
+                result.append(page.blocks)
+                page_count = page.page_count
+                failed = failed or page.failed
+                yield page
+        finally:
+            # Stops the page OCR straight away when the caller stops early
+            pages.close()
+        
+        # Only complete documents are cached: a page whose OCR failed would
+        # be served blank from then on. Empty results are not cached either.
+        result = OcrBlocks.concat(result)
+        if document_key and len(result) and not failed:
+            ocr_cache.put_document(document_key, result.to_dicts(), page_count)
+    
+    def ocr_regions(
+        self,
+        file_path: str,
+        engine: Optional[str] = None,
+        lang: Optional[str] = None,
+        content: Optional[bytes] = None,
+    ) -> Optional["PageResult"]:
+        """
+        OCR only the header and footer bands of a document's first page.
+        
+        The vendor, invoice number and dates are usually in the header and
+        the totals near the bottom, so these bands are often enough for
+        extraction at a fraction of the cost of the full document. Block
+        positions are in full page coordinates.
+        
+        Args:
+            file_path: Path to the document file
+            engine: OCR engine name, defaults to the OCR_ENGINE setting
+            lang: OCR language, defaults to the OCR_DEFAULT_LANGUAGE setting
+            content: The file's bytes when the caller has already read them, so the file is not read again
+            
+        Returns:
+            PageResult for the bands of the first page, or None when the
+            first page has a text layer (reading it in full is cheap anyway)
+            or cannot be rendered
+        """
+        ocr_engine = get_engine(engine, lang)
+        if not ocr_engine.renders_pages:
+            return None
+        
+        first_page = self._first_page_image(file_path, content)
+        if first_page is None:
+            return None
+        image, page_count = first_page
+        
+        bands = _roi_bands(image.shape[0])
+        logger.info(f"OCRing {len(bands)} regions of the first page of {file_path}")
+        
+        # Start every band before waiting, so a batching engine runs them together
+        entries = [
+            (top, self._start_image_ocr(image[top:bottom], 0, None, ocr_engine))
+            for top, bottom in bands
+        ]
+        # Band coordinates back to page coordinates
+        blocks = OcrBlocks.concat([
+            self._finish_page(entry, page_count).blocks.translate(0, top) for top, entry in entries
+        ])
+        
+        return PageResult(page_num=0, page_count=page_count, blocks=blocks, source="roi")
+    
+    def detect_document_language(
+        self, file_path: str, engine: Optional[str] = None, content: Optional[bytes] = None
+    ) -> Tuple[str, str]:
+        """
+        Pick the OCR language of a document.
+        
+        Documents with a text layer are detected from its first pages. For
+        scanned documents the header band of the first page is OCRed with
+        the default language's model, which reads the words the candidate
+        languages' stopword lists are made of well enough (accents aside).
+        That band is page cached, so the region-of-interest pass reuses it
+        when the document turns out to be in the default language.
+        
+        Args:
+            file_path: Path to the document file
+            engine: OCR engine name for the first pass, defaults to the OCR_ENGINE setting
+            content: The file's bytes when the caller has already read them, so the file is not read again
+            
+        Returns:
+            (language, source), where source is "text_layer", "first_pass",
+            or "default" when there was nothing to go on or detection was
+            inconclusive
+        """
+        default = settings.OCR_DEFAULT_LANGUAGE
+        if len(settings.OCR_LANGUAGES) < 2:
+            return default, "default"
+        
+        try:
+            text, source = self._text_layer_sample(file_path, content), "text_layer"
+            if not text.strip():
+                ocr_engine = get_engine(engine, default)
+                first_page = self._first_page_image(file_path, content) if ocr_engine.renders_pages else None
+                if first_page is None:
+                    return default, "default"
+                image, page_count = first_page
+                top, bottom = _roi_bands(image.shape[0])[0]
+                entry = self._start_image_ocr(image[top:bottom], 0, None, ocr_engine)
+                text, source = self._finish_page(entry, page_count).blocks.text, "first_pass"
+        except Exception as e:
+            logger.error(f"Error detecting the language of {file_path}: {e}")
+            return default, "default"
+        
+        lang = detect_language(text, settings.OCR_LANGUAGES)
+        if lang is None:
+            return default, "default"
+        return lang, source
+    
+    def _text_layer_sample(self, file_path: str, content: Optional[bytes] = None) -> str:
+        """Embedded text of a PDF's first pages; empty for scanned PDFs and images."""
+        _, ext = os.path.splitext(file_path)
+        if ext.lower() != '.pdf':
+            return ""
+        with _open_pdf(file_path, content) as doc:
+            return "\n".join(doc[i].get_text() for i in range(min(len(doc), LANGUAGE_SAMPLE_PAGES)))
+    
+    def _first_page_image(
+        self, file_path: str, content: Optional[bytes] = None
+    ) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        The first page of a document as an image, with the page count.
+        
+        None when the first page has a text layer or cannot be rendered.
+        """
+        try:
+            _, ext = os.path.splitext(file_path)
+            if ext.lower() == '.pdf':
+                with _open_pdf(file_path, content) as doc:
+                    page_count = len(doc)
+                    if page_count == 0 or doc[0].get_text().strip():
+                        return None
+                    return render_page_image(doc[0]), page_count
+            with _open_image(file_path, content) as frames:
+                page_count = getattr(frames, "n_frames", 1)
+                return next(image_frames(frames)), page_count
+        except Exception as e:
+            logger.error(f"Error rendering first page of {file_path}: {e}")
+            return None
+    
+    def _iter_pdf_pages(
+        self, file_path: str, engine: OCREngine, content: Optional[bytes] = None
+    ) -> Iterator["PageResult"]:
+        """Process a PDF document by extracting and OCR'ing each page."""
+        logger.info(f"Processing PDF document: {file_path} (OCR engine {engine.name})")
+        
+        # Open the PDF
+        doc = _open_pdf(file_path, content)
         
         try:
-            # Open the PDF
-            doc = fitz.open(file_path)
+            page_count = len(doc)
             
-            # Process each page
-            for page_num, page in enumerate(doc):
-                logger.info(f"Processing page {page_num + 1} of {len(doc)}")
-                
-                # Try to extract text directly from PDF first
-                text = page.get_text()
-                
-                if text.strip():
-                    # If text is available in the PDF, use it
-                    logger.info(f"Using embedded text from page {page_num + 1}")
-                    
-                    # Extract text blocks with their positions
-                    blocks = page.get_text("blocks")
-                    for block in blocks:
-                        # Format: (x0, y0, x1, y1, text, block_no, block_type)
-                        x0, y0, x1, y1, block_text, _, _ = block
-                        
-                        # Skip empty blocks
-                        if not block_text.strip():
-                            continue
-                            
-                        result.append({
-                            "text": block_text.strip(),
-                            "confidence": 1.0,  # High confidence for embedded text
-                            "position": [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
-                        })
-                
-                else:
-                    # If no embedded text, render page as image and perform OCR
-                    logger.info(f"No embedded text found in page {page_num + 1}, using OCR")
-                    
-                    # Get a pixmap/image of the page
-                    pix = page.get_pixmap()
-                    
-                    # Save to a temporary file
-                    temp_img_path = f"temp_page_{page_num}.png"
-                    pix.save(temp_img_path)
-                    
-                    # Process with OCR
-                    page_result = self._process_image(temp_img_path)
-                    result.extend(page_result)
+            # Find the pages without embedded text up front to pick the OCR strategy
+            has_text = [bool(page.get_text().strip()) for page in doc]
+            scanned_count = has_text.count(False) if engine.renders_pages else 0
+            pool, max_in_flight = self._ocr_concurrency(scanned_count, engine)
+            
+            def start_pages() -> Iterator[_PendingPage]:
+                for page_num, page in enumerate(doc):
+                    logger.info(f"Processing page {page_num + 1} of {page_count}")
                     
-                    # Clean up temporary file
-                    try:
-                        os.remove(temp_img_path)
-                    except OSError:
-                        pass
+                    if has_text[page_num]:
+                        # If text is available in the PDF, use it
+                        logger.info(f"Using embedded text from page {page_num + 1}")
+                        yield _PendingPage(page_num, "text", blocks=self._extract_text_blocks(page, page_num))
+                    elif not engine.renders_pages:
+                        logger.info(f"No embedded text found in page {page_num + 1}, skipped by engine {engine.name}")
+                        yield _PendingPage(page_num, "text")
+                    else:
+                        # If no embedded text, render page as image and perform OCR
+                        logger.info(f"No embedded text found in page {page_num + 1}, using OCR")
+                        yield self._start_page_ocr(page, page_num, pool, engine)
             
-            return result
+            yield from self._iter_pending(start_pages(), page_count, max_in_flight)
             
-        except Exception as e:
-            logger.error(f"Error processing PDF: {e}")
-            return []
+        finally:
+            doc.close()
+    
+    def _iter_image_pages(
+        self, file_path: str, engine: OCREngine, content: Optional[bytes] = None
+    ) -> Iterator["PageResult"]:
+        """
+        Process an image file (PNG, JPEG, TIFF, ...) with one page per frame.
+        
+        Multi-page TIFF frames are decoded one at a time as their OCR is
+        started, so only the frames in flight are held in memory, never the
+        whole file.
+        """
+        logger.info(f"Processing image document: {file_path} (OCR engine {engine.name})")
+        
+        with _open_image(file_path, content) as frames:
+            page_count = getattr(frames, "n_frames", 1)
+            scanned_count = page_count if engine.renders_pages else 0
+            pool, max_in_flight = self._ocr_concurrency(scanned_count, engine)
+            
+            def start_pages() -> Iterator[_PendingPage]:
+                if not engine.renders_pages:
+                    # Images have no text layer, so there is nothing for such an engine to read
+                    for page_num in range(page_count):
+                        logger.info(f"Page {page_num + 1} of {file_path} skipped by engine {engine.name}")
+                        yield _PendingPage(page_num, "text")
+                    return
+                for page_num, image in enumerate(image_frames(frames)):
+                    logger.info(f"Processing page {page_num + 1} of {page_count}")
+                    yield self._start_image_ocr(image, page_num, pool, engine)
+            
+            yield from self._iter_pending(start_pages(), page_count, max_in_flight)
+    
+    def _ocr_concurrency(
+        self, scanned_count: int, engine: OCREngine
+    ) -> Tuple[Optional[ProcessPoolExecutor], int]:
+        """Pick the page pool (if any) and how many pages may be in flight for a document."""
+        if scanned_count and self._use_page_pool(scanned_count):
+            # Spread the scanned pages across the worker processes
+            logger.info(f"OCRing {scanned_count} pages with {settings.OCR_PAGE_WORKERS} workers")
+            return self._get_page_pool(), 2 * settings.OCR_PAGE_WORKERS
+        if engine.is_batching:
+            # Keep enough pages queued that they can share batches
+            return None, 2 * settings.OCR_BATCH_SIZE
+        return None, 0
     
-    def _process_image(self, image_path: str) -> List[Dict[str, Any]]:
-        """Process an image using OCR."""
-        logger.info(f"Processing image: {image_path}")
+    def _iter_pending(
+        self, entries: Iterator["_PendingPage"], page_count: int, max_in_flight: int
+    ) -> Iterator["PageResult"]:
+        """Yield pages in order as their OCR finishes, with at most `max_in_flight` pages started ahead."""
+        # Pages handed to OCR but not yielded yet, in page order
+        pending: Deque[_PendingPage] = deque()
         
         try:
-            # Run OCR on the image
-            ocr_result = self.ocr.ocr(image_path, cls=True)
+            for entry in entries:
+                pending.append(entry)
+                
+                # Hand out finished pages in order, waiting once too many are in flight
+                while pending and (pending[0].is_ready() or len(pending) > max_in_flight):
+                    yield self._finish_page(pending.popleft(), page_count)
             
-            # Process the result
-            return self._structure_result(ocr_result)
+            while pending:
+                yield self._finish_page(pending.popleft(), page_count)
             
+        finally:
+            # Reached when the caller stops early: drop the OCR that is still queued
+            for entry in pending:
+                if entry.future is not None:
+                    entry.future.cancel()
+    
+    def _extract_text_blocks(self, page: "fitz.Page", page_num: int) -> OcrBlocks:
+        """Extract the embedded text blocks of a PDF page with their positions."""
+        texts = []
+        positions = []
+        
+        blocks = page.get_text("blocks")
+        for block in blocks:
+            # Format: (x0, y0, x1, y1, text, block_no, block_type)
+            x0, y0, x1, y1, block_text, _, _ = block
+            
+            # Skip empty blocks
+            if not block_text.strip():
+                continue
+            
+            texts.append(block_text.strip())
+            positions.append([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])
+        
+        # High confidence for embedded text
+        return OcrBlocks.build(texts, positions, [1.0] * len(texts), page_num + 1)
+    
+    def _start_page_ocr(
+        self, page: "fitz.Page", page_num: int, pool: Optional[ProcessPoolExecutor], engine: OCREngine
+    ) -> "_PendingPage":
+        """Render a scanned page and start its OCR, unless it is in the page cache."""
+        return self._start_image_ocr(render_page_image(page), page_num, pool, engine)
+    
+    def _start_image_ocr(
+        self, image: np.ndarray, page_num: int, pool: Optional[ProcessPoolExecutor], engine: OCREngine
+    ) -> "_PendingPage":
+        """Start the OCR of a rendered page (or part of one), unless it is in the page cache."""
+        page_key = None
+        if settings.OCR_CACHE_ENABLED:
+            page_key = ocr_cache.page_key(image, settings.OCR_RENDER_DPI, self._cache_version(engine))
+            cached = ocr_cache.get_page(page_key)
+            if cached is not None:
+                logger.info(f"Using cached OCR result for page {page_num + 1}")
+                # The same page can sit at a different position in another document
+                blocks = OcrBlocks.from_dicts(cached)
+                return _PendingPage(page_num, "cache", blocks=self._tag_page(blocks, page_num))
+        
+        coordinate_map = None
+        timings = {}
+        if settings.OCR_PREPROCESS_ENABLED:
+            preprocessed = image_preprocessor.process(image)
+            image, coordinate_map = preprocessed.image, preprocessed.coordinate_map
+            timings["preprocess"] = sum(preprocessed.timings.values())
+            step_times = ", ".join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in preprocessed.timings.items())
+            logger.info(f"Pre-processed page {page_num + 1} to {image.shape[1]}x{image.shape[0]} ({step_times})")
+        
+        if pool is not None:
+            # Pages are rendered here and shipped to the workers as arrays; the workers orient them
+            future = pool.submit(_ocr_image_in_worker, image, engine.name, engine.lang)
+            return _PendingPage(
+                page_num, "ocr", future=future, page_key=page_key, coordinate_map=coordinate_map,
+                timings=timings, structured=True,
+            )
+        # Batching engines queue the page, the others OCR it before returning
+        image, orientation = self._orient(image, engine)
+        future = engine.submit(image, cls=orientation is None or orientation.needs_line_cls)
+        return _PendingPage(
+            page_num, "ocr", future=future, page_key=page_key, coordinate_map=coordinate_map,
+            orientation=orientation, timings=timings,
+        )
+    
+    def _finish_page(self, entry: "_PendingPage", page_count: int) -> "PageResult":
+        """Wait for a page's OCR if needed, then tag and cache its blocks."""
+        blocks = entry.blocks
+        timings = dict(entry.timings)
+        failed = False
+        if entry.future is not None:
+            try:
+                if entry.structured:
+                    blocks, ocr_timings = entry.future.result()
+                else:
+                    blocks, ocr_timings = self._finish_orientation(
+                        self._structure_future(entry.future), entry.orientation
+                    )
+            except Exception as e:
+                logger.error(f"Error performing OCR on page {entry.page_num + 1}: {e}")
+                blocks, ocr_timings, failed = OcrBlocks.empty(), {}, True
+            timings.update(ocr_timings)
+        
+        if entry.source == "ocr":
+            if entry.coordinate_map is not None:
+                blocks = entry.coordinate_map.apply(blocks)
+            blocks = self._tag_page(blocks, entry.page_num)
+            if entry.page_key and len(blocks):
+                ocr_cache.put(entry.page_key, blocks.to_dicts())
+        
+        return PageResult(
+            page_num=entry.page_num, page_count=page_count, blocks=blocks, source=entry.source, timings=timings,
+            failed=failed,
+        )
+    
+    def _tag_page(self, blocks: OcrBlocks, page_num: int) -> OcrBlocks:
+        """Attach the (1-based) page number to OCR blocks."""
+        blocks.pages[:] = page_num + 1
+        return blocks
+    
+    def _cache_version(self, engine: OCREngine) -> str:
+        """Everything besides the DPI that changes OCR output, for cache keys."""
+        version = engine.version
+        if settings.OCR_PREPROCESS_ENABLED:
+            version += f"-pre-{image_preprocessor.signature}"
+        if self._orients(engine):
+            version += f"-orient-{settings.OCR_ORIENTATION_SAMPLE_LINES}:{settings.OCR_ORIENTATION_MIN_AGREEMENT}"
+        return version
+    
+    def _orients(self, engine: OCREngine) -> bool:
+        """Whether pages for an engine get the orientation pre-pass."""
+        return settings.OCR_ORIENTATION_ENABLED and engine.classifies_angles
+    
+    def _orient(self, image: np.ndarray, engine: OCREngine) -> Tuple[np.ndarray, Optional[Orientation]]:
+        """Turn a page image upright when the orientation pre-pass is on, else leave it as it is."""
+        if not self._orients(engine):
+            return image, None
+        try:
+            image, orientation = page_orienter.orient(image, engine)
         except Exception as e:
-            logger.error(f"Error performing OCR on image: {e}")
-            return []
+            # Per-line classification still copes with the page as it is
+            logger.error(f"Error detecting page orientation: {e}")
+            return image, None
+        logger.info(
+            f"Page turned {orientation.rotation * 90} degrees in {orientation.seconds * 1000:.1f} ms "
+            f"({orientation.votes} votes, per-line angle classification "
+            f"{'on' if orientation.needs_line_cls else 'off'})"
+        )
+        return image, orientation
+    
+    def _finish_orientation(
+        self, blocks: OcrBlocks, orientation: Optional[Orientation]
+    ) -> Tuple[OcrBlocks, Dict[str, float]]:
+        """Map the blocks of an oriented page back to the page as given, with the pre-pass timings."""
+        if orientation is None:
+            return blocks, {}
+        cls_saved = page_orienter.record(orientation, len(blocks))
+        return orientation.unrotate(blocks), {"orientation": orientation.seconds, "cls_saved": cls_saved}
+    
+    def _use_page_pool(self, scanned_page_count: int) -> bool:
+        """Decide whether the scanned pages of a document should be OCRed in parallel."""
+        return (
+            settings.OCR_PAGE_WORKERS > 1
+            and scanned_page_count >= settings.OCR_PARALLEL_MIN_PAGES
+        )
+    
+    def _get_page_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the page worker pool, starting it on first use.
+        
+        The pool is kept alive between documents so every worker keeps its
+        PaddleOCR models loaded.
+        """
+        if self._page_pool is None:
+            # Paddle's inference threads do not survive a fork, so start clean processes
+            self._page_pool = ProcessPoolExecutor(
+                max_workers=settings.OCR_PAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_page_worker,
+            )
+            logger.info(f"Started OCR page pool with {settings.OCR_PAGE_WORKERS} workers")
+        return self._page_pool
+    
+    def shutdown(self) -> None:
+        """Stop the page worker pool and the engines' batch servers if they were started."""
+        if self._page_pool is not None:
+            self._page_pool.shutdown(wait=True)
+            self._page_pool = None
+        shutdown_engines()
+    
+    def _process_image(self, image: Union[str, np.ndarray], engine: OCREngine, cls: bool = True) -> OcrBlocks:
+        """
+        Process an image using OCR.
+        
+        Args:
+            image: Path to an image file, or an already decoded BGR image array
+            engine: OCR engine to run
+            cls: Whether to classify the angle of each text line
+        
+        OCR errors are raised rather than returned as an empty result.
+        """
+        if isinstance(image, str):
+            logger.info(f"Processing image: {image}")
+        
+        # Run OCR on the image and process the result
+        return self._structure_future(engine.submit(image, cls=cls))
     
-    def _structure_result(self, ocr_result: List) -> List[Dict[str, Any]]:
+    def _structure_future(self, future: Future) -> OcrBlocks:
+        """
+        Wait for an engine's OCR result and structure it. Errors are raised,
+        so the page can be marked failed rather than blank.
+        """
+        return self._structure_result(future.result())
+    
+    def _structure_result(self, ocr_result: List) -> OcrBlocks:
         """
         Convert OCR result to structured data.
         
@@ -146,41 +667,104 @@ class OCRService:
             ocr_result: Raw OCR result from PaddleOCR
             
         Returns:
-            List of dictionaries with text, confidence, and position
+            OcrBlocks with text, confidence, and position
         """
-        structured_data = []
-        
-        # Check if result is None or empty
-        if not ocr_result:
-            return structured_data
-        
-        # Process the OCR result format
-        for page_result in ocr_result:
-            if not page_result:
-                continue
-                
-            for line in page_result:
-                # Extract the text, confidence, and coordinates
-                if isinstance(line, list) and len(line) >= 2:
-                    coordinates = line[0]  # Position coordinates
-                    text_info = line[1]    # [text, confidence]
-                    
-                    if isinstance(text_info, tuple) and len(text_info) >= 2:
-                        text = text_info[0]
-                        confidence = text_info[1]
-                        
-                        # Skip empty text
-                        if not text or not text.strip():
-                            continue
-                        
-                        structured_data.append({
-                            "text": text.strip(),
-                            "confidence": float(confidence),
-                            "position": coordinates
-                        })
-        
+        structured_data = OcrBlocks.from_paddle(ocr_result)
         logger.info(f"Structured {len(structured_data)} text blocks from OCR result")
         return structured_data
 
 
-ocr_service = OCRService()
\ No newline at end of file
+def _open_pdf(file_path: str, content: Optional[bytes] = None) -> "fitz.Document":
+    """Open a PDF from bytes already read, or from its path."""
+    if content is not None:
+        return fitz.open(stream=content, filetype="pdf")
+    return fitz.open(file_path)
+
+
+def _open_image(file_path: str, content: Optional[bytes] = None) -> Image.Image:
+    """Open an image file from bytes already read, or from its path."""
+    return Image.open(io.BytesIO(content) if content is not None else file_path)
+
+
+def render_page_image(page: "fitz.Page") -> np.ndarray:
+    """
+    Render a PDF page straight into a BGR image array for PaddleOCR.
+    
+    The pixmap samples are used directly instead of round-tripping through a
+    PNG file, which saves a disk write plus a PNG encode/decode per page and
+    avoids clashes between concurrent tasks writing the same temp file name.
+    """
+    pix = page.get_pixmap(dpi=settings.OCR_RENDER_DPI, colorspace=fitz.csRGB, alpha=False)
+    samples = np.frombuffer(pix.samples, dtype=np.uint8)
+    # Rows can be padded, so slice each row down to width * channels
+    image = samples.reshape(pix.height, pix.stride)[:, :pix.width * pix.n]
+    image = image.reshape(pix.height, pix.width, pix.n)
+    # PaddleOCR follows the OpenCV convention of BGR channel order
+    return np.ascontiguousarray(image[:, :, ::-1])
+
+
+def image_frames(image: Image.Image) -> Iterator[np.ndarray]:
+    """
+    Decode the frames of an open image file into BGR image arrays for PaddleOCR.
+    
+    PNG and JPEG files have one frame, multi-page TIFFs one per page. Pillow
+    only reads a frame's pixels when it is seeked to, so each frame is
+    decoded as the iterator reaches it.
+    """
+    for frame in ImageSequence.Iterator(image):
+        # Scanners write bilevel, grayscale, palette and CMYK frames, and phones rotate by EXIF tag
+        rgb = ImageOps.exif_transpose(frame).convert("RGB")
+        yield np.ascontiguousarray(np.asarray(rgb)[:, :, ::-1])
+
+
+def _split_pages(blocks: OcrBlocks, page_count: Optional[int] = None) -> Iterator[PageResult]:
+    """
+    Split the cached blocks of a whole document back into its pages,
+    including blank pages without blocks.
+    """
+    # Blocks without a page number belong to the first page
+    pages = np.maximum(blocks.pages, 1)
+    # Older entries have no page count, so count up to the last page with blocks
+    page_count = max(page_count or 1, int(pages.max()) if len(blocks) else 1)
+    for page_num in range(page_count):
+        page_blocks = blocks.filter(pages == page_num + 1)
+        yield PageResult(page_num=page_num, page_count=page_count, blocks=page_blocks, source="cache")
+
+
+def _roi_bands(height: int) -> List[Tuple[int, int]]:
+    """Row ranges of the header and footer bands of a page image, merged when they overlap."""
+    header_bottom = int(round(height * settings.OCR_ROI_HEADER_FRACTION))
+    footer_top = int(round(height * (1 - settings.OCR_ROI_FOOTER_FRACTION)))
+    if footer_top <= header_bottom:
+        return [(0, height)]
+    return [(0, header_bottom), (footer_top, height)]
+
+
+def _init_page_worker() -> None:
+    """
+    Initializer for the page pool processes.
+    
+    Every worker has its own module level OCRService. Warming it up here
+    loads the default engine's models once per process, and they stay warm
+    for every page the worker handles. Other engines load on first use.
+    """
+    ocr_service.warm_up()
+    logger.info(f"OCR page worker {os.getpid()} ready")
+
+
+def _ocr_image_in_worker(image: np.ndarray, engine_name: str, lang: str) -> Tuple[OcrBlocks, Dict[str, float]]:
+    """
+    Orient and OCR a rendered page image inside a page pool worker.
+    
+    Returns the blocks, whose arrays pickle far smaller than dicts, and the
+    orientation timings.
+    """
+    engine = get_engine(engine_name, lang)
+    image, orientation = ocr_service._orient(image, engine)
+    blocks = ocr_service._process_image(
+        image, engine, cls=orientation is None or orientation.needs_line_cls
+    )
+    return ocr_service._finish_orientation(blocks, orientation)
+
+
+ocr_service = OCRService()
@@ -0,0 +1,338 @@
+# server/app/services/pipeline.py
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.core.config import settings
+from app.services.ai_service import AIService, ai_service
+from app.services.normalization import normalizer
+from app.services.ocr_blocks import OcrBlocks
+from app.services.ocr_service import OCRService, PageResult, ocr_service
+from app.services.vendor_index import vendor_index
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DocumentContext:
+    """Everything known about a document being processed, handed from stage to stage."""
+    document_id: int
+    queue_id: int
+    queue_item: Optional[models.Queue] = None
+    document: Optional[models.Document] = None
+    content: bytes = b""  # the file, read once by the load stage
+    language: Optional[str] = None
+    language_source: str = "queue"  # "queue", "text_layer", "first_pass" or "default"
+    pages: List[PageResult] = field(default_factory=list)
+    blocks: OcrBlocks = field(default_factory=OcrBlocks.empty)
+    ocr_mode: str = "full"  # "full", "roi" or "early_stop"
+    skipped_pages: List[int] = field(default_factory=list)
+    # Fields extracted from the pages done so far for the status endpoint, and when that last ran
+    partial_result: Optional[Dict[str, Any]] = None
+    partial_pages: int = 0
+    partial_time: float = 0.0
+    # Per-page OCR stage seconds (pre-processing, orientation, classifier time saved), summed
+    stage_timings: Dict[str, float] = field(default_factory=dict)
+    # Seconds per pipeline stage: "load", "ocr", "extraction" and "db"
+    timings: Dict[str, float] = field(default_factory=lambda: {"load": 0.0, "ocr": 0.0, "extraction": 0.0, "db": 0.0})
+    ai_result: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[models.ProcessingResult] = None
+
+    @property
+    def file_path(self) -> str:
+        return self.document.file_path
+
+
+class DocumentPipeline:
+    """
+    Processes a queued document in a single pass.
+
+    The load stage reads the file once, the OCR stage turns its bytes into
+    blocks page by page (recording progress as it goes), the extraction
+    stage runs on those blocks and the persist stage stores the result.
+    No stage reads the file or runs OCR again.
+    """
+
+    def __init__(self, ocr: OCRService, ai: AIService):
+        self.ocr_service = ocr
+        self.ai_service = ai
+
+    def run(self, db: Session, context: DocumentContext) -> DocumentContext:
+        """Run every stage on a document whose queue item is already marked as processing."""
+        self.load(db, context)
+        self.ocr(db, context)
+        self.extract(context)
+        self.persist(db, context)
+        return context
+
+    def load(self, db: Session, context: DocumentContext) -> None:
+        """Fetch the document and queue item, pick up new vendor templates, and read the file."""
+        db_start = time.time()
+        context.document = crud.document.get(db, id=context.document_id)
+        if context.queue_item is None:
+            context.queue_item = crud.queue.get(db, id=context.queue_id)
+        if settings.VENDOR_TEMPLATES_ENABLED:
+            vendor_index.refresh(db)
+        context.timings["db"] += time.time() - db_start
+
+        if not context.document or not context.document.file_path:
+            raise ValueError(f"Document {context.document_id} not found or file path is missing")
+        if not os.path.exists(context.file_path):
+            raise FileNotFoundError(f"File not found: {context.file_path}")
+
+        load_start = time.time()
+        with open(context.file_path, "rb") as f:
+            context.content = f.read()
+        context.timings["load"] += time.time() - load_start
+
+    def ocr(self, db: Session, context: DocumentContext) -> None:
+        """
+        OCR the document page by page, recording progress after each page.
+
+        With OCR_ROI_ENABLED the header and footer of page one are tried
+        first, and with OCR_EARLY_STOP_ENABLED the remaining pages are
+        skipped once the required fields are found. OCR errors are logged
+        and the pages done so far are kept.
+        """
+        document_id = context.document_id
+        queue_item = context.queue_item
+        logger.info(f"Starting OCR processing for document {document_id}")
+        ocr_start = time.time()
+        # Progress extraction and database writes happen during OCR but are not OCR work
+        progress_start = context.timings["extraction"] + context.timings["db"]
+        context.language, context.language_source = queue_item.language, "queue"
+        try:
+            if context.language is None:
+                if settings.OCR_LANGUAGE_DETECTION:
+                    context.language, context.language_source = self.ocr_service.detect_document_language(
+                        context.file_path, engine=queue_item.ocr_engine, content=context.content
+                    )
+                else:
+                    context.language, context.language_source = settings.OCR_DEFAULT_LANGUAGE, "default"
+            logger.info(f"OCR language for document {document_id}: {context.language} ({context.language_source})")
+
+            if settings.OCR_ROI_ENABLED:
+                # Header and footer of page one first, the whole document only if fields are missing
+                roi_page = self.ocr_service.ocr_regions(
+                    context.file_path, engine=queue_item.ocr_engine, lang=context.language, content=context.content
+                )
+                if roi_page is not None:
+                    add_stage_timings(context.stage_timings, roi_page)
+                    partial = self.record_page_progress(db, context, roi_page, roi_page.blocks)
+                    missing = missing_required_fields(partial)
+                    if not missing:
+                        context.pages = [roi_page]
+                        context.ocr_mode = "roi"
+                        context.skipped_pages = list(range(2, roi_page.page_count + 1))
+                    else:
+                        logger.info(
+                            f"Fields {', '.join(missing)} not found in the header and footer of "
+                            f"document {document_id}, running full OCR"
+                        )
+
+            if context.ocr_mode == "full":
+                pages = self.ocr_service.iter_pages(
+                    context.file_path, engine=queue_item.ocr_engine, lang=context.language, content=context.content
+                )
+                try:
+                    for page in pages:
+                        context.pages.append(page)
+                        add_stage_timings(context.stage_timings, page)
+                        remaining = page.page_count - page.page_num - 1
+                        # Early stop needs the fields after every page, progress reporting only now and then
+                        stop_early = remaining and can_stop_early()
+                        ocr_result = None
+                        if stop_early or (remaining and partial_extraction_due(context, page)):
+                            ocr_result = OcrBlocks.concat([done.blocks for done in context.pages])
+                        partial = self.record_page_progress(db, context, page, ocr_result)
+
+                        if stop_early and not missing_required_fields(partial):
+                            context.skipped_pages = list(range(page.page_num + 2, page.page_count + 1))
+                            logger.info(
+                                f"Required fields of document {document_id} found on page "
+                                f"{page.page_num + 1}, skipping pages {context.skipped_pages}"
+                            )
+                            context.ocr_mode = "early_stop"
+                            break
+                finally:
+                    # Cancels the OCR of pages that are queued but no longer needed
+                    pages.close()
+        except Exception as e:
+            # Same as a failed OCR run before: carry on with the pages we have
+            logger.error(f"Error during OCR of document {document_id}: {e}")
+        # Joined once, rather than after every page
+        context.blocks = OcrBlocks.concat([page.blocks for page in context.pages])
+
+        progress_time = context.timings["extraction"] + context.timings["db"] - progress_start
+        context.timings["ocr"] += time.time() - ocr_start - progress_time
+        logger.info(f"OCR ({context.ocr_mode}) completed in {context.timings['ocr']:.2f} seconds")
+        if context.stage_timings:
+            stage_summary = ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in context.stage_timings.items())
+            logger.info(f"OCR stage timings for document {document_id}: {stage_summary}")
+
+    def extract(self, context: DocumentContext) -> None:
+        """Extract the invoice fields from the OCR blocks."""
+        logger.info(f"Starting NLP entity extraction for document {context.document_id}")
+        extraction_start = time.time()
+        context.ai_result = self.ai_service.process_document(context.blocks, file_path=context.file_path)
+        context.timings["extraction"] += time.time() - extraction_start
+        logger.info(f"NLP extraction completed in {context.timings['extraction']:.2f} seconds")
+
+    def persist(self, db: Session, context: DocumentContext) -> None:
+        """Store the result and mark the queue item and document as done."""
+        document_id = context.document_id
+        timings = context.timings
+        total_processing_time = timings["load"] + timings["ocr"] + timings["extraction"]
+        logger.info(f"Document {document_id} processed in {total_processing_time:.2f} seconds")
+
+        # Extract data from AI result
+        extracted_data = context.ai_result.get("extracted_data", {})
+        confidence_score = context.ai_result.get("confidence_score", 0.0)
+
+        # Database storage stage
+        db_start = time.time()
+
+        # Create result in database with detailed timing information
+        result_in = schemas.ResultCreate(
+            document_id=document_id,
+            invoice_number=extracted_data.get("invoice_number"),
+            vendor_name=extracted_data.get("vendor_name"),
+            invoice_date=parse_date(extracted_data.get("invoice_date"), vendor=extracted_data.get("vendor_name")),
+            due_date=parse_date(extracted_data.get("due_date"), vendor=extracted_data.get("vendor_name")),
+            total_amount=extracted_data.get("total_amount"),
+            confidence_score=confidence_score,
+            processing_time=total_processing_time,
+            ocr_time=timings["ocr"],
+            nlp_extraction_time=timings["extraction"],
+            db_operation_time=timings["db"],  # This will be updated below
+            raw_extraction_data={
+                "ocr_result": context.blocks.to_dicts(),
+                "ocr_mode": context.ocr_mode,
+                "language": {"code": context.language, "source": context.language_source},
+                "skipped_pages": context.skipped_pages,
+                "stage_timings": context.stage_timings,
+                "ai_result": context.ai_result
+            },
+            status="pending_validation"
+        )
+
+        context.result = crud.result.create(db, obj_in=result_in)
+        logger.info(f"Created result record {context.result.id} for document {document_id}")
+
+        # Update queue status, document status and process end time
+        context.queue_item = crud.queue.update_status(db, queue_id=context.queue_id, status="completed")
+        context.document = crud.document.update_status(db, document_id=document_id, status="processed")
+        context.queue_item = crud.queue.update_process_end_time(db, queue_id=context.queue_id)
+
+        timings["db"] += time.time() - db_start
+
+        # Update the db_operation_time field after creation
+        db.query(models.ProcessingResult).filter(models.ProcessingResult.id == context.result.id).update(
+            {"db_operation_time": timings["db"]}
+        )
+        db.commit()
+
+    def record_page_progress(
+        self, db: Session, context: DocumentContext, page: PageResult, ocr_result: Optional[OcrBlocks] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Persist the progress of a document after one of its pages is done.
+        Given the blocks of the pages processed so far, runs extraction over
+        them so that the status endpoint can show partial fields while the
+        rest is still being OCRed; otherwise the last partial fields are kept.
+        Returns the extraction result for those pages, or None.
+        """
+        partial = None
+        if ocr_result is not None:
+            extraction_start = time.time()
+            # Not counted in the pattern statistics: the whole document is extracted again at the end
+            partial = self.ai_service.extract_data(ocr_result, record=False)
+            extracted_data = partial["extracted_data"]
+            partial_result = {
+                key: value for key, value in extracted_data.items() if key != "line_items"
+            }
+            partial_result["line_item_count"] = len(extracted_data.get("line_items", []))
+            partial_result["confidence_score"] = partial["confidence_score"]
+            context.partial_result = partial_result
+            context.partial_pages = page.page_num + 1
+            context.partial_time = time.time()
+            context.timings["extraction"] += context.partial_time - extraction_start
+
+        db_start = time.time()
+        crud.queue.update_progress(
+            db,
+            queue_id=context.queue_id,
+            pages_processed=page.page_num + 1,
+            pages_total=page.page_count,
+            partial_result=context.partial_result,
+        )
+        context.timings["db"] += time.time() - db_start
+        logger.info(f"Queue item {context.queue_id}: page {page.page_num + 1} of {page.page_count} done")
+        return partial
+
+
+def add_stage_timings(stage_timings: Dict[str, float], page: PageResult) -> None:
+    """Add a page's OCR stage seconds to the document's totals."""
+    for stage, seconds in page.timings.items():
+        stage_timings[stage] = stage_timings.get(stage, 0.0) + seconds
+
+
+def partial_extraction_due(context: DocumentContext, page: PageResult) -> bool:
+    """
+    Whether to extract the partial fields for the status endpoint after a
+    page: after the first page, then once OCR_PROGRESS_EXTRACT_PAGES pages
+    or OCR_PROGRESS_EXTRACT_SECONDS seconds have passed since the last time.
+    Each run covers every page so far, so running it after every page
+    would make long documents quadratic.
+    """
+    if not context.partial_pages:
+        return True
+    return (
+        page.page_num + 1 - context.partial_pages >= settings.OCR_PROGRESS_EXTRACT_PAGES
+        or time.time() - context.partial_time >= settings.OCR_PROGRESS_EXTRACT_SECONDS
+    )
+
+
+def missing_required_fields(ai_result: Dict[str, Any]) -> List[str]:
+    """
+    The OCR_REQUIRED_FIELDS that extraction did not find, or only found in
+    blocks below OCR_REQUIRED_FIELD_MIN_CONFIDENCE.
+    """
+    extracted_data = ai_result.get("extracted_data", {})
+    field_confidence = ai_result.get("field_confidence", {})
+    return [
+        field for field in settings.OCR_REQUIRED_FIELDS
+        if extracted_data.get(field) is None
+        or field_confidence.get(field, 0.0) < settings.OCR_REQUIRED_FIELD_MIN_CONFIDENCE
+    ]
+
+
+def can_stop_early() -> bool:
+    """Whether OCR may stop before the last page once the required fields are found."""
+    return settings.OCR_EARLY_STOP_ENABLED and not settings.OCR_LINE_ITEMS_REQUIRED
+
+
+def parse_date(date_str: Optional[str], vendor: Optional[str] = None) -> Optional[datetime]:
+    """
+    Parse date string to datetime object.
+    Supports common numeric and month name formats; ambiguous day and month
+    order follows the vendor's earlier dates.
+    """
+    if not date_str:
+        return None
+
+    date = normalizer.parse_date(date_str, vendor=vendor)
+    if date is None:
+        logger.warning(f"Could not parse date string: {date_str}")
+    return date
+
+
+document_pipeline = DocumentPipeline(ocr_service, ai_service)
@@ -0,0 +1,125 @@
+# server/app/services/queue_scheduler.py
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.config import settings
+
+
+class FairShareScheduler:
+    """
+    Decides the order in which workers claim queued documents: fair shares
+    between the documents' owners, then priority, with waiting documents
+    aging towards higher priority.
+
+    Queued documents take turns on a clock in epoch seconds. A document's
+    turn is now, or the first turn still queued when that is earlier (the
+    workers are behind), but never sooner than `slot_seconds` / the owner's
+    weight after the owner's last queued turn. An owner's backlog is thus
+    spread out behind the next turn of every other owner, and an owner with
+    nothing queued starts at the front, though never more than
+    `aging_seconds` before now. The claim order is the turn less
+    (priority - 1) * `aging_seconds`: a document waiting `aging_seconds`
+    longer than another counts as one priority level higher, so low
+    priority documents get their turn however much higher priority work
+    keeps arriving. (Without the limit, a document at the front would pin
+    the first turn, and every new document would share its turn and
+    overtake it on priority alone.)
+
+    The key is fixed when the document is queued, so a claim is one index
+    lookup however many documents are queued.
+    """
+
+    def __init__(self, slot_seconds: float, aging_seconds: float, weights: Dict[int, float]):
+        self.slot_seconds = slot_seconds
+        self.aging_seconds = aging_seconds
+        self.weights = weights
+
+    def weight(self, owner_id: Optional[int]) -> float:
+        return self.weights.get(owner_id, 1.0) if owner_id is not None else 1.0
+
+    def enqueue(
+        self, db: Session, *, queue_id: int, owner_id: Optional[int], now: Optional[float] = None
+    ) -> Optional[models.Queue]:
+        """Mark a queue item as queued for the workers, with its fair share turn and claim key."""
+        queue_item = crud.queue.get(db, id=queue_id)
+        if queue_item is None:
+            return None
+        now = time.time() if now is None else now
+        turn = now
+        if self.slot_seconds > 0:
+            # Two items of one owner queued at the same moment may get the same turn
+            first_turn, owner_last_turn = crud.queue.get_fair_share_turns(db, owner_id=owner_id)
+            if first_turn is not None:
+                turn = min(turn, first_turn)
+                if self.aging_seconds > 0:
+                    turn = max(turn, now - self.aging_seconds)
+            if owner_last_turn is not None:
+                turn = max(turn, owner_last_turn + self.slot_seconds / self.weight(owner_id))
+        schedule_key = turn - ((queue_item.priority or 1) - 1) * self.aging_seconds
+        return crud.queue.mark_queued(
+            db, db_obj=queue_item, owner_id=owner_id, fair_share_turn=turn, schedule_key=schedule_key
+        )
+
+    def wait_stats(self, db: Session, *, hours: float = 24.0, owner_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Wait times from queueing to claiming per owner, over the items queued
+        in the last `hours`, and the documents each owner has queued now.
+        Restricted to one owner with `owner_id`.
+        """
+        now = datetime.now()
+        waits: Dict[Optional[int], List[float]] = {}
+        for row_owner, queued_time, start_time in crud.queue.get_wait_times(
+            db, since=now - timedelta(hours=hours), owner_id=owner_id
+        ):
+            waits.setdefault(row_owner, []).append(_seconds_since(queued_time, start_time))
+
+        owners: Dict[Any, Dict[str, Any]] = {}
+        for row_owner, owner_waits in waits.items():
+            owners[row_owner] = {**_wait_summary(owner_waits), "queued": 0, "oldest_queued_wait": None}
+        for row_owner, queued, oldest in crud.queue.get_queued_by_owner(db, owner_id=owner_id):
+            stats = owners.setdefault(row_owner, {**_wait_summary([]), "queued": 0, "oldest_queued_wait": None})
+            stats["queued"] = queued
+            if oldest is not None:
+                stats["oldest_queued_wait"] = round(_seconds_since(oldest, now), 3)
+
+        return {
+            "window_hours": hours,
+            "slot_seconds": self.slot_seconds,
+            "aging_seconds": self.aging_seconds,
+            "weights": self.weights,
+            "overall": _wait_summary([wait for owner_waits in waits.values() for wait in owner_waits]),
+            "owners": owners,
+        }
+
+
+def _seconds_since(earlier: datetime, now: datetime) -> float:
+    # Naive times are stored as local time; the database may return them timezone aware
+    if earlier.tzinfo is not None and now.tzinfo is None:
+        now = now.astimezone()
+    return max(0.0, (now - earlier).total_seconds())
+
+
+def _wait_summary(waits: List[float]) -> Dict[str, Any]:
+    """Count, mean, median, 95th percentile and maximum of wait times in seconds."""
+    if not waits:
+        return {"claimed": 0, "mean_wait": None, "p50_wait": None, "p95_wait": None, "max_wait": None}
+    waits = sorted(waits)
+    return {
+        "claimed": len(waits),
+        "mean_wait": round(sum(waits) / len(waits), 3),
+        "p50_wait": round(waits[(len(waits) - 1) // 2], 3),
+        "p95_wait": round(waits[int(0.95 * (len(waits) - 1))], 3),
+        "max_wait": round(waits[-1], 3),
+    }
+
+
+# Create a singleton instance
+queue_scheduler = FairShareScheduler(
+    settings.QUEUE_FAIR_SHARE_SLOT_SECONDS,
+    settings.QUEUE_PRIORITY_AGING_SECONDS,
+    settings.QUEUE_FAIR_SHARE_WEIGHTS,
+)
@@ -0,0 +1,214 @@
+# server/app/services/spatial_index.py
+from typing import Optional
+
+import numpy as np
+
+from app.services.ocr_blocks import OcrBlocks
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the bounding boxes of OCR blocks, per page.
+
+    Every block is listed in each grid cell its box overlaps, in one array
+    of block indices sorted by cell with the offsets of each cell. Region
+    queries only look at the blocks of the cells the region covers, and
+    the directional lookups walk cells outward from a block until no
+    closer block can follow, so neither looks at the whole page.
+
+    Cells are square, twice the median block height unless `cell_size` is
+    given, so a text line falls in one or two rows of cells.
+    """
+
+    # Cells along each axis of a page at most; the cell size grows beyond it
+    MAX_CELLS = 256
+
+    def __init__(self, blocks: OcrBlocks, cell_size: Optional[float] = None):
+        self.blocks = blocks
+        self.bounds = blocks.bounds().astype(np.float64) if len(blocks) else np.empty((0, 4))
+        self.pages = blocks.pages.astype(np.int64)
+
+        if len(blocks):
+            self.origin = self.bounds[:, :2].min(axis=0)
+            extent = np.maximum(self.bounds[:, 2:].max(axis=0) - self.origin, 1.0)
+            if cell_size is None:
+                heights = self.bounds[:, 3] - self.bounds[:, 1]
+                cell_size = 2.0 * float(np.median(heights))
+            cell_size = max(cell_size, float(extent.max()) / self.MAX_CELLS, 1e-3)
+        else:
+            self.origin = np.zeros(2)
+            extent = np.ones(2)
+            cell_size = cell_size or 1.0
+        self.cell_size = cell_size
+        self.columns, self.rows = (np.floor(extent / cell_size).astype(np.int64) + 1).tolist()
+
+        # Page numbers as consecutive slots of the cell key
+        self._page_values, page_slots = np.unique(self.pages, return_inverse=True)
+        cells = self._cells(self.bounds)
+        # One entry per (block, overlapped cell)
+        widths = cells[:, 2] - cells[:, 0] + 1
+        heights = cells[:, 3] - cells[:, 1] + 1
+        counts = widths * heights
+        owners = np.repeat(np.arange(len(blocks)), counts)
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        xs = cells[owners, 0] + offsets % widths[owners]
+        ys = cells[owners, 1] + offsets // widths[owners]
+        keys = self._key(page_slots[owners], ys, xs)
+
+        order = np.argsort(keys, kind="stable")
+        self._entries = owners[order]
+        self._keys, self._starts = np.unique(keys[order], return_index=True)
+        self._ends = np.append(self._starts[1:], len(order))
+        # Plain list copies for the directional lookups, made on first use
+        self._lists = None
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float, page: Optional[int] = None) -> np.ndarray:
+        """
+        Indices of the blocks whose boxes intersect a rectangle, in block order.
+
+        Without a page, the blocks of every page are searched.
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        pages = self._page_values if page is None else [page]
+        cx0, cy0, cx1, cy1 = self._cells(np.array([[x0, y0, x1, y1]], dtype=np.float64))[0]
+        ys, xs = np.mgrid[cy0:cy1 + 1, cx0:cx1 + 1]
+        found = [self._blocks_in(self._page_slot(p), ys.ravel(), xs.ravel()) for p in pages]
+        candidates = np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+        boxes = self.bounds[candidates]
+        hit = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        return candidates[hit]
+
+    def right_of(self, index: int, max_distance: Optional[float] = None) -> Optional[int]:
+        """
+        The nearest block on the same line to the right of a block.
+
+        Blocks count as on the same line when their vertical centre lies
+        within the block's height. Blocks may start up to a quarter of the
+        block's height before its right edge, for boxes that touch.
+        """
+        x0, y0, x1, y1 = self.bounds[index].tolist()
+        start = x1 - (y1 - y0) / 4
+
+        def accept(box) -> bool:
+            return box[0] >= start and y0 <= (box[1] + box[3]) / 2 <= y1
+
+        return self._nearest(index, accept, axis=0, start=start, band=(y0, y1), max_distance=max_distance)
+
+    def below(self, index: int, max_distance: Optional[float] = None) -> Optional[int]:
+        """
+        The nearest block under a block that overlaps its columns.
+
+        Blocks count when their horizontal extent overlaps the block's.
+        """
+        x0, y0, x1, y1 = self.bounds[index].tolist()
+        start = y1 - (y1 - y0) / 4
+
+        def accept(box) -> bool:
+            return box[1] >= start and box[0] <= x1 and box[2] >= x0
+
+        return self._nearest(index, accept, axis=1, start=start, band=(x0, x1), max_distance=max_distance)
+
+    def topmost(self, count: int, page: Optional[int] = None) -> np.ndarray:
+        """
+        Indices of the `count` blocks with the highest tops on a page, top to
+        bottom, ties in block order. Defaults to the first page.
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        slot = self._page_slot(int(self._page_values[0]) if page is None else page)
+        tops = self.bounds[:, 1]
+        columns = np.arange(self.columns)
+        found = []
+        for row in range(self.rows):
+            if len(found) >= count and np.sort(tops[found])[count - 1] < self.origin[1] + row * self.cell_size:
+                break
+            candidates = np.unique(self._blocks_in(slot, np.full(self.columns, row), columns))
+            # Each block once, in the row its top is in
+            first_row = np.floor((tops[candidates] - self.origin[1]) / self.cell_size) == row
+            found.extend(candidates[first_row].tolist())
+        found = np.sort(np.asarray(found, dtype=np.int64))
+        return found[np.argsort(tops[found], kind="stable")][:count]
+
+    def _nearest(self, index, accept, axis: int, start: float, band, max_distance: Optional[float]) -> Optional[int]:
+        """
+        Walk the cells from `start` along an axis (0 = x, 1 = y), one line of
+        cells across a band of the other axis at a time, and return the
+        accepted block whose near edge is closest to `start` (ties to the
+        lower block index).
+        """
+        slot = self._page_slot(int(self.pages[index]))
+        if slot < 0:
+            return None
+        size = self.cell_size
+        origin = float(self.origin[axis])
+        other = float(self.origin[1 - axis])
+        lines, across = (self.columns, self.rows) if axis == 0 else (self.rows, self.columns)
+        band_cells = range(max(int((band[0] - other) // size), 0), min(int((band[1] - other) // size), across - 1) + 1)
+        if self._lists is None:
+            # The lookups only touch a few cells each, which plain lists serve faster than arrays
+            self._lists = (
+                dict(zip(self._keys.tolist(), zip(self._starts.tolist(), self._ends.tolist()))),
+                self._entries.tolist(),
+                self.bounds.ravel().tolist(),
+            )
+        spans, entries, boxes = self._lists
+
+        best, best_gap = None, float("inf")
+        for line in range(max(int((start - origin) // size), 0), lines):
+            # Blocks listed from here on start at or after this line's near edge
+            reach = origin + line * size - start
+            if best_gap <= reach or (max_distance is not None and reach > max_distance):
+                break
+            for cell in band_cells:
+                column, row = (line, cell) if axis == 0 else (cell, line)
+                span = spans.get((slot * self.rows + row) * self.columns + column)
+                if span is None:
+                    continue
+                for candidate in entries[span[0]:span[1]]:
+                    if candidate == index:
+                        continue
+                    box = boxes[4 * candidate:4 * candidate + 4]
+                    if not accept(box):
+                        continue
+                    gap = box[axis] - start
+                    if gap < best_gap or (gap == best_gap and candidate < best):
+                        best, best_gap = candidate, gap
+        if best is not None and max_distance is not None and best_gap > max_distance:
+            return None
+        return best
+
+    def _cells(self, boxes: np.ndarray) -> np.ndarray:
+        """Cell column and row ranges (cx0, cy0, cx1, cy1) covered by boxes, clipped to the grid."""
+        low = np.floor((boxes[:, :2] - self.origin) / self.cell_size).astype(np.int64)
+        high = np.floor((boxes[:, 2:] - self.origin) / self.cell_size).astype(np.int64)
+        limits = np.array([self.columns - 1, self.rows - 1])
+        return np.concatenate([np.clip(low, 0, limits), np.clip(high, 0, limits)], axis=1)
+
+    def _key(self, slots, ys, xs):
+        return (np.asarray(slots, dtype=np.int64) * self.rows + ys) * self.columns + xs
+
+    def _page_slot(self, page: int) -> int:
+        slot = int(np.searchsorted(self._page_values, page))
+        return slot if slot < len(self._page_values) and self._page_values[slot] == page else -1
+
+    def _blocks_in(self, slot: int, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+        """Block indices listed in the given cells of a page (with repeats)."""
+        if slot < 0 or not len(ys):
+            return np.empty(0, dtype=np.int64)
+        keys = self._key(slot, ys, xs)
+        positions = np.searchsorted(self._keys, keys)
+        positions = np.minimum(positions, len(self._keys) - 1)
+        present = self._keys[positions] == keys
+        if not present.any():
+            return np.empty(0, dtype=np.int64)
+        starts, ends = self._starts[positions[present]], self._ends[positions[present]]
+        if len(starts) == 1:
+            return self._entries[starts[0]:ends[0]]
+        # The entries of every cell, gathered in one step
+        lengths = ends - starts
+        shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self._entries[np.arange(int(lengths.sum())) + shifts]
@@ -0,0 +1,421 @@
+# server/app/services/vendor_index.py
+import logging
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.core.config import settings
+from app.services.normalization import parse_amount
+from app.services.ocr_blocks import OcrBlocks
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Share of the first page, from the top, whose text makes up the header fingerprint
+HEADER_FRACTION = 0.3
+# The first page is divided into GRID_SIZE x GRID_SIZE cells for the layout fingerprint
+GRID_SIZE = 8
+# Header word pairs kept per template (the ones with the smallest hashes)
+MAX_SHINGLES = 256
+# Merging a sample keeps the word pairs it shares with the template, unless fewer than this are left
+MIN_SHINGLES = 8
+# Weight of the header text in the match score; the layout makes up the rest
+SHINGLE_WEIGHT = 0.7
+# Furthest a field's block centre may be from the learned position, as a share of the text extent
+POSITION_TOLERANCE = 0.05
+# Fields read from learned positions; the vendor name comes from the template itself
+TEMPLATE_FIELDS = ("invoice_number", "invoice_date", "due_date", "total_amount")
+
+# The value shapes the generic extraction patterns accept
+_DATE_RE = re.compile(r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}")
+_AMOUNT_RE = re.compile(r"\d{1,3}(?:,\d{3})*(?:\.\d{2})?")
+_INVOICE_NUMBER_RE = re.compile(r"[A-Za-z0-9]+(?:[-/][A-Za-z0-9]+)*")
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """What a vendor's invoices look like: hashed header word pairs and the grid cells holding text."""
+    shingles: FrozenSet[int]
+    cells: FrozenSet[int]
+
+
+@dataclass
+class VendorMatch:
+    """A document matched to a vendor template, with the fields read at the learned positions."""
+    template_id: int
+    vendor_name: str
+    score: float
+    fields: Dict[str, Any]  # None where no usable value was found at the position
+
+
+@dataclass
+class _Template:
+    id: int
+    vendor_name: str
+    fingerprint: Fingerprint
+    field_positions: Dict[str, Any]
+    revision: int  # the sample count, which grows whenever the stored template changes
+
+
+class VendorIndex:
+    """
+    In-memory index of the vendor templates, for matching documents to known vendors.
+
+    Templates are learned from validated results: the header text and
+    layout of the first page give a fingerprint, and the blocks holding the
+    validated values give each field's position. A document is matched by
+    looking up the templates sharing any of its header word pairs in an
+    inverted index and scoring how much of each template's fingerprint the
+    document contains. The fields of a matched document are read from the
+    blocks nearest the learned positions, without the generic patterns.
+    """
+
+    def __init__(self, match_threshold: float):
+        self.match_threshold = match_threshold
+
+        self._lock = threading.Lock()
+        self._templates: Dict[int, _Template] = {}
+        # Header word pair hash -> ids of the templates containing it
+        self._postings: Dict[int, Set[int]] = {}
+        self._stats = {"lookups": 0, "matches": 0, "complete_matches": 0, "samples_learned": 0}
+
+    def refresh(self, db: Session) -> None:
+        """Load the templates created or changed since the last refresh, e.g. by validations in another process."""
+        revisions = crud.vendor_template.get_revisions(db)
+        with self._lock:
+            changed = [
+                template_id for template_id, revision in revisions.items()
+                if template_id not in self._templates or self._templates[template_id].revision != revision
+            ]
+            for template_id in [template_id for template_id in self._templates if template_id not in revisions]:
+                self._remove(template_id)
+        for db_obj in crud.vendor_template.get_multi_by_ids(db, ids=changed):
+            self._put(db_obj)
+
+    def fingerprint(self, blocks: OcrBlocks) -> Fingerprint:
+        """
+        Fingerprint a document from its first page.
+
+        Header words containing digits (invoice numbers, dates, amounts)
+        differ between a vendor's invoices, so they are left out.
+        """
+        page = _first_page(blocks)
+        centres = _normalized_centres(page)
+        header = page.filter(centres[:, 1] <= HEADER_FRACTION).sort_reading_order()
+        words = [
+            word for word in (token.strip(".,:;#()") for token in header.text.lower().split())
+            if word and not any(char.isdigit() for char in word)
+        ]
+        shingles = {zlib.crc32(f"{first} {second}".encode("utf-8")) for first, second in zip(words, words[1:])}
+        cells = np.minimum((centres * GRID_SIZE).astype(np.int64), GRID_SIZE - 1)
+        return Fingerprint(
+            shingles=frozenset(shingles),
+            cells=frozenset((cells[:, 1] * GRID_SIZE + cells[:, 0]).tolist()),
+        )
+
+    def match(self, blocks: OcrBlocks) -> Optional[Tuple[_Template, float]]:
+        """The best matching template and its score, if any scores at least the match threshold."""
+        if not len(blocks):
+            return None
+        fingerprint = self.fingerprint(blocks)
+        with self._lock:
+            self._stats["lookups"] += 1
+            candidates = {
+                template_id for shingle in fingerprint.shingles for template_id in self._postings.get(shingle, ())
+            }
+            scored = [
+                (_similarity(self._templates[template_id].fingerprint, fingerprint), self._templates[template_id])
+                for template_id in candidates
+            ]
+        if not scored:
+            return None
+        score, template = max(scored, key=lambda item: item[0])
+        if score < self.match_threshold:
+            return None
+        return template, score
+
+    def extract(self, blocks: OcrBlocks) -> Optional[VendorMatch]:
+        """Match a document to a vendor template and read its fields at the learned positions."""
+        matched = self.match(blocks)
+        if matched is None:
+            return None
+        template, score = matched
+        page_count = max(int(blocks.pages.max()), 1)
+        fields = {
+            field: _read_field(field, position, blocks, page_count)
+            for field, position in template.field_positions.items()
+        }
+        with self._lock:
+            self._stats["matches"] += 1
+            self._stats["complete_matches"] += int(all(fields.get(field) is not None for field in TEMPLATE_FIELDS))
+        return VendorMatch(template_id=template.id, vendor_name=template.vendor_name, score=score, fields=fields)
+
+    def learn(self, db: Session, result: models.ProcessingResult) -> Optional[models.VendorTemplate]:
+        """
+        Merge a validated result into its vendor's template, creating the template for a new vendor.
+
+        Returns:
+            The stored template, or None when the result is not validated,
+            has no vendor or OCR blocks, or none of its fields can be found
+            in the blocks. A result already merged into the template (e.g.
+            validated again) leaves it unchanged.
+        """
+        if result.status != "validated" or not result.vendor_name:
+            return None
+        db_obj = crud.vendor_template.get_by_vendor(db, vendor_name=result.vendor_name)
+        if db_obj is not None and result.id in db_obj.result_ids:
+            return db_obj
+        blocks = OcrBlocks.from_dicts((result.raw_extraction_data or {}).get("ocr_result") or [])
+        if not len(blocks):
+            return None
+        fingerprint = self.fingerprint(blocks)
+        positions = _locate_fields(blocks, {field: getattr(result, field) for field in TEMPLATE_FIELDS})
+        if not positions or not fingerprint.shingles:
+            return None
+
+        if db_obj is None:
+            db_obj = crud.vendor_template.create(db, obj_in=schemas.VendorTemplateCreate(
+                vendor_name=result.vendor_name,
+                shingles=sorted(fingerprint.shingles)[:MAX_SHINGLES],
+                layout_cells=sorted(fingerprint.cells),
+                field_positions=positions,
+                result_ids=[result.id],
+            ))
+        else:
+            template = _to_template(db_obj)
+            db_obj = crud.vendor_template.update(db, db_obj=db_obj, obj_in=schemas.VendorTemplateUpdate(
+                shingles=sorted(_merge(template.fingerprint.shingles, fingerprint.shingles, MIN_SHINGLES))[:MAX_SHINGLES],
+                layout_cells=sorted(_merge(template.fingerprint.cells, fingerprint.cells, 1)),
+                field_positions=_merge_positions(db_obj.field_positions, positions, db_obj.sample_count),
+                sample_count=db_obj.sample_count + 1,
+                result_ids=db_obj.result_ids + [result.id],
+            ))
+
+        self._put(db_obj)
+        with self._lock:
+            self._stats["samples_learned"] += 1
+        logger.info(
+            f"Vendor template {db_obj.id} ({db_obj.vendor_name}) learned from result {result.id}: "
+            f"{db_obj.sample_count} samples, fields {', '.join(sorted(db_obj.field_positions))}"
+        )
+        return db_obj
+
+    def stats(self) -> Dict[str, Any]:
+        """Templates in the index, lookups, matches and matches with every field read from the template."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["templates"] = len(self._templates)
+            stats["vendors"] = sorted(template.vendor_name for template in self._templates.values())
+        stats["match_rate"] = stats["matches"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+    def _put(self, db_obj: models.VendorTemplate) -> None:
+        template = _to_template(db_obj)
+        with self._lock:
+            self._remove(template.id)
+            self._templates[template.id] = template
+            for shingle in template.fingerprint.shingles:
+                self._postings.setdefault(shingle, set()).add(template.id)
+
+    def _remove(self, template_id: int) -> None:
+        """Drop a template from the index. Call with the lock held."""
+        template = self._templates.pop(template_id, None)
+        if template is None:
+            return
+        for shingle in template.fingerprint.shingles:
+            postings = self._postings.get(shingle)
+            if postings is not None:
+                postings.discard(template_id)
+                if not postings:
+                    del self._postings[shingle]
+
+
+def _to_template(db_obj: models.VendorTemplate) -> _Template:
+    return _Template(
+        id=db_obj.id,
+        vendor_name=db_obj.vendor_name,
+        fingerprint=Fingerprint(frozenset(db_obj.shingles), frozenset(db_obj.layout_cells)),
+        field_positions=dict(db_obj.field_positions),
+        revision=db_obj.sample_count,
+    )
+
+
+def _similarity(template: Fingerprint, document: Fingerprint) -> float:
+    """Share of the template's header word pairs and layout cells that the document has."""
+    if not template.shingles:
+        return 0.0
+    text = len(template.shingles & document.shingles) / len(template.shingles)
+    layout = len(template.cells & document.cells) / len(template.cells) if template.cells else 0.0
+    return SHINGLE_WEIGHT * text + (1 - SHINGLE_WEIGHT) * layout
+
+
+def _merge(current: FrozenSet[int], sample: FrozenSet[int], minimum: int) -> FrozenSet[int]:
+    """What a template and a new sample share, or the sample when too little is shared."""
+    shared = current & sample
+    return shared if len(shared) >= minimum else sample
+
+
+def _merge_positions(current: Dict[str, Any], sample: Dict[str, Any], sample_count: int) -> Dict[str, Any]:
+    """Average each field's position over the samples; a field that moved page starts again from the sample."""
+    merged = dict(current)
+    for field, position in sample.items():
+        known = current.get(field)
+        if known is None or known["page"] != position["page"]:
+            merged[field] = position
+            continue
+        weight = sample_count / (sample_count + 1)
+        merged[field] = {
+            "page": known["page"],
+            "center": [
+                known_value * weight + value * (1 - weight)
+                for known_value, value in zip(known["center"], position["center"])
+            ],
+            "label": known.get("label") or position.get("label", ""),
+        }
+    return merged
+
+
+def _first_page(blocks: OcrBlocks) -> OcrBlocks:
+    """Blocks of page one, or of an unknown page."""
+    return blocks.filter(blocks.pages <= 1)
+
+
+def _page_blocks(blocks: OcrBlocks, page: int) -> OcrBlocks:
+    return blocks.filter(blocks.pages == page) if blocks.pages.any() else blocks
+
+
+def _normalized_centres(blocks: OcrBlocks) -> np.ndarray:
+    """Block centres scaled to 0-1 across the extent of the page's text, which does not depend on the DPI."""
+    if not len(blocks):
+        return np.empty((0, 2), dtype=np.float32)
+    bounds = blocks.bounds()
+    low = bounds[:, :2].min(axis=0)
+    span = np.maximum(bounds[:, 2:].max(axis=0) - low, 1e-6)
+    return (blocks.positions.mean(axis=1) - low) / span
+
+
+def _locate_fields(blocks: OcrBlocks, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Positions of the blocks holding validated field values, with the label printed before each value."""
+    page_count = max(int(blocks.pages.max()), 1)
+    positions = {}
+    for field, value in values.items():
+        if value is None:
+            continue
+        for page in range(1, page_count + 1) if blocks.pages.any() else (0,):
+            page_blocks = _page_blocks(blocks, page)
+            texts = page_blocks.texts
+            found = []
+            for index, text in enumerate(texts):
+                start = _find_value(field, value, text)
+                if start is not None:
+                    found.append((index, start))
+            if not found:
+                continue
+            # Totals come after any line item of the same amount
+            index, start = found[-1] if field == "total_amount" else found[0]
+            centre = _normalized_centres(page_blocks)[index]
+            positions[field] = {
+                # Fields on the last page of a longer document stay on the last page
+                "page": -1 if page > 1 and page == page_count else max(page, 1),
+                "center": [round(float(centre[0]), 4), round(float(centre[1]), 4)],
+                "label": _label(texts[index][:start]),
+            }
+            break
+    return positions
+
+
+def _find_value(field: str, value: Any, text: str) -> Optional[int]:
+    """Where a block's text holds a field value, as the offset of the value, or None."""
+    if field == "total_amount":
+        for match in _AMOUNT_RE.finditer(text):
+            if abs(parse_amount(match.group()) - float(value)) < 0.005:
+                return match.start()
+        return None
+    if isinstance(value, datetime):
+        printed = _date_texts(value)
+        for match in _DATE_RE.finditer(text):
+            if match.group() in printed:
+                return match.start()
+        return None
+    for match in _INVOICE_NUMBER_RE.finditer(text):
+        if match.group().lower() == str(value).lower():
+            return match.start()
+    return None
+
+
+def _date_texts(value: datetime) -> Set[str]:
+    """The ways a date can be printed in the formats the extraction patterns read."""
+    texts = set()
+    for first, second in ((value.month, value.day), (value.day, value.month)):
+        for year in (f"{value.year}", f"{value.year % 100:02d}"):
+            for separator in "/-":
+                texts.add(f"{first}{separator}{second}{separator}{year}")
+                texts.add(f"{first:02d}{separator}{second:02d}{separator}{year}")
+    return texts
+
+
+def _read_field(field: str, position: Dict[str, Any], blocks: OcrBlocks, page_count: int) -> Optional[Any]:
+    """The value of the nearest block to a learned position that holds a value of the field's shape."""
+    page = page_count if position["page"] == -1 else position["page"]
+    page_blocks = _page_blocks(blocks, page)
+    if not len(page_blocks):
+        return None
+    distances = np.hypot(*(_normalized_centres(page_blocks) - np.asarray(position["center"])).T)
+    texts = page_blocks.texts
+    for index in np.argsort(distances, kind="stable"):
+        if distances[index] > POSITION_TOLERANCE:
+            break
+        value = _parse_field(field, texts[index], position.get("label", ""))
+        if value is not None:
+            return value
+    return None
+
+
+def _label(text: str) -> str:
+    """
+    The label printed just before a value, such as "Invoice Total:".
+
+    Embedded text blocks can hold several lines with other values, so
+    only the last line with letters after the last digit is kept.
+    """
+    lines = [line.strip() for line in re.split(r"\d", text)[-1].splitlines()]
+    labels = [line for line in lines if any(char.isalpha() for char in line)]
+    return labels[-1] if labels else ""
+
+
+def _parse_field(field: str, text: str, label: str) -> Optional[Any]:
+    """
+    Read a field value from a block's text.
+
+    The value right after the learned label is taken when the block has
+    the label. Otherwise amounts are taken from the end of the block (a
+    total follows its subtotals) and other fields from the start.
+    """
+    labelled = False
+    if label:
+        # Not inside a longer word, so "TOTAL" does not match "SUBTOTAL"
+        match = re.search(r"(?<![A-Za-z])" + re.escape(label), text, re.IGNORECASE)
+        if match:
+            text = text[match.end():]
+            labelled = True
+    if field == "total_amount":
+        amounts = _AMOUNT_RE.findall(text)
+        if not amounts:
+            return None
+        return parse_amount(amounts[0] if labelled else amounts[-1])
+    if field in ("invoice_date", "due_date"):
+        match = _DATE_RE.search(text)
+        return match.group() if match else None
+    numbers = [token for token in _INVOICE_NUMBER_RE.findall(text) if any(char.isdigit() for char in token)]
+    return numbers[0] if numbers else None
+
+
+vendor_index = VendorIndex(match_threshold=settings.VENDOR_MATCH_THRESHOLD)
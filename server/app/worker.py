@@ -0,0 +1,190 @@
+# server/app/worker.py
+"""
+Queue worker daemon.
+
+Processes the documents the API leaves in the queue when
+QUEUE_WORKER_ENABLED is set, outside the web process:
+
+    python -m app.worker [--concurrency N] [--claim-batch N] [--poll-interval S] [--stale-timeout S]
+
+Any number of workers can run against the same database; each claims its
+own queue items with SELECT ... FOR UPDATE SKIP LOCKED. Items left
+processing by a worker that died are queued again after
+QUEUE_WORKER_STALE_TIMEOUT seconds.
+"""
+import argparse
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.ocr_service import ocr_service
+from app.services.processing_service import process_document_task
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QueueWorker:
+    """
+    Claims queued documents in batches and processes them on a thread pool.
+
+    Items are only claimed while the pool has a free slot for them, so a
+    claimed item never waits behind others in this worker while another
+    worker sits idle. When nothing is queued the worker polls every
+    `poll_interval` seconds.
+
+    On start and every `requeue_interval` seconds, items processing for
+    more than `stale_timeout` seconds, other than this worker's own, are
+    queued again: a worker that crashed or was killed left them claimed.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        claim_batch: int,
+        poll_interval: float,
+        stale_timeout: float = 3600.0,
+        requeue_interval: float = 60.0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.claim_batch = max(1, claim_batch)
+        self.poll_interval = poll_interval
+        self.stale_timeout = stale_timeout
+        self.requeue_interval = requeue_interval
+        self._stop = threading.Event()
+        self._running: Dict[Future, int] = {}
+        self._next_requeue = 0.0
+        self.processed = 0
+        self.requeued = 0
+
+    def run(self) -> None:
+        """Process queued documents until stop() is called, then finish the ones running."""
+        logger.info(
+            f"Queue worker started (concurrency {self.concurrency}, claim batch {self.claim_batch}, "
+            f"poll interval {self.poll_interval:.1f}s)"
+        )
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="queue-worker") as pool:
+            while not self._stop.is_set():
+                if time.monotonic() >= self._next_requeue:
+                    self.requeue_stale()
+                    self._next_requeue = time.monotonic() + self.requeue_interval
+                wanted = min(self.concurrency - len(self._running), self.claim_batch)
+                claimed = self.claim(wanted) if wanted else []
+                for queue_id, document_id in claimed:
+                    future = pool.submit(process_document_task, document_id=document_id, queue_id=queue_id)
+                    self._running[future] = queue_id
+                if len(claimed) < wanted or not wanted:
+                    # The queue is drained or every slot is taken
+                    self._wait()
+            if self._running:
+                logger.info(f"Queue worker stopping, waiting for {len(self._running)} documents")
+                for future in wait(list(self._running)).done:
+                    self._finish(future)
+        logger.info(f"Queue worker stopped after {self.processed} documents")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def claim(self, limit: int) -> List[Tuple[int, int]]:
+        """Claim up to `limit` queued items as (queue item id, document id)."""
+        db = SessionLocal()
+        try:
+            claimed = crud.queue.claim_batch(db, limit=limit)
+        except Exception as e:
+            logger.error(f"Error claiming queue items: {e}")
+            claimed = []
+        finally:
+            db.close()
+        if claimed:
+            logger.info(f"Claimed queue items {[queue_id for queue_id, _ in claimed]}")
+        return claimed
+
+    def requeue_stale(self) -> List[int]:
+        """Queue the items again that dead workers left processing; returns their ids."""
+        db = SessionLocal()
+        try:
+            requeued = crud.queue.requeue_stale(
+                db,
+                started_before=datetime.now() - timedelta(seconds=self.stale_timeout),
+                exclude=list(self._running.values()),
+            )
+        except Exception as e:
+            logger.error(f"Error queueing stale items again: {e}")
+            requeued = []
+        finally:
+            db.close()
+        if requeued:
+            self.requeued += len(requeued)
+            logger.warning(
+                f"Queued items {requeued} again: processing for over {self.stale_timeout:.0f}s, "
+                f"their worker has stopped"
+            )
+        return requeued
+
+    def _wait(self) -> None:
+        """
+        Wait until a running document finishes, or for the poll interval while
+        there is a free slot, and at most until the next stale item check.
+        """
+        if len(self._running) >= self.concurrency:
+            timeout = max(0.0, self._next_requeue - time.monotonic())
+            done, _ = wait(list(self._running), timeout=timeout, return_when=FIRST_COMPLETED)
+        elif self._running:
+            done, _ = wait(list(self._running), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+        else:
+            self._stop.wait(self.poll_interval)
+            done = set()
+        for future in done:
+            self._finish(future)
+
+    def _finish(self, future: Future) -> None:
+        queue_id = self._running.pop(future)
+        self.processed += 1
+        error = future.exception()
+        if error is not None:
+            # process_document_task records its own failures; this is anything it let through
+            logger.error(f"Queue item {queue_id} failed: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.QUEUE_WORKER_CONCURRENCY,
+                        help="Documents processed at the same time")
+    parser.add_argument("--claim-batch", type=int, default=settings.QUEUE_WORKER_CLAIM_BATCH,
+                        help="Queue items claimed per database round trip at most")
+    parser.add_argument("--poll-interval", type=float, default=settings.QUEUE_WORKER_POLL_INTERVAL,
+                        help="Seconds between polls while nothing is queued")
+    parser.add_argument("--stale-timeout", type=float, default=settings.QUEUE_WORKER_STALE_TIMEOUT,
+                        help="Seconds after which an item still processing is queued again")
+    args = parser.parse_args()
+
+    if not settings.QUEUE_WORKER_ENABLED:
+        logger.warning("QUEUE_WORKER_ENABLED is off: the API processes documents itself and queues none")
+
+    worker = QueueWorker(
+        args.concurrency, args.claim_batch, args.poll_interval,
+        stale_timeout=args.stale_timeout, requeue_interval=settings.QUEUE_WORKER_REQUEUE_INTERVAL,
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+
+    if settings.OCR_WARMUP_ON_STARTUP:
+        start = time.time()
+        ocr_service.warm_up()
+        logger.info(f"OCR models warmed up in {time.time() - start:.2f} seconds")
+    try:
+        worker.run()
+    finally:
+        ocr_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
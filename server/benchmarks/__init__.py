@@ -0,0 +1,3 @@
+# server/benchmarks/__init__.py
+# Standalone performance benchmarks, run from the server directory with
+# `python -m benchmarks.<name>`.
@@ -0,0 +1,111 @@
+# server/benchmarks/field_scanner.py
+"""
+Benchmark the single-pass field scanner against one re.search per pattern.
+
+Large text-layer PDFs are built by repeating the text pages of the sample
+invoices, their blocks are read through the OCR service (text layer, no
+OCR) and the invoice fields are extracted from the joined text both ways.
+The report shows the extraction throughput of each and checks that both
+find the same values.
+
+Usage (from the server directory):
+    python -m benchmarks.field_scanner [FILE ...] [--pages 10 100 1000] [--repeat N]
+
+Without files the sample invoices in python_scripts/file_uploads are used.
+"""
+import argparse
+import glob
+import logging
+import os
+import re
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "python_scripts", "file_uploads"
+)
+
+
+def sequential_extract(text: str) -> Dict[str, Optional[str]]:
+    """Field extraction as it was done before the scanner: every pattern searched in turn."""
+    from app.services.field_scanner import INVOICE_PATTERNS
+
+    values = {}
+    for field_name, patterns in INVOICE_PATTERNS.items():
+        values[field_name] = None
+        for pattern in patterns:
+            match = re.search(pattern.regex, text, re.IGNORECASE)
+            if match:
+                values[field_name] = match.group(1).strip()
+                break
+    return values
+
+
+def build_pdf(files: List[str], pages: int, path: str) -> None:
+    """Write a PDF of the given number of pages, cycling through the text pages of the files."""
+    import fitz
+
+    sources = []
+    for file in files:
+        doc = fitz.open(file)
+        sources.extend((doc, number) for number in range(doc.page_count) if doc[number].get_text().strip())
+    if not sources:
+        raise SystemExit("None of the files has a text layer")
+
+    out = fitz.open()
+    for i in range(pages):
+        doc, number = sources[i % len(sources)]
+        out.insert_pdf(doc, from_page=number, to_page=number)
+    out.save(path)
+
+
+def time_ms(func: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="PDF files whose text pages are repeated")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000], help="Page counts of the built PDFs")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per timed extraction")
+    args = parser.parse_args()
+
+    # Must be set before the settings are loaded
+    os.environ["OCR_CACHE_ENABLED"] = "false"
+    logging.disable(logging.INFO)
+
+    from app.services.field_scanner import invoice_scanner
+    from app.services.ocr_blocks import OcrBlocks
+    from app.services.ocr_service import ocr_service
+
+    files = args.files or sorted(
+        glob.glob(os.path.join(DEFAULT_CORPUS, "*.pdf")) + glob.glob(os.path.join(DEFAULT_CORPUS, "*.PDF"))
+    )
+
+    print(f"{'pages':>7}{'text KB':>10}{'search ms':>11}{'scan ms':>10}{'search MB/s':>13}{'scan MB/s':>11}{'speedup':>9}  same")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"text_layer_{pages}.pdf")
+            build_pdf(files, pages, path)
+            text = OcrBlocks.concat(page.blocks for page in ocr_service.iter_pages(path, engine="text_layer")).text
+            megabytes = len(text.encode("utf-8")) / 1e6
+
+            same = sequential_extract(text) == invoice_scanner.extract(text)
+            search_ms = time_ms(lambda: sequential_extract(text), args.repeat)
+            scan_ms = time_ms(lambda: invoice_scanner.extract(text), args.repeat)
+            print(
+                f"{pages:>7}{megabytes * 1000:>10.0f}{search_ms:>11.2f}{scan_ms:>10.2f}"
+                f"{megabytes / search_ms * 1000:>13.1f}{megabytes / scan_ms * 1000:>11.1f}"
+                f"{search_ms / scan_ms:>9.2f}  {'yes' if same else 'NO'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# server/benchmarks/layout_extractor.py
+"""
+Benchmark the layout model extraction backend on CPU.
+
+Without a model directory, a tiny randomly initialized LayoutLM model is
+written to a temporary directory, so the benchmark needs neither network
+access nor a trained model (its tags are meaningless, only the timings and
+the shape of the results count). Synthetic invoices from the spatial index
+benchmark are extracted from several threads at once, as concurrently
+processed documents are, with the model in float32 and int8 and with and
+without batching windows across documents.
+
+Needs torch and transformers.
+
+Usage (from the server directory):
+    python -m benchmarks.layout_extractor [--model DIR] [--documents N] [--concurrency N]
+                                          [--rows N] [--threads N] [--batch-size N]
+"""
+import argparse
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RESULT_KEYS = {"invoice_number", "vendor_name", "invoice_date", "due_date", "total_amount", "line_items"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Model directory (default: a tiny random model)")
+    parser.add_argument("--documents", type=int, default=64, help="Synthetic invoices extracted per run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Documents extracted at the same time")
+    parser.add_argument("--rows", type=int, default=40, help="Line item rows per invoice")
+    parser.add_argument("--threads", type=int, default=1, help="PyTorch CPU threads")
+    parser.add_argument("--batch-size", type=int, default=8, help="Windows per batch when batching")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from app.services.ai_service import ai_service
+    from app.services.layout_extractor import LayoutModelExtractor, save_random_model
+    from benchmarks.spatial_index import synthetic_invoice
+
+    invoices = [synthetic_invoice(args.rows, seed)[0] for seed in range(args.documents)]
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model
+        if model_path is None:
+            model_path = tmp
+            save_random_model(model_path)
+
+        print(f"{'model':>8}{'batch':>7}  {'docs/s':>8}{'ms/doc':>9}{'mean batch':>12}{'tokens/s':>11}  shape")
+        for quantize in (False, True):
+            for batch_size in (1, args.batch_size):
+                extractor = LayoutModelExtractor(
+                    model_path, quantize=quantize, threads=args.threads, batch_size=batch_size
+                )
+                extractor.load()
+                extractor.extract(invoices[0])  # warm up
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                    results = list(pool.map(lambda blocks: ai_service.extract_with_model(blocks, extractor), invoices))
+                elapsed = time.perf_counter() - start
+                extractor.stop()
+
+                stats = extractor.stats()
+                shape_ok = all(
+                    set(result["extracted_data"]) == RESULT_KEYS and "layout_model" in result for result in results
+                )
+                print(
+                    f"{'int8' if quantize else 'float32':>8}{batch_size:>7}  {len(invoices) / elapsed:>8.1f}"
+                    f"{elapsed * 1000 / len(invoices):>9.1f}{stats['mean_batch_size']:>12.2f}"
+                    f"{stats['tokens_per_sec']:>11.0f}  {'ok' if shape_ok else 'WRONG'}"
+                )
+
+
+if __name__ == "__main__":
+    main()
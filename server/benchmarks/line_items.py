@@ -0,0 +1,169 @@
+# server/benchmarks/line_items.py
+"""
+Benchmark line item table reconstruction on long parts invoices.
+
+Synthetic invoices are laid out like line-level OCR output of a parts
+distributor's invoice: every page has a header row over the columns line,
+part number, description, quantity, unit of measure, unit price and
+extended price, descriptions sometimes wrap onto a second line, and the
+last page ends with the totals. Half of the invoices leave out the header
+row, so the columns have to be told apart by their values. Block positions
+are jittered and the blocks shuffled within each line band, as OCR
+returns them.
+
+The report compares the items the old line-by-line regex recovers with
+the row and column clustering, and times the clustering per page to show
+how it grows with the number of rows.
+
+Usage (from the server directory):
+    python -m benchmarks.line_items [--rows 50 200 1000] [--rows-per-page N] [--invoices N] [--repeat N]
+"""
+import argparse
+import logging
+import random
+import re
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+PARTS = ["PVC ELBOW", "BRASS GATE VALVE", "DI FLANGE ADAPTER", "PE COUPLING", "COPPER TEE", "HDPE PIPE SDR11"]
+WRAPS = ["LEAD FREE", "NSF 61 CERTIFIED", "W/ ACCESSORY KIT", "SOLD PER FOOT"]
+
+
+def synthetic_invoice(
+    rows: int, seed: int, header: bool = True, rows_per_page: int = 60
+) -> Tuple[Any, List[Dict[str, Any]]]:
+    """OCR blocks of a parts invoice with `rows` line items, and its items."""
+    from app.services.ocr_blocks import OcrBlocks
+
+    rng = random.Random(seed)
+    texts, boxes, pages = [], [], []
+    items = []
+
+    def add(text: str, x: float, y: float, page: int, right: bool = False) -> None:
+        width = 5.5 * len(text)
+        x = x - width if right else x
+        x += rng.uniform(-1.5, 1.5)
+        y += rng.uniform(-1.5, 1.5)
+        texts.append(text)
+        boxes.append([[x, y], [x + width, y], [x + width, y + 10], [x, y + 10]])
+        pages.append(page)
+
+    row, page = 0, 0
+    while row < rows:
+        page += 1
+        add("CORE PIPE & SUPPLY", 40, 30, page)
+        add(f"Page {page}", 480, 30, page)
+        add("Ship To", 40, 60, page)
+        add(f"{rng.randint(10, 9999)} Industrial Blvd", 40, 74, page)
+        if header:
+            for x, title, right in (
+                (30, "Line", False), (60, "Part Number", False), (150, "Description", False), (400, "Qty", True),
+                (415, "UM", False), (490, "Unit Price", True), (560, "Ext Price", True),
+            ):
+                add(title, x, 110, page, right)
+        y = 128
+        while row < rows and y < 128 + rows_per_page * 13:
+            quantity = rng.choice([1, 2, 4, 10, 12, 25, 100, rng.randint(1, 500)])
+            price = rng.randint(50, 90000) / 100
+            amount = round(quantity * price, 2)
+            description = f"{rng.choice(PARTS)} {rng.randint(1, 12)}IN"
+            add(str(row + 1), 30, y, page)
+            add(f"{rng.choice('ABCDEFGH')}{rng.randint(1000, 9999)}-{rng.randint(10, 99)}", 60, y, page)
+            add(description, 150, y, page)
+            add(str(quantity), 400, y, page, right=True)
+            add(rng.choice(["EA", "FT", "BX"]), 415, y, page)
+            add(f"{price:,.2f}", 490, y, page, right=True)
+            add(f"{amount:,.2f}", 560, y, page, right=True)
+            if rng.random() < 0.2:
+                y += 12
+                wrap = rng.choice(WRAPS)
+                add(wrap, 150, y, page)
+                description = f"{description} {wrap}"
+            items.append({"quantity": float(quantity), "description": description, "amount": amount})
+            row += 1
+            y += 13
+    subtotal = round(sum(item["amount"] for item in items), 2)
+    y += 20
+    for offset, (label, value) in enumerate((("Subtotal", subtotal), ("Sales Tax", round(subtotal * 0.0825, 2)))):
+        add(label, 430, y + offset * 14, page)
+        add(f"${value:,.2f}", 560, y + offset * 14, page, right=True)
+
+    # OCR returns lines roughly top to bottom but columns interleaved
+    order = sorted(range(len(texts)), key=lambda i: (pages[i], round(boxes[i][0][1] / 20), rng.random()))
+    blocks = OcrBlocks.concat(
+        OcrBlocks.build(
+            [texts[i] for i in order if pages[i] == page],
+            [boxes[i] for i in order if pages[i] == page],
+            [0.95] * sum(1 for i in order if pages[i] == page),
+            page,
+        )
+        for page in range(1, page + 1)
+    )
+    return blocks, items
+
+
+def regex_line_items(blocks) -> List[Dict[str, Any]]:
+    """Line items as they were found before the table reconstruction: one regex per text line."""
+    items = []
+    for line in blocks.text.split("\n"):
+        if re.search(r"\d+\s+[A-Za-z0-9\s]+\s+\$?\d+\.\d{2}", line):
+            parts = line.strip().split()
+            try:
+                items.append({
+                    "quantity": float(parts[0]),
+                    "description": " ".join(parts[1:-1]),
+                    "amount": float(parts[-1].replace("$", "").replace(",", "")),
+                })
+            except (ValueError, IndexError):
+                continue
+    return items
+
+
+def correct_items(found: List[Dict[str, Any]], truth: List[Dict[str, Any]]) -> int:
+    """Items found with the right quantity, description and amount, in order."""
+    return sum(a == b for a, b in zip(found, truth)) if len(found) == len(truth) else sum(
+        item in truth for item in found
+    )
+
+
+def time_ms(func: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 200, 1000], help="Line items per invoice")
+    parser.add_argument("--rows-per-page", type=int, default=60, help="Line items per page at most")
+    parser.add_argument("--invoices", type=int, default=10, help="Synthetic invoices per row count")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per timed extraction")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from app.services.line_items import line_item_extractor
+
+    print(f"{'rows':>6}{'pages':>7}{'blocks':>8}  {'regex correct':>15}{'table correct':>15}"
+          f"{'table ms':>10}{'us/row':>8}")
+    for rows in args.rows:
+        correct_regex, correct_table, total = 0, 0, 0
+        invoices = [synthetic_invoice(rows, seed, seed % 2 == 0, args.rows_per_page) for seed in range(args.invoices)]
+        for blocks, truth in invoices:
+            correct_regex += correct_items(regex_line_items(blocks), truth)
+            correct_table += correct_items(line_item_extractor.extract(blocks), truth)
+            total += len(truth)
+
+        blocks = invoices[0][0]
+        table_ms = time_ms(lambda: line_item_extractor.extract(blocks), args.repeat)
+        print(
+            f"{rows:>6}{len(set(blocks.pages.tolist())):>7}{len(blocks):>8}  {correct_regex:>7}/{total:<7}"
+            f"{correct_table:>7}/{total:<7}{table_ms:>10.2f}{table_ms * 1000 / rows:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
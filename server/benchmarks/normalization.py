@@ -0,0 +1,140 @@
+# server/benchmarks/normalization.py
+"""
+Benchmark date and amount normalization against the parsing it replaced.
+
+A list of date strings in the shapes extraction returns (month or day
+first, dashes or slashes, two or four digit years, ISO dates, some that
+are no date at all) is parsed with the old chain of strptime formats and
+with the normalizer, one string at a time and in bulk. Amount strings are
+parsed with the old comma stripping and float() and with parse_amount.
+The report shows the time per string and checks that the normalizer reads
+every string the old code could read the same way.
+
+Usage (from the server directory):
+    python -m benchmarks.normalization [--count N] [--distinct N] [--repeat N]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+OLD_DATE_FORMATS = [
+    "%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d",
+    "%m-%d-%Y", "%d-%m-%Y", "%m/%d/%y",
+    "%d/%m/%y", "%Y/%m/%d"
+]
+
+
+def strptime_parse_date(date_str: Optional[str]) -> Optional[datetime]:
+    """Date parsing as it was done before the normalizer: every format tried in turn."""
+    if not date_str:
+        return None
+    for date_format in OLD_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def float_parse_amount(amount_str: str) -> Optional[float]:
+    """Amount parsing as it was done before the normalizer."""
+    try:
+        return float(amount_str.strip().replace(",", ""))
+    except ValueError:
+        return None
+
+
+def sample_dates(count: int, distinct: int, seed: int = 0) -> List[str]:
+    """`count` date strings drawn from `distinct` different ones."""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct):
+        year, month, day = rng.randint(1995, 2030), rng.randint(1, 12), rng.randint(1, 28)
+        shape = rng.random()
+        if shape < 0.35:
+            pool.append(f"{month}/{day}/{year}")
+        elif shape < 0.5:
+            pool.append(f"{month:02d}/{day:02d}/{year % 100:02d}")
+        elif shape < 0.6:
+            pool.append(f"{day:02d}/{month:02d}/{year}")
+        elif shape < 0.7:
+            pool.append(f"{year}-{month:02d}-{day:02d}")
+        elif shape < 0.8:
+            pool.append(f"{month:02d}-{day:02d}-{year}")
+        elif shape < 0.9:
+            pool.append(f"{day:02d}-{month:02d}-{year}")
+        else:
+            # Not a date: what a loose pattern sometimes captures
+            pool.append(rng.choice(["NET 30", "Upon receipt", f"{rng.randint(1, 99)}/{rng.randint(1, 99)}", "TBD"]))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def sample_amounts(count: int, distinct: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct):
+        value = rng.randint(1, 10_000_000) / 100
+        shape = rng.random()
+        if shape < 0.5:
+            pool.append(f"{value:,.2f}")
+        elif shape < 0.8:
+            pool.append(f"{value:.2f}")
+        else:
+            pool.append(f"{int(value):,}")
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def time_ms(func: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000, help="Strings parsed per run")
+    parser.add_argument("--distinct", type=int, default=5_000, help="Different strings among them")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per timed parse")
+    args = parser.parse_args()
+
+    from app.services.normalization import Normalizer, parse_amount
+
+    dates = sample_dates(args.count, args.distinct)
+    amounts = sample_amounts(args.count, args.distinct)
+    normalizer = Normalizer()
+
+    old_dates = [strptime_parse_date(text) for text in dates]
+    new_dates = normalizer.parse_dates(dates)
+    date_same = all(old is None or old == new for old, new in zip(old_dates, new_dates))
+    old_amounts = [float_parse_amount(text) for text in amounts]
+    amount_same = old_amounts == normalizer.parse_amounts(amounts)
+
+    rows = [
+        ("dates", "strptime", lambda: [strptime_parse_date(text) for text in dates], None),
+        ("dates", "parse_date", lambda: [normalizer.parse_date(text) for text in dates], date_same),
+        ("dates", "parse_dates", lambda: normalizer.parse_dates(dates), date_same),
+        ("amounts", "float", lambda: [float_parse_amount(text) for text in amounts], None),
+        ("amounts", "parse_amount", lambda: [parse_amount(text) for text in amounts], amount_same),
+        ("amounts", "parse_amounts", lambda: normalizer.parse_amounts(amounts), amount_same),
+    ]
+    print(f"{'values':>8}{'parser':>15}{'ms':>10}{'us/string':>11}  same as before")
+    for values, name, func, same in rows:
+        elapsed = time_ms(func, args.repeat)
+        print(
+            f"{values:>8}{name:>15}{elapsed:>10.1f}{elapsed * 1000 / args.count:>11.2f}"
+            f"  {'' if same is None else 'yes' if same else 'NO'}"
+        )
+    print(
+        f"dates read: strptime {sum(date is not None for date in old_dates)}, "
+        f"normalizer {sum(date is not None for date in new_dates)} of {len(dates)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
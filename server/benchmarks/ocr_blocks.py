@@ -0,0 +1,87 @@
+# server/benchmarks/ocr_blocks.py
+"""
+Benchmark OcrBlocks against the list of dicts block format on a dense page.
+
+Compares memory held, pickled size (what the page pool ships between
+processes) and the cost of the operations extraction performs: joining the
+text, sorting by position and filtering by confidence.
+
+Usage (from the server directory):
+    python -m benchmarks.ocr_blocks [--blocks N] [--repeat N]
+"""
+import argparse
+import pickle
+import random
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from app.services.ocr_blocks import OcrBlocks
+
+
+def synthetic_page(count: int):
+    """PaddleOCR-style output for a dense page of short text lines."""
+    rng = random.Random(0)
+    words = ["INVOICE", "Qty", "Description", "Amount", "Total", "$1,234.56", "PVC", "Elbow", "2in", "Net 30"]
+    lines = []
+    for i in range(count):
+        x, y = rng.uniform(0, 560), (i // 6) * 12.0
+        box = [[x, y], [x + 40.0, y], [x + 40.0, y + 10.0], [x, y + 10.0]]
+        lines.append([box, (f"{rng.choice(words)} {i}", rng.uniform(0.5, 1.0))])
+    return [lines]
+
+
+def measure_memory(build: Callable) -> Tuple[object, int]:
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def time_ms(func: Callable, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=3000, help="Blocks on the synthetic page")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per timed operation")
+    args = parser.parse_args()
+
+    raw = synthetic_page(args.blocks)
+    dicts, dict_bytes = measure_memory(lambda: OcrBlocks.from_paddle(raw, page=1).to_dicts())
+    blocks, block_bytes = measure_memory(lambda: OcrBlocks.from_paddle(raw, page=1))
+
+    operations = {
+        "join text": (
+            lambda: " ".join(block["text"] for block in dicts),
+            lambda: blocks.text,
+        ),
+        "sort by top": (
+            lambda: sorted(dicts, key=lambda block: block["position"][0][1]),
+            blocks.sort_by_top,
+        ),
+        "filter conf": (
+            lambda: [block for block in dicts if block["confidence"] >= 0.8],
+            lambda: blocks.min_confidence(0.8),
+        ),
+        "pickle": (
+            lambda: pickle.dumps(dicts),
+            lambda: pickle.dumps(blocks),
+        ),
+    }
+
+    print(f"{args.blocks} blocks")
+    print(f"{'':<14}{'dicts':>12}{'OcrBlocks':>12}")
+    print(f"{'memory KiB':<14}{dict_bytes / 1024:>12.1f}{block_bytes / 1024:>12.1f}")
+    print(f"{'pickled KiB':<14}{len(pickle.dumps(dicts)) / 1024:>12.1f}{len(pickle.dumps(blocks)) / 1024:>12.1f}")
+    for name, (with_dicts, with_blocks) in operations.items():
+        print(f"{name + ' ms':<14}{time_ms(with_dicts, args.repeat):>12.3f}{time_ms(with_blocks, args.repeat):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
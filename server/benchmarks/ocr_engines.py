@@ -0,0 +1,111 @@
+# server/benchmarks/ocr_engines.py
+"""
+Benchmark the registered OCR engines on a sample corpus.
+
+Every engine runs in a fresh process, so its peak RSS only covers the
+models it loads itself. Model loading and warm-up are timed separately
+from the corpus passes. The OCR cache and page pool are switched off.
+
+Usage (from the server directory):
+    python -m benchmarks.ocr_engines [FILE ...] [--engines paddle,stub] [--repeat N]
+
+Without files the sample invoices in python_scripts/file_uploads are used.
+"""
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "python_scripts", "file_uploads"
+)
+
+
+def run_engine(name: str, files: List[str], repeat: int) -> Dict[str, Any]:
+    """Time one engine over the corpus. Runs inside its own process."""
+    # Keep per-page log lines out of the timings
+    logging.disable(logging.INFO)
+    from app.services.ocr_service import ocr_service
+
+    start = time.perf_counter()
+    warm = ocr_service.warm_up(name)
+    load_time = time.perf_counter() - start
+
+    latencies = []
+    block_count = 0
+    start = time.perf_counter()
+    if warm:
+        for _ in range(repeat):
+            for path in files:
+                page_start = time.perf_counter()
+                for page in ocr_service.iter_pages(path, engine=name):
+                    now = time.perf_counter()
+                    latencies.append(now - page_start)
+                    block_count += len(page.blocks)
+                    page_start = now
+    elapsed = time.perf_counter() - start
+
+    return {
+        "engine": name,
+        "warm": warm,
+        "load_time": load_time,
+        "pages": len(latencies),
+        "blocks": block_count,
+        "elapsed": elapsed,
+        "latencies": latencies,
+        # Kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="PDF or image files to process")
+    parser.add_argument("--engines", help="Comma-separated engine names (default: all registered)")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus")
+    args = parser.parse_args()
+
+    # Read by the settings of the benchmark processes
+    os.environ["OCR_CACHE_ENABLED"] = "false"
+    os.environ["OCR_PAGE_WORKERS"] = "0"
+
+    from app.services.ocr_engines import available_engines
+
+    engines = args.engines.split(",") if args.engines else available_engines()
+    files = args.files or sorted(
+        glob.glob(os.path.join(DEFAULT_CORPUS, "*.pdf")) + glob.glob(os.path.join(DEFAULT_CORPUS, "*.PDF"))
+    )
+    if not files:
+        parser.error("no documents to process")
+    print(f"{len(files)} documents, {args.repeat} passes")
+
+    results = []
+    for name in engines:
+        # A fresh process per engine, so models and peak RSS do not carry over
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.append(pool.submit(run_engine, name, files, args.repeat).result())
+
+    print(f"{'engine':<12}{'pages':>7}{'blocks':>8}{'pages/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'load s':>9}{'peak RSS MB':>13}")
+    for result in results:
+        if not result["warm"]:
+            print(f"{result['engine']:<12} failed to load, see the log above")
+            continue
+        latencies = np.array(result["latencies"]) * 1000
+        pages_per_sec = result["pages"] / result["elapsed"] if result["elapsed"] else 0.0
+        print(
+            f"{result['engine']:<12}{result['pages']:>7}{result['blocks']:>8}{pages_per_sec:>10.2f}"
+            f"{np.percentile(latencies, 50):>10.1f}{np.percentile(latencies, 95):>10.1f}"
+            f"{result['load_time']:>9.2f}{result['peak_rss_mb']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# server/benchmarks/orientation.py
+"""
+Measure the page orientation pre-pass on a corpus, at every page rotation.
+
+Each scanned page is rendered, turned by 0, 90, 180 and 270 degrees, and
+OCRed twice: with per-line angle classification, and after the pre-pass
+with per-line classification off (unless the vote was inconclusive). The
+report shows the rotation the pre-pass undid, whether that was the right
+one, and the OCR time saved net of the pre-pass.
+
+Usage (from the server directory):
+    python -m benchmarks.orientation [FILE ...] [--engine paddle] [--all-pages]
+
+Without files the sample invoices in python_scripts/file_uploads are used.
+Only pages without a text layer are measured unless --all-pages is given.
+"""
+import argparse
+import glob
+import logging
+import os
+import statistics
+import time
+
+import numpy as np
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "python_scripts", "file_uploads"
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF files to process")
+    parser.add_argument("--engine", help="OCR engine name (default: the OCR_ENGINE setting)")
+    parser.add_argument("--all-pages", action="store_true", help="Also measure pages with a text layer")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    import fitz  # PyMuPDF
+
+    from app.services.ocr_engines import get_engine
+    from app.services.ocr_service import ocr_service, render_page_image
+    from app.services.orientation import page_orienter
+
+    engine = get_engine(args.engine)
+    if not engine.classifies_angles:
+        print(f"engine {engine.name} has no angle classifier")
+        return
+    ocr_service.warm_up(args.engine)
+    pdfs = args.pdfs or sorted(
+        glob.glob(os.path.join(DEFAULT_CORPUS, "*.pdf")) + glob.glob(os.path.join(DEFAULT_CORPUS, "*.PDF"))
+    )
+
+    print(f"{'page':<26}{'turned':>7}{'undone':>7}{'ok':>4}{'votes':>6}{'line cls':>9}"
+          f"{'orient ms':>10}{'cls ocr ms':>11}{'no-cls ms':>10}{'saved ms':>9}")
+    saved_per_page, correct, total = [], 0, 0
+    for path in pdfs:
+        with fitz.open(path) as doc:
+            for page in doc:
+                if page.get_text().strip() and not args.all_pages:
+                    continue
+                upright = render_page_image(page)
+                for turns in range(4):
+                    image = np.ascontiguousarray(np.rot90(upright, turns))
+
+                    start = time.perf_counter()
+                    ocr_service._process_image(image, engine, cls=True)
+                    cls_ms = (time.perf_counter() - start) * 1000
+
+                    oriented, orientation = page_orienter.orient(image, engine)
+                    start = time.perf_counter()
+                    ocr_service._process_image(oriented, engine, cls=orientation.needs_line_cls)
+                    no_cls_ms = (time.perf_counter() - start) * 1000
+                    orient_ms = orientation.seconds * 1000
+
+                    ok = (orientation.rotation + turns) % 4 == 0
+                    correct += ok
+                    total += 1
+                    saved_per_page.append(cls_ms - orient_ms - no_cls_ms)
+                    name = f"{os.path.basename(path)[:20]} p{page.number + 1}"
+                    print(f"{name:<26}{turns * 90:>7}{orientation.rotation * 90:>7}{'y' if ok else 'n':>4}"
+                          f"{orientation.votes:>6}{'on' if orientation.needs_line_cls else 'off':>9}"
+                          f"{orient_ms:>10.1f}{cls_ms:>11.1f}{no_cls_ms:>10.1f}{saved_per_page[-1]:>9.1f}")
+
+    if not total:
+        print("no pages to measure")
+        return
+    print(f"orientation correct on {correct}/{total} pages")
+    print(f"mean OCR time saved per page: {statistics.mean(saved_per_page):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
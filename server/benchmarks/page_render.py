@@ -0,0 +1,77 @@
+# server/benchmarks/page_render.py
+"""
+Benchmark page rendering for OCR: temp PNG files vs in-memory arrays.
+
+Usage (from the server directory):
+    python -m benchmarks.page_render [PDF ...] [--repeat N] [--ocr]
+
+Without arguments the sample invoices in python_scripts/file_uploads are used.
+"""
+import argparse
+import glob
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+import cv2
+import fitz  # PyMuPDF
+
+from app.services.ocr_service import ocr_service, render_page_image
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "python_scripts", "file_uploads"
+)
+
+
+def render_via_png(page: "fitz.Page", temp_dir: str):
+    """The previous approach: save the pixmap as PNG and read it back like PaddleOCR does."""
+    temp_img_path = os.path.join(temp_dir, f"temp_page_{page.number}.png")
+    page.get_pixmap().save(temp_img_path)
+    image = cv2.imread(temp_img_path)
+    os.remove(temp_img_path)
+    return image
+
+
+def time_pages(pages: List["fitz.Page"], render: Callable, repeat: int, ocr: bool) -> List[float]:
+    """Return per-page latencies in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        for page in pages:
+            start = time.perf_counter()
+            image = render(page)
+            if ocr:
+                ocr_service._process_image(image, ocr_service.engine)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF files to render")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus")
+    parser.add_argument("--ocr", action="store_true", help="Include PaddleOCR in the timing")
+    args = parser.parse_args()
+
+    pdfs = args.pdfs or sorted(
+        glob.glob(os.path.join(DEFAULT_CORPUS, "*.pdf")) + glob.glob(os.path.join(DEFAULT_CORPUS, "*.PDF"))
+    )
+    docs = [fitz.open(path) for path in pdfs]
+    pages = [page for doc in docs for page in doc]
+    print(f"{len(pages)} pages from {len(docs)} documents, {args.repeat} passes")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        png = time_pages(pages, lambda page: render_via_png(page, temp_dir), args.repeat, args.ocr)
+    in_memory = time_pages(pages, render_page_image, args.repeat, args.ocr)
+
+    png_mean = statistics.mean(png)
+    memory_mean = statistics.mean(in_memory)
+    print(f"{'method':<12}{'mean ms':>10}{'median ms':>12}")
+    print(f"{'temp PNG':<12}{png_mean:>10.2f}{statistics.median(png):>12.2f}")
+    print(f"{'in-memory':<12}{memory_mean:>10.2f}{statistics.median(in_memory):>12.2f}")
+    print(f"saving per page: {png_mean - memory_mean:.2f} ms ({(1 - memory_mean / png_mean) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# server/benchmarks/preprocessing.py
+"""
+Measure the image pre-processing stage on the scanned pages of a corpus.
+
+Every scanned page is OCRed as rendered and after pre-processing. The
+report shows the time of each pre-processing step, the pixel reduction,
+and the OCR time saved per page net of the pre-processing time. The
+pre-processing steps follow the OCR_PREPROCESS_* settings.
+
+Usage (from the server directory):
+    python -m benchmarks.preprocessing [PDF ...] [--engine paddle] [--dpi 150] [--repeat N]
+
+Without files the sample invoices in python_scripts/file_uploads are used.
+"""
+import argparse
+import glob
+import logging
+import os
+import statistics
+import time
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "python_scripts", "file_uploads"
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF files to process")
+    parser.add_argument("--engine", help="OCR engine name (default: the OCR_ENGINE setting)")
+    parser.add_argument("--dpi", type=int, help="Render resolution (default: the OCR_RENDER_DPI setting)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page")
+    args = parser.parse_args()
+
+    # Must be set before the settings are loaded
+    if args.dpi:
+        os.environ["OCR_RENDER_DPI"] = str(args.dpi)
+    logging.disable(logging.INFO)
+
+    import fitz  # PyMuPDF
+
+    from app.services.ocr_engines import get_engine
+    from app.services.ocr_service import ocr_service, render_page_image
+    from app.services.preprocessing import image_preprocessor
+
+    engine = get_engine(args.engine)
+    ocr_service.warm_up(args.engine)
+    pdfs = args.pdfs or sorted(
+        glob.glob(os.path.join(DEFAULT_CORPUS, "*.pdf")) + glob.glob(os.path.join(DEFAULT_CORPUS, "*.PDF"))
+    )
+    print(f"engine {engine.name}, steps {image_preprocessor.signature}")
+
+    print(f"{'page':<30}{'size':>12}{'pixels':>8}{'pre ms':>8}{'raw ocr ms':>12}{'pre ocr ms':>12}"
+          f"{'saved ms':>10}{'blocks':>9}")
+    saved_per_page = []
+    for path in pdfs:
+        with fitz.open(path) as doc:
+            for page in doc:
+                if page.get_text().strip():
+                    continue  # Text layer pages are never OCRed
+
+                image = render_page_image(page)
+                raw_times, pre_times, ocr_times = [], [], []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    raw_blocks = ocr_service._process_image(image, engine)
+                    raw_times.append(time.perf_counter() - start)
+
+                    start = time.perf_counter()
+                    result = image_preprocessor.process(image)
+                    pre_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    pre_blocks = ocr_service._process_image(result.image, engine)
+                    ocr_times.append(time.perf_counter() - start)
+
+                raw_ms = statistics.median(raw_times) * 1000
+                pre_ms = statistics.median(pre_times) * 1000
+                ocr_ms = statistics.median(ocr_times) * 1000
+                saved_per_page.append(raw_ms - pre_ms - ocr_ms)
+                name = f"{os.path.basename(path)[:24]} p{page.number + 1}"
+                size = f"{result.image.shape[1]}x{result.image.shape[0]}"
+                pixel_ratio = result.image.shape[0] * result.image.shape[1] / (image.shape[0] * image.shape[1])
+                print(f"{name:<30}{size:>12}{pixel_ratio:>8.2f}{pre_ms:>8.1f}{raw_ms:>12.1f}{ocr_ms:>12.1f}"
+                      f"{saved_per_page[-1]:>10.1f}{len(raw_blocks):>4}/{len(pre_blocks):<4}")
+
+    if not saved_per_page:
+        print("no scanned pages in the corpus")
+        return
+    stats = image_preprocessor.stats()
+    steps = ", ".join(f"{step} {ms:.2f}" for step, ms in stats["mean_step_ms"].items())
+    print(f"mean step ms: {steps}")
+    print(f"mean OCR time saved per page: {statistics.mean(saved_per_page):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# server/benchmarks/queue_scheduler.py
+"""
+Benchmark the fair share queue scheduler against strict priority order.
+
+An in-memory SQLite database is filled the way a busy day fills the
+queue: one owner queues a burst of priority 5 documents at once, while
+other owners keep queueing single documents of priority 1 to 3. Simulated
+workers claim the documents through crud.queue.claim_batch, each taking a
+fixed time, once with the documents queued by the fair share scheduler and
+once in strict priority then age order (the order claims had before).
+The report shows every owner's wait times under both.
+
+Claims and enqueues are then timed with 1k to 100k documents queued, to
+show the scheduling decision does not grow with the backlog.
+
+Usage (from the server directory):
+    python -m benchmarks.queue_scheduler [--burst N] [--owners N] [--workers N]
+                                         [--service-seconds S] [--rows 1000 10000 100000]
+"""
+import argparse
+import heapq
+import logging
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+# Strict priority order as a schedule key: a priority level outweighs any wait
+STRICT_AGING_SECONDS = 1e9
+
+
+def new_session() -> Any:
+    """A session on an empty in-memory database with the application's tables."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.base import Base
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def arrivals(burst: int, owners: int, duration: float, interval: float,
+             seed: int = 0) -> List[Tuple[float, int, int]]:
+    """
+    (time, owner id, priority) of every document queued: owner 1's burst at
+    the start, then each other owner's documents about `interval` seconds
+    apart until `duration`.
+    """
+    rng = random.Random(seed)
+    events = [(0.0, 1, 5) for _ in range(burst)]
+    for owner_id in range(2, owners + 2):
+        at = rng.uniform(0, interval)
+        while at < duration:
+            events.append((at, owner_id, rng.randint(1, 3)))
+            at += rng.expovariate(1 / interval)
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def simulate(scheduler: Any, events: List[Tuple[float, int, int]], workers: int,
+             service_seconds: float) -> Dict[int, List[float]]:
+    """Queue the documents at their times, claim them as workers free up, and return the waits by owner."""
+    from app import crud, schemas
+
+    db = new_session()
+    arrived: Dict[int, Tuple[float, int]] = {}
+    waits: Dict[int, List[float]] = {}
+    free_at = [0.0] * workers
+    next_event = 0
+    while next_event < len(events) or len(arrived) > sum(len(owner_waits) for owner_waits in waits.values()):
+        worker_free = free_at[0]
+        if next_event < len(events) and events[next_event][0] <= worker_free:
+            at, owner_id, priority = events[next_event]
+            next_event += 1
+            item = crud.queue.create(db, obj_in=schemas.QueueCreate(document_id=next_event, priority=priority))
+            scheduler.enqueue(db, queue_id=item.id, owner_id=owner_id, now=at)
+            arrived[item.id] = (at, owner_id)
+            continue
+        claimed = crud.queue.claim_batch(db, limit=1)
+        if not claimed:
+            # Idle until the next document arrives
+            heapq.heapreplace(free_at, events[next_event][0])
+            continue
+        at, owner_id = arrived[claimed[0][0]]
+        waits.setdefault(owner_id, []).append(worker_free - at)
+        heapq.heapreplace(free_at, worker_free + service_seconds)
+    db.close()
+    return waits
+
+
+def summary(waits: List[float]) -> str:
+    waits = sorted(waits)
+    p95 = waits[int(0.95 * (len(waits) - 1))]
+    return f"{len(waits):>6}{statistics.mean(waits):>9.0f}{p95:>9.0f}{waits[-1]:>9.0f}"
+
+
+def time_claims(rows: int, repeat: int, scheduler: Any) -> Tuple[float, float]:
+    """Median microseconds per enqueue and per claim with `rows` documents queued."""
+    from sqlalchemy import insert
+
+    from app import crud
+    from app.models.queue import Queue
+
+    rng = random.Random(rows)
+    db = new_session()
+    now = time.time()
+    queued = []
+    for index in range(rows):
+        turn = now + rng.uniform(0, 3600)
+        queued.append({
+            "document_id": index, "status": "queued", "priority": rng.randint(1, 5), "owner_id": rng.randint(1, 50),
+            "fair_share_turn": turn, "schedule_key": turn - rng.randint(0, 4) * 300.0,
+        })
+    db.execute(insert(Queue), queued)
+    db.execute(insert(Queue), [{"document_id": rows + index, "status": "pending"} for index in range(repeat)])
+    db.commit()
+    pending = [item.id for item in db.query(Queue.id).filter(Queue.status == "pending")]
+
+    enqueue_times, claim_times = [], []
+    for queue_id in pending:
+        start = time.perf_counter()
+        scheduler.enqueue(db, queue_id=queue_id, owner_id=rng.randint(1, 50))
+        enqueue_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        crud.queue.claim_batch(db, limit=1)
+        claim_times.append(time.perf_counter() - start)
+    db.close()
+    return statistics.median(enqueue_times) * 1e6, statistics.median(claim_times) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=2000, help="Priority 5 documents owner 1 queues at once")
+    parser.add_argument("--owners", type=int, default=5, help="Other owners queueing documents")
+    parser.add_argument("--workers", type=int, default=4, help="Documents processed at the same time")
+    parser.add_argument("--service-seconds", type=float, default=10.0, help="Processing time of a document")
+    parser.add_argument("--slot-seconds", type=float, default=10.0, help="Fair share slot")
+    parser.add_argument("--aging-seconds", type=float, default=300.0, help="Wait worth one priority level")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Queued documents to time claims at")
+    parser.add_argument("--repeat", type=int, default=200, help="Claims timed per backlog size")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from app.services.queue_scheduler import FairShareScheduler
+
+    fair = FairShareScheduler(args.slot_seconds, args.aging_seconds, {})
+    strict = FairShareScheduler(0.0, STRICT_AGING_SECONDS, {})
+    # As long as the workers take to get through the burst, with the other
+    # owners together adding a quarter of what the workers can process
+    duration = args.burst * args.service_seconds / args.workers
+    events = arrivals(args.burst, args.owners, duration, 4 * args.owners * args.service_seconds / args.workers)
+
+    results = {name: simulate(scheduler, events, args.workers, args.service_seconds)
+               for name, scheduler in (("strict", strict), ("fair", fair))}
+    print(f"{'':>12}{'strict priority order':^33}{'':>6}{'fair share':^33}")
+    print(f"{'owner':>12}" + f"{'docs':>6}{'mean s':>9}{'p95 s':>9}{'max s':>9}{'':>6}" * 2)
+    for owner_id in sorted(results["fair"]):
+        label = f"{owner_id}{' (burst)' if owner_id == 1 else ''}"
+        print(f"{label:>12}{summary(results['strict'][owner_id])}{'':>6}{summary(results['fair'][owner_id])}")
+
+    print()
+    print(f"{'queued':>8}{'enqueue us':>12}{'claim us':>10}")
+    for rows in args.rows:
+        enqueue_us, claim_us = time_claims(rows, args.repeat, fair)
+        print(f"{rows:>8}{enqueue_us:>12.0f}{claim_us:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# server/benchmarks/roi_pass.py
+"""
+Benchmark the header/footer ROI first pass against full-document OCR.
+
+For every document the full OCR and the ROI pass are timed separately,
+and the report shows whether the ROI pass found all OCR_REQUIRED_FIELDS
+(documents where it did not fall back to full OCR in production). The
+OCR cache is switched off.
+
+Usage (from the server directory):
+    python -m benchmarks.roi_pass [FILE ...] [--engine paddle] [--repeat N]
+
+Without files the sample invoices in python_scripts/file_uploads are used.
+"""
+import argparse
+import glob
+import logging
+import os
+import statistics
+import time
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "python_scripts", "file_uploads"
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="PDF or image files to process")
+    parser.add_argument("--engine", help="OCR engine name (default: the OCR_ENGINE setting)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per document")
+    args = parser.parse_args()
+
+    # Must be set before the settings are loaded
+    os.environ["OCR_CACHE_ENABLED"] = "false"
+    logging.disable(logging.INFO)
+
+    from app.services.ai_service import ai_service
+    from app.services.ocr_service import ocr_service
+    from app.services.pipeline import missing_required_fields
+
+    files = args.files or sorted(
+        glob.glob(os.path.join(DEFAULT_CORPUS, "*.pdf")) + glob.glob(os.path.join(DEFAULT_CORPUS, "*.PDF"))
+    )
+    ocr_service.warm_up(args.engine)
+
+    print(f"{'document':<36}{'full ms':>10}{'roi ms':>10}{'ratio':>8}  missing after ROI")
+    for path in files:
+        full_times, roi_times = [], []
+        roi_page = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            ocr_service.process_document(path, engine=args.engine)
+            full_times.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            roi_page = ocr_service.ocr_regions(path, engine=args.engine)
+            roi_times.append((time.perf_counter() - start) * 1000)
+
+        name = os.path.basename(path)[:34]
+        full_ms = statistics.median(full_times)
+        if roi_page is None:
+            print(f"{name:<36}{full_ms:>10.1f}{'-':>10}{'-':>8}  (text layer on page 1, ROI not used)")
+            continue
+        roi_ms = statistics.median(roi_times)
+        missing = missing_required_fields(ai_service.extract_data(roi_page.blocks))
+        print(f"{name:<36}{full_ms:>10.1f}{roi_ms:>10.1f}{roi_ms / full_ms:>8.2f}  {', '.join(missing) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# server/benchmarks/spatial_index.py
+"""
+Benchmark label-to-value pairing through the spatial index on dense,
+multi-column invoice pages.
+
+Synthetic pages are laid out like line-level OCR output of a parts
+invoice: a header table whose labels sit above or beside their values,
+several address columns, many line item rows and a totals column. The
+report compares field accuracy of the joined-text patterns alone with the
+extraction that pairs label blocks with their neighbours, and times the
+nearest-block lookups against a linear scan of every block.
+
+Usage (from the server directory):
+    python -m benchmarks.spatial_index [--rows 50 500 2000] [--pages N] [--repeat N]
+"""
+import argparse
+import logging
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+FIELDS = ["invoice_number", "invoice_date", "due_date", "total_amount"]
+
+
+def synthetic_invoice(rows: int, seed: int) -> Tuple[Any, Dict[str, Any]]:
+    """OCR blocks of a one-page invoice with `rows` line items, and its field values."""
+    from app.services.ocr_blocks import OcrBlocks
+
+    rng = random.Random(seed)
+    texts, boxes = [], []
+
+    def add(text: str, x: float, y: float, height: float = 10.0) -> None:
+        width = 5.5 * len(text)
+        texts.append(text)
+        boxes.append([[x, y], [x + width, y], [x + width, y + height], [x, y + height]])
+
+    number = f"{rng.choice('ABCDEFGHJK')}{rng.randint(100000, 999999)}"
+    invoice_date = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2024"
+    due_date = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2025"
+
+    add("ACME PIPE & SUPPLY CO", 40, 30, 14)
+    add("INVOICE", 480, 30, 14)
+    # Header table: labels in one row, values in the row below
+    for x, label, value in (
+        (330, "Invoice #", number), (410, "Date", invoice_date), (490, "Due Date", due_date),
+        (250, "Account #", str(rng.randint(10000, 99999))), (170, "Order Date", invoice_date.replace("2024", "2023")),
+    ):
+        add(label, x, 70)
+        add(value, x, 84)
+    # Address columns
+    for column, title in ((40, "Bill To"), (220, "Ship To"), (400, "Remit To")):
+        add(title, column, 110)
+        for line in range(3):
+            add(f"{rng.randint(10, 9999)} Main St Suite {line + 1}", column, 124 + line * 12)
+    # Line items
+    add("Qty", 40, 180)
+    add("Description", 90, 180)
+    add("Unit Price", 400, 180)
+    add("Amount", 500, 180)
+    subtotal = 0.0
+    for row in range(rows):
+        y = 196 + row * 14
+        quantity = rng.randint(1, 50)
+        price = rng.randint(100, 50000) / 100
+        subtotal += quantity * price
+        add(str(quantity), 40, y)
+        add(f"PVC ELBOW {rng.randint(1, 12)}IN SCH{rng.choice([40, 80])} Due {rng.randint(1, 9)}/{rng.randint(1, 9)}/24", 90, y)
+        add(f"{price:,.2f}", 400, y)
+        add(f"{quantity * price:,.2f}", 500, y)
+    tax = round(subtotal * 0.0825, 2)
+    total = round(subtotal + tax, 2)
+    y = 210 + rows * 14
+    for offset, (label, amount) in enumerate((("Subtotal", subtotal), ("Tax", tax), ("Total", total))):
+        add(label, 400, y + offset * 14)
+        add(f"${amount:,.2f}", 500, y + offset * 14)
+
+    # OCR returns lines roughly top to bottom but columns interleaved
+    order = sorted(range(len(texts)), key=lambda i: (round(boxes[i][0][1] / 20), rng.random()))
+    blocks = OcrBlocks.build(
+        [texts[i] for i in order], [boxes[i] for i in order], [0.95] * len(texts), 1
+    )
+    truth = {"invoice_number": number, "invoice_date": invoice_date, "due_date": due_date, "total_amount": total}
+    return blocks, truth
+
+
+def text_only_fields(blocks) -> Dict[str, Any]:
+    """The fields the joined-text patterns alone find."""
+    from app.services.field_scanner import invoice_scanner
+
+    values = invoice_scanner.extract(blocks.text)
+    if values["total_amount"] is not None:
+        values["total_amount"] = float(values["total_amount"].replace(",", ""))
+    return values
+
+
+def linear_right_of(bounds: np.ndarray, index: int) -> int:
+    """right_of by looking at every block."""
+    x0, y0, x1, y1 = bounds[index]
+    start = x1 - (y1 - y0) / 4
+    centres = (bounds[:, 1] + bounds[:, 3]) / 2
+    mask = (bounds[:, 0] >= start) & (centres >= y0) & (centres <= y1)
+    mask[index] = False
+    candidates = np.flatnonzero(mask)
+    return int(candidates[np.argmin(bounds[candidates, 0])]) if len(candidates) else -1
+
+
+def time_ms(func: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 500, 2000], help="Line item rows per page")
+    parser.add_argument("--pages", type=int, default=20, help="Synthetic invoices per row count")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per timed operation")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from app.services.ai_service import ai_service
+    from app.services.spatial_index import SpatialIndex
+
+    print(f"{'rows':>6}{'blocks':>8}  {'text-only correct':>18}{'spatial correct':>17}"
+          f"{'extract ms':>12}{'lookup us':>11}{'linear us':>11}")
+    for rows in args.rows:
+        correct_text, correct_spatial = 0, 0
+        invoices = [synthetic_invoice(rows, seed) for seed in range(args.pages)]
+        for blocks, truth in invoices:
+            text_values = text_only_fields(blocks)
+            spatial_values = ai_service._extract_invoice_data(blocks)
+            correct_text += sum(text_values[field] == truth[field] for field in FIELDS)
+            correct_spatial += sum(spatial_values[field] == truth[field] for field in FIELDS)
+        total = len(FIELDS) * len(invoices)
+
+        blocks = invoices[0][0]
+        extract_ms = time_ms(lambda: ai_service._extract_invoice_data(blocks), args.repeat)
+        index = SpatialIndex(blocks)
+        probes = list(range(0, len(blocks), max(len(blocks) // 200, 1)))
+        lookup_us = time_ms(lambda: [index.right_of(i) for i in probes], args.repeat) * 1000 / len(probes)
+        linear_us = time_ms(lambda: [linear_right_of(index.bounds, i) for i in probes], args.repeat) * 1000 / len(probes)
+
+        print(
+            f"{rows:>6}{len(blocks):>8}  {correct_text:>10}/{total:<7}{correct_spatial:>10}/{total:<6}"
+            f"{extract_ms:>12.2f}{lookup_us:>11.1f}{linear_us:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# server/tests/conftest.py
+import os
+
+import pytest
+
+# Settings require a Postgres server; the tests use in-memory SQLite instead
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "FIRST_SUPERUSER": "admin@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def db():
+    """A session on an empty in-memory SQLite database with the application's tables."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.base import Base
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
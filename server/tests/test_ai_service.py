@@ -0,0 +1,100 @@
+# server/tests/test_ai_service.py
+from typing import List, Tuple
+
+import pytest
+
+from app.services.ai_service import ai_service
+from app.services.ocr_blocks import OcrBlocks
+from app.services.spatial_index import SpatialIndex
+from app.services.vendor_index import VendorMatch
+
+
+def make_blocks(cells: List[Tuple[str, float, float]]) -> OcrBlocks:
+    """One page of blocks, 10 units high, from (text, left, top)."""
+    texts, boxes = [], []
+    for text, x, y in cells:
+        width = 6.0 * len(text)
+        texts.append(text)
+        boxes.append([[x, y], [x + width, y], [x + width, y + 10], [x, y + 10]])
+    return OcrBlocks.build(texts, boxes, [0.95] * len(texts), 1)
+
+
+ITEM_TABLE = [
+    ("Date", 40, 100), ("Description", 110, 100), ("Qty", 330, 100), ("Total", 420, 100),
+    ("03/01/2024", 40, 114), ("Widget", 110, 114), ("1", 330, 114), ("50.00", 420, 114),
+    ("03/02/2024", 40, 128), ("Gadget", 110, 128), ("2", 330, 128), ("70.00", 420, 128),
+]
+
+
+def labelled_values(blocks: OcrBlocks):
+    return ai_service._extract_labelled_values(blocks, SpatialIndex(blocks))
+
+
+def test_total_column_header_is_not_the_invoice_total():
+    blocks = make_blocks([("ACME SUPPLY CO", 40, 20)] + ITEM_TABLE + [("Total", 330, 160), ("$120.00", 420, 160)])
+
+    assert labelled_values(blocks)["total_amount"] == "120.00"
+    assert ai_service._extract_invoice_data(blocks)["total_amount"] == 120.0
+
+
+def test_date_column_header_is_not_the_invoice_date():
+    blocks = make_blocks([("ACME SUPPLY CO", 40, 20)] + ITEM_TABLE)
+
+    assert "invoice_date" not in labelled_values(blocks)
+
+
+def test_lowest_total_label_wins():
+    blocks = make_blocks([
+        ("Total", 330, 60), ("$99.00", 420, 60),
+        ("Subtotal", 330, 150), ("$100.00", 420, 150),
+        ("Amount Due", 330, 178), ("$108.25", 420, 178),
+    ])
+
+    assert labelled_values(blocks)["total_amount"] == "108.25"
+
+
+def test_header_table_labels_still_read_values_below():
+    blocks = make_blocks([
+        ("Invoice #", 250, 70), ("Date", 330, 70), ("Due Date", 410, 70),
+        ("A123456", 250, 84), ("03/14/2024", 330, 84), ("04/13/2024", 410, 84),
+    ])
+
+    values = labelled_values(blocks)
+    assert values["invoice_number"] == "A123456"
+    assert values["invoice_date"] == "03/14/2024"
+    assert values["due_date"] == "04/13/2024"
+
+
+def test_template_fields_without_a_position_fall_back_to_the_patterns():
+    blocks = make_blocks([
+        ("ACME SUPPLY CO", 40, 20), ("Invoice # A123456", 300, 20),
+        ("Date: 03/14/2024", 300, 40), ("Due Date: 04/13/2024", 300, 60), ("Total: $120.00", 300, 200),
+    ])
+    # Learned from results without a due date, so the template has no position for it
+    match = VendorMatch(template_id=1, vendor_name="Acme Supply Co", score=0.9, fields={
+        "invoice_number": "A123456", "invoice_date": "03/14/2024", "total_amount": 120.0,
+    })
+
+    result = ai_service.extract_with_template(blocks, match)
+
+    assert result["vendor_template"]["fallback_fields"] == ["due_date"]
+    assert result["extracted_data"]["due_date"] == "04/13/2024"
+    assert result["extracted_data"]["invoice_number"] == "A123456"
+
+
+def test_fields_get_the_best_confidence_of_the_blocks_holding_their_value():
+    blocks = OcrBlocks.build(
+        ["Invoice INV-42", "INV-42", "Total", "$1,234.50"],
+        [[[0, 0], [10, 0], [10, 10], [0, 10]]] * 4,
+        [0.7, 0.9, 0.99, 0.85],
+        1,
+    )
+    extracted = {"invoice_number": "INV-42", "total_amount": 1234.5, "vendor_name": "Nowhere Ltd", "due_date": None}
+
+    confidence = ai_service._field_confidence(extracted, blocks)
+
+    assert confidence["invoice_number"] == pytest.approx(0.9)
+    assert confidence["total_amount"] == pytest.approx(0.85)
+    # Not printed in any single block: the mean of all blocks
+    assert confidence["vendor_name"] == pytest.approx((0.7 + 0.9 + 0.99 + 0.85) / 4)
+    assert "due_date" not in confidence
@@ -0,0 +1,106 @@
+# server/tests/test_field_scanner.py
+import random
+import re
+
+import pytest
+
+from app.services.field_scanner import INVOICE_PATTERNS, FieldScanner
+
+PATTERNS = [pattern for field_patterns in INVOICE_PATTERNS.values() for pattern in field_patterns]
+# Labels, values and the characters whose lowercase form shifts offsets or that match ASCII letters
+FRAGMENTS = [
+    "Invoice", "INVOICE #", "invoice no.", "Inv", "inv-", "Date:", "Due Date", "due", "by", "Total", "TOTAL:",
+    "Amount Due", "Subtotal", "Balance", "Vendor:", "From:", "Bill", "to pay", "A-1001", "#", "03/14/2024",
+    "14-03-24", "$1,250.00", "99.50", "Acme Supply", "\u0130nvoice", "stra\u00dfe", "\u017fubtotal",
+    "\u0131nv", " ", " ", "\n", ":",
+]
+
+
+def random_texts(seed: int, count: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40)))
+
+
+def same_match(found, expected) -> bool:
+    return (found and (found.span(), found.groups())) == (expected and (expected.span(), expected.groups()))
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "total",
+    "TOTAL: $1,250.00 total due 3.00",
+    "Invoice # A-1001, invoice number 7",
+    "subtotal 5.00 totaltotal: 6.00",
+    "inv-42 inv-43 invoice",
+    "Due by 03/14/2024, due 04/01/2024, due date 05/01/2024",
+    # Lowercasing "\u0130" gives two characters, which shifts every offset after it
+    "\u0130\u0130 Invoice # 5 Total: 3.00",
+    # "\u017f" is a long s, which matches "s" case-insensitively; "\u0131" is a dotless i
+    "\u017fupplier: Acme, balance due 4.00, \u0131nvoice # 9",
+])
+def test_scan_search_matches_re_search_on_edge_cases(text):
+    scan = FieldScanner(INVOICE_PATTERNS).scan(text)
+    for pattern in PATTERNS:
+        assert same_match(scan.search(pattern), pattern.compiled.search(text)), pattern.regex
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_scan_search_matches_re_search(seed):
+    rng = random.Random(seed)
+    scanner = FieldScanner(INVOICE_PATTERNS)
+    for text in random_texts(seed, 200):
+        scan = scanner.scan(text)
+        # In any order, so patterns sharing keywords find their positions in either order
+        for pattern in rng.sample(PATTERNS, len(PATTERNS)):
+            assert same_match(scan.search(pattern), pattern.compiled.search(text)), (pattern.regex, text)
+
+
+def test_extract_matches_the_patterns_searched_in_turn():
+    scanner = FieldScanner(INVOICE_PATTERNS)
+    hits = 0
+    for text in random_texts(10, 300):
+        expected = {}
+        for field_name, patterns in INVOICE_PATTERNS.items():
+            match = next(filter(None, (re.search(p.regex, text, re.IGNORECASE) for p in patterns)), None)
+            expected[field_name] = match.group(1).strip() if match else None
+        values = scanner.extract(text)
+        assert values == expected, text
+        hits += sum(value is not None for value in values.values())
+    assert hits > 300
+
+
+TEXT = "Vendor: Acme Supply\nInvoice # A-1001\nDate: 03/14/2024\nAmount Due: $1,250.00"
+
+
+def vendor_attempts(scanner: FieldScanner, vendor: str, field_name: str) -> int:
+    profile = scanner._vendors[vendor]
+    return sum(profile.counts.get(p, [0, 0])[0] for p in INVOICE_PATTERNS[field_name])
+
+
+def test_unrecorded_scans_count_nothing():
+    scanner = FieldScanner(INVOICE_PATTERNS, adaptive=True, min_documents=1)
+    scan = scanner.scan(TEXT, record=False)
+    scan.first("vendor_name")
+    scan.set_vendor("Acme Supply")
+    scan.first("total_amount")
+
+    stats = scanner.stats()
+    assert stats["scans"] == 0
+    assert stats["vendors"] == 0
+    assert all(p["attempts"] == 0 for patterns in stats["fields"].values() for p in patterns)
+    assert scan.vendor == "acme supply"
+
+
+def test_vendor_name_patterns_count_for_the_vendor_they_found():
+    scanner = FieldScanner(INVOICE_PATTERNS, adaptive=True, min_documents=1)
+    scan = scanner.scan(TEXT)
+    assert scan.first("vendor_name") is not None
+    scan.set_vendor("Acme  SUPPLY")
+    scan.first("total_amount")
+
+    assert scanner._vendors["acme supply"].documents == 1
+    # "from:" misses, "vendor:" hits
+    assert vendor_attempts(scanner, "acme supply", "vendor_name") == 2
+    assert vendor_attempts(scanner, "acme supply", "total_amount") > 0
+
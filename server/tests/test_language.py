@@ -0,0 +1,32 @@
+# server/tests/test_language.py
+import pytest
+
+from app.services.language import detect_language
+
+ENGLISH = "Invoice number 1042. Please pay the balance due within 30 days. Thank you for your order."
+SPANISH = "Factura número 1042. Fecha de vencimiento: 30 días. Gracias por su pedido, el importe incluye IVA."
+FRENCH = "Facture numéro 1042. Date d'échéance : 30 jours. Merci pour votre commande, montant TTC avec TVA."
+
+
+@pytest.mark.parametrize("text, lang", [(ENGLISH, "en"), (SPANISH, "es"), (FRENCH, "fr")])
+def test_invoice_text_is_detected(text, lang):
+    assert detect_language(text) == lang
+
+
+def test_accents_dropped_by_ocr_do_not_matter():
+    assert detect_language("Factura numero 1042, descripcion, cantidad, precio unitario") == "es"
+    assert detect_language("Facture numero 1042, echeance, quantite, reglement") == "fr"
+
+
+def test_short_or_mixed_text_is_inconclusive():
+    assert detect_language("Total 120.00") is None
+    assert detect_language("") is None
+    # As many English as Spanish words
+    assert detect_language("invoice payment balance factura importe pedido") is None
+
+
+def test_only_candidate_languages_are_considered():
+    assert detect_language(FRENCH, ["en", "es"]) is None
+    assert detect_language(SPANISH, ["es", "fr"]) == "es"
+    assert detect_language(ENGLISH, ["en"]) == "en"
+    assert detect_language(ENGLISH, ["de"]) is None
@@ -0,0 +1,184 @@
+# server/tests/test_layout_extractor.py
+import threading
+
+import numpy as np
+import pytest
+
+from app import schemas
+from app.services.ai_service import ai_service
+from app.services.layout_extractor import (
+    BOX_SCALE, MODEL_FIELDS, MODEL_LABELS, LayoutModelExtractor, save_random_model, words_and_boxes,
+)
+from app.services.ocr_blocks import OcrBlocks
+from app.services.pipeline import parse_date
+
+
+def make_blocks(cells, page: int = 1) -> OcrBlocks:
+    """Blocks from (text, x0, y0, x1, y1)."""
+    texts = [cell[0] for cell in cells]
+    boxes = [[[x0, y0], [x1, y0], [x1, y1], [x0, y1]] for _, x0, y0, x1, y1 in cells]
+    return OcrBlocks.build(texts, boxes, [0.9] * len(cells), page)
+
+
+INVOICE = make_blocks([
+    ("ACME SUPPLY CO", 40, 20, 200, 32),
+    ("Invoice # A-1001", 300, 20, 460, 32),
+    ("Date: 03/14/2024", 300, 40, 460, 52),
+    ("Due Date: 04/13/2024", 300, 60, 500, 72),
+    ("Widget 2 $50.00\nGadget 1 $70.00", 40, 120, 500, 150),
+    ("Total: $120.00", 300, 400, 460, 412),
+])
+
+
+def test_words_and_boxes_slice_lines_by_characters():
+    blocks = make_blocks([("Total: $120.00", 0, 90, 140, 100), ("ACME", 0, 0, 40, 10)])
+
+    words, boxes = words_and_boxes(blocks)
+
+    # Reading order, and a box per word in proportion to its characters, on the 0-1000 grid
+    assert words == ["ACME", "Total:", "$120.00"]
+    assert boxes == [[0, 0, 286, 100], [0, 900, 429, 1000], [500, 900, 1000, 1000]]
+
+
+def test_words_and_boxes_scale_each_page_by_its_own_extent():
+    blocks = OcrBlocks.concat([
+        make_blocks([("one two", 0, 0, 100, 50)], page=1),
+        make_blocks([("three", 0, 0, 500, 1000)], page=2),
+    ])
+
+    words, boxes = words_and_boxes(blocks)
+
+    assert words == ["one", "two", "three"]
+    assert boxes == [[0, 0, 429, 1000], [571, 0, 1000, 1000], [0, 0, 1000, 1000]]
+    assert words_and_boxes(OcrBlocks.empty()) == ([], [])
+
+
+def test_words_of_multi_line_blocks_are_all_kept():
+    words, boxes = words_and_boxes(make_blocks([("Widget 2\nGadget 1", 0, 0, 80, 20)]))
+
+    assert words == ["Widget", "2", "Gadget", "1"]
+    assert all(0 <= value <= BOX_SCALE for box in boxes for value in box)
+
+
+def decoder() -> LayoutModelExtractor:
+    extractor = LayoutModelExtractor(None)
+    extractor._field_labels = {
+        label_id: (label.split("-")[0], label.split("-", 1)[1].lower())
+        for label_id, label in enumerate(MODEL_LABELS) if label != "O"
+    }
+    return extractor
+
+
+def tagged(labels, score: float = 0.9) -> np.ndarray:
+    """Token probabilities putting `score` on each token's label."""
+    probabilities = np.full((len(labels), len(MODEL_LABELS)), (1 - score) / (len(MODEL_LABELS) - 1))
+    probabilities[np.arange(len(labels)), [MODEL_LABELS.index(label) for label in labels]] = score
+    return probabilities
+
+
+def test_decode_joins_runs_of_words_labelled_by_their_first_token():
+    words = ["Acme", "Supply", "Invoice", "A-1001", "Total", "$1,250.00"]
+    # "Acme" has two tokens; only the first one's label counts
+    word_ids = [0, 0, 1, 2, 3, 4, 5]
+    labels = ["B-VENDOR_NAME", "O", "I-VENDOR_NAME", "O", "B-INVOICE_NUMBER", "O", "B-TOTAL_AMOUNT"]
+
+    values = decoder()._decode(words, word_ids, tagged(labels))
+
+    assert {field: value for field, (value, _) in values.items()} == {
+        "vendor_name": "Acme Supply", "invoice_number": "A-1001", "total_amount": 1250.0,
+    }
+    assert values["vendor_name"][1] == pytest.approx(0.9)
+
+
+def test_decode_keeps_the_best_scoring_run_and_skips_unreadable_amounts():
+    words = ["A-1", "B-2", "due", "$12.50"]
+    probabilities = np.concatenate([
+        tagged(["B-INVOICE_NUMBER"], 0.6), tagged(["B-INVOICE_NUMBER"], 0.8),
+        tagged(["B-TOTAL_AMOUNT"], 0.9), tagged(["B-TOTAL_AMOUNT"], 0.7),
+    ])
+
+    values = decoder()._decode(words, [0, 1, 2, 3], probabilities)
+
+    assert values["invoice_number"] == ("B-2", pytest.approx(0.8))
+    # "due" is no amount, so the lower scoring "$12.50" is taken
+    assert values["total_amount"] == (12.5, pytest.approx(0.7))
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    path = str(tmp_path_factory.mktemp("layout_model"))
+    save_random_model(path)
+    return path
+
+
+def check_fields(values):
+    for field, (value, score) in values.items():
+        assert field in MODEL_FIELDS
+        assert 0.0 <= score <= 1.0
+        assert isinstance(value, float if field == "total_amount" else str)
+
+
+def test_random_model_extracts_windows_in_batches(model_path):
+    # A character tokenizer makes every document several windows of 32 tokens
+    extractor = LayoutModelExtractor(model_path, batch_size=4, max_wait_ms=200, max_tokens=32)
+    results = [None] * 3
+    try:
+        def extract(index):
+            results[index] = extractor.extract(INVOICE)
+
+        threads = [threading.Thread(target=extract, args=(index,)) for index in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = extractor.stats()
+    finally:
+        extractor.stop()
+
+    for values in results:
+        check_fields(values)
+    # Each document gives the same tags, whichever batch its windows ran in
+    assert results[0] == pytest.approx(results[1]) and results[1] == pytest.approx(results[2])
+    assert stats["documents"] == 3
+    assert stats["windows"] > 3
+    assert stats["batches"] < stats["windows"]
+    assert stats["quantized"] and stats["loaded"]
+
+
+def test_extract_with_model_gives_the_result_the_pipeline_stores(model_path):
+    extractor = LayoutModelExtractor(model_path, quantize=False, max_tokens=64)
+    try:
+        result = ai_service.extract_with_model(INVOICE, extractor=extractor)
+    finally:
+        extractor.stop()
+
+    data = result["extracted_data"]
+    assert set(data) == set(MODEL_FIELDS) | {"line_items"}
+    assert isinstance(data["line_items"], list)
+    assert 0.0 <= result["confidence_score"] <= 1.0
+    model = result["layout_model"]
+    assert set(model["fields"]) | set(model["fallback_fields"]) == set(MODEL_FIELDS)
+    # Fields the model did not tag come from the patterns
+    if "due_date" in model["fallback_fields"]:
+        assert data["due_date"] == "04/13/2024"
+    # What the persist stage builds from it
+    schemas.ResultCreate(
+        document_id=1,
+        invoice_number=data["invoice_number"],
+        vendor_name=data["vendor_name"],
+        invoice_date=parse_date(data["invoice_date"], vendor=data["vendor_name"]),
+        due_date=parse_date(data["due_date"], vendor=data["vendor_name"]),
+        total_amount=data["total_amount"],
+        confidence_score=result["confidence_score"],
+        raw_extraction_data={"ai_result": result},
+    )
+
+
+def test_model_errors_fall_back_to_the_patterns(tmp_path):
+    result = ai_service.extract_with_model(INVOICE, extractor=LayoutModelExtractor(str(tmp_path / "missing")))
+
+    assert result["layout_model"] == {"fields": {}, "fallback_fields": MODEL_FIELDS}
+    assert result["extracted_data"]["invoice_number"] == "A-1001"
+    assert result["extracted_data"]["total_amount"] == 120.0
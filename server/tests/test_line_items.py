@@ -0,0 +1,118 @@
+# server/tests/test_line_items.py
+from typing import List, Tuple
+
+import pytest
+
+from app.services.line_items import LineItemExtractor, column_header_role
+from app.services.ocr_blocks import OcrBlocks
+from benchmarks.line_items import synthetic_invoice
+
+# (text, x, y), where a negative x is a right edge, for right-aligned numbers
+Cell = Tuple[str, float, float]
+
+
+def make_blocks(cells: List[Cell], page: int = 1) -> OcrBlocks:
+    texts, boxes = [], []
+    for text, x, y in cells:
+        width = 6.0 * len(text)
+        left = -x - width if x < 0 else x
+        texts.append(text)
+        boxes.append([[left, y], [left + width, y], [left + width, y + 10], [left, y + 10]])
+    return OcrBlocks.build(texts, boxes, [0.95] * len(texts), page)
+
+
+def item_row(y: float, quantity: str, description: str, price: str, amount: str) -> List[Cell]:
+    return [(quantity, -60, y), (description, 90, y), (price, -380, y), (amount, -480, y)]
+
+
+HEADER = [("Qty", 30, 100), ("Description", 90, 100), ("Unit Price", 300, 100), ("Amount", 430, 100)]
+TOTALS = [("Subtotal", 330, 200), ("$95.00", -480, 200), ("Total", 330, 214), ("$102.84", -480, 214)]
+
+
+@pytest.fixture
+def extractor():
+    return LineItemExtractor()
+
+
+def test_columns_are_named_by_the_header_row(extractor):
+    cells = HEADER + item_row(120, "2", "Widget", "25.00", "50.00") + item_row(134, "3", "Gadget", "15.00", "45.00")
+
+    assert extractor.extract(make_blocks(cells + TOTALS)) == [
+        {"quantity": 2.0, "description": "Widget", "amount": 50.0},
+        {"quantity": 3.0, "description": "Gadget", "amount": 45.0},
+    ]
+
+
+def test_header_columns_in_any_order(extractor):
+    header = [("Description", 30, 100), ("Unit Price", 200, 100), ("Units", 290, 100), ("Amount", 430, 100)]
+    cells = header + [("Widget", 30, 120), ("25.00", -260, 120), ("2", -320, 120), ("50.00", -480, 120)]
+
+    assert extractor.extract(make_blocks(cells)) == [{"quantity": 2.0, "description": "Widget", "amount": 50.0}]
+
+
+def test_quantity_is_found_by_the_product_without_a_header(extractor):
+    cells = (
+        item_row(120, "4", "Hex bolts", "2.50", "10.00")
+        + item_row(134, "10", "Washers", "0.35", "3.50")
+        + item_row(148, "1", "Bracket", "81.50", "81.50")
+    )
+
+    items = extractor.extract(make_blocks(cells))
+
+    assert [(item["quantity"], item["amount"]) for item in items] == [(4.0, 10.0), (10.0, 3.5), (1.0, 81.5)]
+    assert [item["description"] for item in items] == ["Hex bolts", "Washers", "Bracket"]
+
+
+def test_wrapped_descriptions_join_their_item(extractor):
+    cells = (
+        HEADER
+        + item_row(120, "2", "Widget", "25.00", "50.00")
+        + [("with mounting kit", 90, 132)]
+        + item_row(146, "3", "Gadget", "15.00", "45.00")
+    )
+
+    items = extractor.extract(make_blocks(cells + TOTALS))
+
+    assert [item["description"] for item in items] == ["Widget with mounting kit", "Gadget"]
+
+
+def test_the_table_ends_at_the_totals(extractor):
+    cells = HEADER + item_row(120, "2", "Widget", "25.00", "50.00") + TOTALS + [("Late fee", 90, 240), ("5.00", -480, 240)]
+
+    assert [item["description"] for item in extractor.extract(make_blocks(cells))] == ["Widget"]
+
+
+def test_rows_are_grouped_despite_small_vertical_offsets(extractor):
+    cells = HEADER + [("2", -60, 121.5), ("Widget", 90, 119), ("25.00", -380, 122), ("50.00", -480, 120)]
+
+    assert extractor.extract(make_blocks(cells)) == [{"quantity": 2.0, "description": "Widget", "amount": 50.0}]
+
+
+def test_every_page_is_read(extractor):
+    first = make_blocks(HEADER + item_row(120, "2", "Widget", "25.00", "50.00"), page=1)
+    second = make_blocks(HEADER + item_row(120, "3", "Gadget", "15.00", "45.00"), page=2)
+
+    items = extractor.extract(OcrBlocks.concat([first, second]))
+
+    assert [item["description"] for item in items] == ["Widget", "Gadget"]
+
+
+def test_blocks_without_a_table_have_no_items(extractor):
+    assert extractor.extract(OcrBlocks.empty()) == []
+    assert extractor.extract(make_blocks([("ACME SUPPLY", 30, 20), ("Invoice", 300, 20)])) == []
+
+
+@pytest.mark.parametrize("header", [True, False])
+def test_long_multi_page_invoices_are_recovered(extractor, header):
+    blocks, truth = synthetic_invoice(150, seed=3, header=header, rows_per_page=60)
+
+    assert extractor.extract(blocks) == truth
+
+
+@pytest.mark.parametrize("text, role", [
+    ("Qty", "quantity"), ("Hours", "quantity"), ("Description", "description"),
+    ("Unit Price", "unit_price"), ("Rate", "unit_price"), ("Ext Price", "amount"),
+    ("Line Total", "amount"), ("Part Number", None),
+])
+def test_header_cells_name_their_column(text, role):
+    assert column_header_role(text) == role
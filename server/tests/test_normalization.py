@@ -0,0 +1,95 @@
+# server/tests/test_normalization.py
+from datetime import datetime
+
+import pytest
+
+from app.services.normalization import DAY_FIRST, MONTH_FIRST, Normalizer, _plain_number, parse_amount
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+    ("(12.50)", -12.5),
+    ("12.50-", -12.5),
+    ("-$12.50", -12.5),
+    ("12,50", 12.5),
+    ("1'234", 1234.0),
+    ("1 234,50 EUR", 1234.5),
+    ("$1,250.00", 1250.0),
+    (".75", 0.75),
+    (42, 42.0),
+    ("(12.50", None),
+    ("12..50", None),
+    ("total", None),
+    (None, None),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+@pytest.mark.parametrize("digits, expected", [
+    ("1234", "1234"),
+    # A lone comma before one or two digits is a decimal comma, before three it groups thousands
+    ("12,5", "12.5"),
+    ("12,50", "12.50"),
+    ("1,234", "1234"),
+    # A lone dot is a decimal point, several dots group thousands
+    ("1.234", "1.234"),
+    ("1.234.567", "1234567"),
+    # With both, the later separator is the decimal point
+    ("1.234,5", "1234.5"),
+    ("1,234.5", "1234.5"),
+    # Thousands groups must have three digits and one separator
+    ("12,34,567", None),
+    ("1'23", None),
+    ("1'234 567", None),
+])
+def test_plain_number(digits, expected):
+    assert _plain_number(digits) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("01/02/68", datetime(2068, 1, 2)),
+    ("01/02/69", datetime(1969, 1, 2)),
+    ("01/02/00", datetime(2000, 1, 2)),
+    ("Mar 14, 99", datetime(1999, 3, 14)),
+])
+def test_two_digit_years_follow_the_strptime_pivot(text, expected):
+    assert Normalizer().parse_date(text) == expected
+
+
+def test_ambiguous_dates_are_read_month_first_without_a_vendor_order():
+    normalizer = Normalizer()
+    assert normalizer.parse_date("03/04/2024") == datetime(2024, 3, 4)
+    assert normalizer.parse_date("03.04.2024") == datetime(2024, 4, 3)
+    assert normalizer.parse_date("13/04/2024") == datetime(2024, 4, 13)
+    assert normalizer.parse_date("02/30/2024") is None
+
+
+def test_ambiguous_dates_follow_the_vendors_last_unambiguous_date():
+    normalizer = Normalizer()
+    assert normalizer.parse_date("25/03/2024", vendor="Acme GmbH") == datetime(2024, 3, 25)
+    assert normalizer.vendor_date_order("acme gmbh") == DAY_FIRST
+
+    assert normalizer.parse_date("03/04/2024", vendor="Acme GmbH") == datetime(2024, 4, 3)
+    # Other vendors keep the default order
+    assert normalizer.parse_date("03/04/2024", vendor="Widget Inc") == datetime(2024, 3, 4)
+    assert normalizer.vendor_date_order("Widget Inc") is None
+
+    assert normalizer.parse_date("12/25/2024", vendor="Acme GmbH") == datetime(2024, 12, 25)
+    assert normalizer.vendor_date_order("Acme GmbH") == MONTH_FIRST
+    assert normalizer.parse_date("03/04/2024", vendor="Acme GmbH") == datetime(2024, 3, 4)
+
+
+def test_unambiguous_dates_anywhere_in_a_list_decide_the_order():
+    normalizer = Normalizer()
+    dates = normalizer.parse_dates(["03/04/2024", "25/03/2024", None], vendor="Acme GmbH")
+    assert dates == [datetime(2024, 4, 3), datetime(2024, 3, 25), None]
+
+
+def test_least_recently_used_vendor_orders_are_dropped():
+    normalizer = Normalizer(max_vendors=2)
+    for vendor in ("a", "b", "c"):
+        normalizer.parse_date("25/03/2024", vendor=vendor)
+    assert normalizer.vendor_date_order("a") is None
+    assert normalizer.stats() == {"vendors": 2, "day_first_vendors": 2, "month_first_vendors": 0}
@@ -0,0 +1,153 @@
+# server/tests/test_ocr_batcher.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.ocr_batcher import OCRBatchServer
+
+
+class FakePaddle:
+    """
+    Stands in for PaddleOCR's predictors.
+
+    Every image has two text lines, read as the image's fill value, so each
+    recognised line can be traced back to the page it came from.
+    """
+
+    use_angle_cls = True
+    drop_score = 0.5
+
+    def __init__(self):
+        self.recognizer_calls = []
+        self.classified = []
+        self.fail = False
+
+    def text_detector(self, image):
+        boxes = np.array([
+            [[10, 10], [60, 10], [60, 20], [10, 20]],
+            [[10, 40], [60, 40], [60, 50], [10, 50]],
+        ], dtype=np.float32)
+        return boxes, 0.0
+
+    def text_classifier(self, crops):
+        self.classified.extend(int(crop[0, 0, 0]) for crop in crops)
+        return crops, [("0", 0.99) for _ in crops], 0.0
+
+    def text_recognizer(self, crops):
+        if self.fail:
+            raise RuntimeError("recognizer failed")
+        self.recognizer_calls.append(len(crops))
+        return [(f"page {int(crop[0, 0, 0])}", 0.9) for crop in crops], 0.0
+
+
+def page(value: int) -> np.ndarray:
+    return np.full((80, 80, 3), value, dtype=np.uint8)
+
+
+def texts(result):
+    return [line[1][0] for line in result[0]]
+
+
+@pytest.fixture
+def paddle():
+    return FakePaddle()
+
+
+def test_a_full_batch_runs_without_waiting_for_the_deadline(paddle):
+    server = OCRBatchServer(lambda: paddle, batch_size=4, max_wait_ms=10_000)
+    try:
+        start = time.monotonic()
+        futures = [server.submit(page(value)) for value in (1, 2, 3, 4)]
+        results = [future.result(timeout=5) for future in futures]
+        elapsed = time.monotonic() - start
+    finally:
+        server.stop()
+
+    assert elapsed < 5
+    # One recognizer call over the crops of all four pages, scattered back per page
+    assert paddle.recognizer_calls == [8]
+    assert [texts(result) for result in results] == [[f"page {value}"] * 2 for value in (1, 2, 3, 4)]
+    assert server.stats()["batches"] == 1
+    assert server.stats()["pages"] == 4
+    assert server.stats()["crops"] == 8
+
+
+def test_a_partial_batch_is_flushed_at_the_deadline(paddle):
+    server = OCRBatchServer(lambda: paddle, batch_size=8, max_wait_ms=50)
+    try:
+        start = time.monotonic()
+        result = server.submit(page(7)).result(timeout=5)
+        elapsed = time.monotonic() - start
+    finally:
+        server.stop()
+
+    assert texts(result) == ["page 7", "page 7"]
+    assert 0.04 <= elapsed < 5
+    assert paddle.recognizer_calls == [2]
+    assert server.stats()["mean_batch_size"] == 1.0
+
+
+def test_concurrent_callers_share_batches(paddle):
+    server = OCRBatchServer(lambda: paddle, batch_size=3, max_wait_ms=200)
+    results = {}
+    barrier = threading.Barrier(6)
+
+    def call(value):
+        barrier.wait()
+        results[value] = server.infer(page(value))
+
+    threads = [threading.Thread(target=call, args=(value,)) for value in range(1, 7)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+    finally:
+        server.stop()
+
+    assert {value: texts(result) for value, result in results.items()} == {
+        value: [f"page {value}"] * 2 for value in range(1, 7)
+    }
+    assert sum(paddle.recognizer_calls) == 12
+    assert len(paddle.recognizer_calls) < 6
+    assert max(paddle.recognizer_calls) <= 6
+
+
+def test_only_pages_that_ask_for_it_are_classified(paddle):
+    server = OCRBatchServer(lambda: paddle, batch_size=2, max_wait_ms=1000)
+    try:
+        futures = [server.submit(page(1), cls=False), server.submit(page(2), cls=True)]
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        server.stop()
+
+    assert paddle.classified == [2, 2]
+
+
+def test_a_failed_batch_fails_its_callers_and_the_server_keeps_serving(paddle):
+    server = OCRBatchServer(lambda: paddle, batch_size=2, max_wait_ms=1000)
+    try:
+        paddle.fail = True
+        futures = [server.submit(page(1)), server.submit(page(2))]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+
+        paddle.fail = False
+        assert texts(server.submit(page(3)).result(timeout=5)) == ["page 3", "page 3"]
+    finally:
+        server.stop()
+
+
+def test_low_confidence_lines_are_dropped(paddle):
+    paddle.drop_score = 0.95
+    server = OCRBatchServer(lambda: paddle, batch_size=1, max_wait_ms=0)
+    try:
+        result = server.submit(page(1)).result(timeout=5)
+    finally:
+        server.stop()
+
+    assert result == [[]]
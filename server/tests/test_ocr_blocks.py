@@ -0,0 +1,109 @@
+# server/tests/test_ocr_blocks.py
+import pickle
+
+import numpy as np
+
+from app.services.ocr_blocks import OcrBlocks
+
+
+def box(x: float, y: float, width: float = 40, height: float = 10):
+    return [[x, y], [x + width, y], [x + width, y + height], [x, y + height]]
+
+
+DICTS = [
+    {"text": "Invoice", "confidence": 0.96875, "position": box(10, 10), "page": 1},
+    {"text": "INV-001", "confidence": 0.5, "position": box(60, 12), "page": 1},
+    {"text": "Total", "confidence": 0.75, "position": box(10.5, 80.25), "page": 2},
+    {"text": "Unpaged", "confidence": 0.25, "position": box(0, 0)},
+]
+
+
+def test_dicts_round_trip_losslessly():
+    blocks = OcrBlocks.from_dicts(DICTS)
+
+    assert blocks.to_dicts() == DICTS
+    assert [blocks[i] for i in range(len(blocks))] == DICTS
+    assert list(blocks) == DICTS
+    assert blocks.text == "Invoice INV-001 Total Unpaged"
+
+
+def test_paddle_output_skips_empty_lines_and_strips_texts():
+    result = [[
+        [box(0, 0), ("  Invoice ", 0.9)],
+        [box(0, 20), ("   ", 0.9)],
+        [box(0, 40), ("", 0.9)],
+        [box(0, 60), ("Total", 0.8)],
+    ]]
+
+    blocks = OcrBlocks.from_paddle(result, page=3)
+
+    assert blocks.texts == ["Invoice", "Total"]
+    assert blocks.pages.tolist() == [3, 3]
+    assert len(OcrBlocks.from_paddle(None)) == 0
+    assert len(OcrBlocks.from_paddle([None])) == 0
+
+
+def test_concat_keeps_order_and_shifts_text_offsets():
+    first = OcrBlocks.from_dicts(DICTS[:2])
+    second = OcrBlocks.from_dicts(DICTS[2:])
+
+    joined = OcrBlocks.concat([first, OcrBlocks.empty(), second])
+
+    assert joined.to_dicts() == DICTS
+    assert joined.text == OcrBlocks.from_dicts(DICTS).text
+    assert len(OcrBlocks.concat([])) == 0
+    assert OcrBlocks.concat([first]) is first
+
+
+def test_selections_share_the_buffer_and_keep_texts():
+    blocks = OcrBlocks.from_dicts(DICTS)
+
+    assert blocks.on_page(1).texts == ["Invoice", "INV-001"]
+    assert blocks.min_confidence(0.7).texts == ["Invoice", "Total"]
+    assert blocks[1:3].texts == ["INV-001", "Total"]
+    assert blocks.take(np.array([3, 0])).texts == ["Unpaged", "Invoice"]
+    assert blocks.crop(0, 0, 100, 40).texts == ["Invoice", "INV-001", "Unpaged"]
+    assert blocks.crop(0, 0, 100, 40, page=1).texts == ["Invoice", "INV-001"]
+    # A selection's text is joined from its own blocks, not the shared buffer
+    assert blocks.on_page(2).text == "Total"
+    assert blocks.on_page(1)._buffer is blocks._buffer
+
+
+def test_compact_selections_pickle_only_their_own_texts():
+    blocks = OcrBlocks.build(["x" * 1000, "keep"], [box(0, 0), box(0, 20)], [0.9, 0.9], 1)
+    selection = blocks.filter(np.array([False, True]))
+
+    compact = selection.compact()
+
+    assert compact.to_dicts() == selection.to_dicts()
+    assert len(pickle.dumps(compact)) < len(pickle.dumps(selection)) - 900
+
+
+def test_translate_moves_positions_only():
+    blocks = OcrBlocks.from_dicts(DICTS[:1])
+
+    moved = blocks.translate(5, 100)
+
+    assert moved.positions[0].tolist() == [[15, 110], [55, 110], [55, 120], [15, 120]]
+    assert moved.texts == ["Invoice"]
+    assert blocks.positions[0, 0].tolist() == [10, 10]
+
+
+def test_bounds_are_the_axis_aligned_box():
+    blocks = OcrBlocks.build(["tilted"], [[[10, 5], [50, 0], [55, 20], [12, 25]]], [0.9], 1)
+
+    assert blocks.bounds().tolist() == [[10, 0, 55, 25]]
+
+
+def test_reading_order_groups_lines_by_top():
+    blocks = OcrBlocks.build(
+        ["second page", "right", "left", "below", "slightly lower"],
+        [box(0, 0), box(100, 10), box(10, 12), box(10, 40), box(200, 15)],
+        [0.9] * 5,
+        [2, 1, 1, 1, 1],
+    )
+
+    ordered = blocks.sort_reading_order(line_tolerance=10)
+
+    assert ordered.texts == ["left", "right", "slightly lower", "below", "second page"]
+    assert blocks.sort_by_top().texts == ["second page", "right", "left", "slightly lower", "below"]
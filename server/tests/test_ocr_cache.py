@@ -0,0 +1,38 @@
+# server/tests/test_ocr_cache.py
+import json
+
+from app.services.ocr_blocks import OcrBlocks
+from app.services.ocr_cache import OCRCache
+from app.services.ocr_service import _split_pages
+
+BOX = [[0, 0], [60, 0], [60, 10], [0, 10]]
+
+
+def test_blank_trailing_pages_survive_a_cache_hit(tmp_path):
+    cache = OCRCache(str(tmp_path), max_bytes=1 << 20)
+    blocks = OcrBlocks.concat([
+        OcrBlocks.build(["Invoice"], [BOX], [0.9], 1),
+        OcrBlocks.build(["Total"], [BOX], [0.9], 2),
+    ])
+    cache.put_document("doc", blocks.to_dicts(), page_count=4)
+
+    cached_blocks, page_count = cache.get_document("doc")
+    pages = list(_split_pages(OcrBlocks.from_dicts(cached_blocks), page_count))
+
+    assert [(page.page_num, page.page_count, len(page.blocks)) for page in pages] == [
+        (0, 4, 1), (1, 4, 1), (2, 4, 0), (3, 4, 0),
+    ]
+
+
+def test_entries_without_a_page_count_end_at_the_last_page_with_blocks(tmp_path):
+    cache = OCRCache(str(tmp_path), max_bytes=1 << 20)
+    blocks = OcrBlocks.build(["Total"], [BOX], [0.9], 2)
+    # The format written before page counts were stored
+    cache.put("doc", blocks.to_dicts())
+    assert json.loads(open(cache._path("doc")).read())[0]["text"] == "Total"
+
+    cached_blocks, page_count = cache.get_document("doc")
+    pages = list(_split_pages(OcrBlocks.from_dicts(cached_blocks), page_count))
+
+    assert page_count is None
+    assert [(page.page_num, page.page_count, len(page.blocks)) for page in pages] == [(0, 2, 0), (1, 2, 1)]
@@ -0,0 +1,123 @@
+# server/tests/test_ocr_engines.py
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import ocr_engines
+from app.services.ocr_engines import PaddleEngine, available_engines, get_engine, model_cache_stats
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(ocr_engines, "_engines", OrderedDict())
+
+
+def test_the_built_in_engines_are_registered():
+    assert {"paddle", "paddle_rec", "stub", "text_layer"} <= set(available_engines())
+
+
+def test_engines_are_shared_per_name_and_language():
+    assert get_engine("stub", "en") is get_engine("stub", "en")
+    assert get_engine("stub", "en") is not get_engine("stub", "de")
+    assert get_engine("stub", "de").lang == "de"
+
+
+def test_unknown_engines_are_rejected():
+    with pytest.raises(ValueError, match="Unknown OCR engine 'nope'"):
+        get_engine("nope")
+
+
+def test_creating_a_model_engine_loads_no_models():
+    assert not get_engine("paddle", "en").is_loaded
+
+
+def test_the_stub_engine_is_deterministic_per_image():
+    engine = get_engine("stub")
+    first = np.zeros((100, 200, 3), dtype=np.uint8)
+    second = first.copy()
+    second[10:20, 10:20] = 255
+
+    assert engine.ocr(first) == engine.ocr(first.copy())
+    assert engine.ocr(first) != engine.ocr(second)
+    # Boxes lie within the page
+    for box, _ in engine.ocr(first)[0]:
+        assert all(0 <= x <= 200 and 0 <= y <= 100 for x, y in box)
+
+
+class FakePaddleEngine(PaddleEngine):
+    """The Paddle engine's model caching, with a placeholder in place of the PaddleOCR models."""
+
+    name = "fake_paddle"
+
+    def _load_model(self):
+        return object()
+
+
+@pytest.fixture
+def model_cache(monkeypatch):
+    monkeypatch.setitem(ocr_engines._ENGINE_TYPES, FakePaddleEngine.name, FakePaddleEngine)
+    monkeypatch.setattr(ocr_engines, "_model_cache_stats", {"loads": 0, "evictions": 0})
+    monkeypatch.setattr(settings, "OCR_MODEL_CACHE_MAX_MODELS", 2)
+    monkeypatch.setattr(settings, "OCR_MODEL_CACHE_MAX_RSS_MB", 0)
+
+
+def load(lang):
+    engine = get_engine("fake_paddle", lang)
+    engine.load()
+    return engine
+
+
+def test_engines_without_models_do_not_count_against_the_cache(model_cache):
+    load("en")
+    get_engine("stub", "en")
+    load("es")
+
+    assert model_cache_stats()["models"] == ["fake_paddle:en", "fake_paddle:es"]
+    assert model_cache_stats()["evictions"] == 0
+
+
+def test_the_least_recently_used_models_are_evicted(model_cache):
+    english, spanish = load("en"), load("es")
+    # Using English again makes Spanish the least recently used
+    get_engine("fake_paddle", "en")
+    french = load("fr")
+
+    assert english.is_loaded and french.is_loaded
+    assert not spanish.is_loaded
+    stats = model_cache_stats()
+    assert stats["models"] == ["fake_paddle:en", "fake_paddle:fr"]
+    assert (stats["loads"], stats["evictions"]) == (3, 1)
+
+    # An evicted engine loads its models again on next use
+    load("es")
+    assert model_cache_stats()["models"] == ["fake_paddle:fr", "fake_paddle:es"]
+    assert not english.is_loaded
+
+
+def test_models_are_evicted_while_the_process_is_over_the_rss_limit(model_cache, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_MODEL_CACHE_MAX_MODELS", 10)
+    monkeypatch.setattr(settings, "OCR_MODEL_CACHE_MAX_RSS_MB", 1000)
+    english, spanish = load("en"), load("es")
+
+    # Each loaded model takes 400 MB
+    monkeypatch.setattr(
+        ocr_engines, "process_rss_mb",
+        lambda: 400.0 * len(ocr_engines._models_in_memory()),
+    )
+    french = load("fr")
+
+    assert not english.is_loaded
+    assert spanish.is_loaded and french.is_loaded
+    assert model_cache_stats()["evictions"] == 1
+
+
+def test_the_last_model_is_kept_even_above_the_rss_limit(model_cache, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_MODEL_CACHE_MAX_RSS_MB", 100)
+    monkeypatch.setattr(ocr_engines, "process_rss_mb", lambda: 500.0)
+
+    english = load("en")
+
+    assert english.is_loaded
+    assert model_cache_stats()["evictions"] == 0
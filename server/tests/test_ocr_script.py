@@ -0,0 +1,90 @@
+# server/tests/test_ocr_script.py
+import importlib.util
+import io
+import json
+import os
+
+import pytest
+
+pytest.importorskip("paddleocr")
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "..", "python_scripts", "ocr.py")
+
+
+class FakePaddleOCR:
+    """Reads a file holding a page count as that many pages of two lines each."""
+
+    instances = 0
+
+    def __init__(self, **options):
+        FakePaddleOCR.instances += 1
+
+    def ocr(self, file_path, cls=True):
+        with open(file_path) as f:
+            page_count = int(f.read())
+        box = [[0, 0], [1, 0], [1, 1], [0, 1]]
+        return [
+            [[box, (f"page {page + 1} line {line + 1}", 0.9)] for line in range(2)]
+            for page in range(page_count)
+        ]
+
+
+@pytest.fixture
+def script(monkeypatch):
+    spec = importlib.util.spec_from_file_location("ocr_script", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "PaddleOCR", FakePaddleOCR)
+    FakePaddleOCR.instances = 0
+    return module
+
+
+@pytest.fixture
+def files(tmp_path):
+    for name, page_count in [("a.pdf", 2), ("b.png", 1), ("notes.txt", 5)]:
+        (tmp_path / name).write_text(str(page_count))
+    return tmp_path
+
+
+def test_batch_mode_writes_a_line_per_file_and_loads_the_model_once(script, files, capsys):
+    output = files / "results.jsonl"
+    script.run_batch([str(files), str(files / "missing.pdf")], str(output))
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    # Unsupported files in directories are left out; missing files become error records
+    assert [os.path.basename(record["file"]) for record in records] == ["a.pdf", "b.png", "missing.pdf"]
+    assert [record.get("pages") for record in records] == [2, 1, None]
+    assert records[0]["lines"][-1] == {"page 2 line 2": 0.9}
+    assert "File not found" in records[2]["error"]
+    assert FakePaddleOCR.instances == 1
+
+    summary = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert (summary["files"], summary["pages"], summary["errors"]) == (2, 3, 1)
+
+
+def test_server_mode_answers_paths_json_requests_and_stats(script, files):
+    out = io.StringIO()
+    requests = [
+        str(files / "a.pdf") + "\n",
+        "\n",
+        json.dumps({"file": str(files / "b.png")}) + "\n",
+        "{not json\n",
+        "stats\n",
+    ]
+
+    script.serve_lines(requests, out.write, script.Throughput())
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [response.get("pages") for response in responses[:2]] == [2, 1]
+    assert responses[2]["error"].startswith("Invalid request")
+    assert (responses[3]["files"], responses[3]["pages"]) == (2, 3)
+    assert FakePaddleOCR.instances == 1
+
+
+def test_single_file_mode_prints_the_lines_of_every_page(script, files, capsys):
+    script.Process_File(str(files / "a.pdf"))
+
+    lines = json.loads(capsys.readouterr().out)
+    assert [next(iter(line)) for line in lines] == [
+        "page 1 line 1", "page 1 line 2", "page 2 line 1", "page 2 line 2",
+    ]
@@ -0,0 +1,277 @@
+# server/tests/test_ocr_service.py
+import importlib
+import io
+from typing import List, Set
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.services import ocr_engines
+from app.services.ocr_cache import OCRCache
+from app.services.ocr_engines import OCREngine
+from app.services.ocr_service import ocr_service
+
+# app.services exports the service itself under the module's name
+ocr_service_module = importlib.import_module("app.services.ocr_service")
+BOX = [[10, 10], [90, 10], [90, 30], [10, 30]]
+
+
+class FakeEngine(OCREngine):
+    """Reads each image as one line naming its gray level, and fails the levels in `fail_once` the first time."""
+
+    name = "fake"
+    fail_once: Set[int] = set()
+    calls: List[int] = []
+
+    def ocr(self, image, cls=True):
+        level = int(np.asarray(image).mean().round())
+        FakeEngine.calls.append(level)
+        if level in FakeEngine.fail_once:
+            FakeEngine.fail_once.discard(level)
+            raise RuntimeError(f"OCR of level {level} failed")
+        return [[[BOX, (f"level {level}", 0.9)]]]
+
+
+@pytest.fixture
+def fake_engine(monkeypatch, tmp_path):
+    monkeypatch.setitem(ocr_engines._ENGINE_TYPES, FakeEngine.name, FakeEngine)
+    monkeypatch.setattr(ocr_engines, "_engines", type(ocr_engines._engines)())
+    monkeypatch.setattr(ocr_service_module, "ocr_cache", OCRCache(str(tmp_path / "cache"), max_bytes=1 << 20))
+    monkeypatch.setattr(settings, "OCR_PAGE_WORKERS", 0)
+    FakeEngine.fail_once, FakeEngine.calls = set(), []
+    return FakeEngine
+
+
+def tiff(levels: List[int]) -> bytes:
+    """A multi-page TIFF with one flat gray page per level."""
+    frames = [Image.new("L", (100, 40), level) for level in levels]
+    out = io.BytesIO()
+    frames[0].save(out, format="TIFF", save_all=True, append_images=frames[1:])
+    return out.getvalue()
+
+
+def read_pages(content: bytes):
+    return [
+        (page.source, page.blocks.texts, page.failed)
+        for page in ocr_service.iter_pages("scan.tiff", engine="fake", content=content)
+    ]
+
+
+def test_documents_with_a_failed_page_are_not_cached(fake_engine):
+    content = tiff([50, 100, 150])
+    fake_engine.fail_once = {100}
+
+    assert read_pages(content) == [
+        ("ocr", ["level 50"], False), ("ocr", [], True), ("ocr", ["level 150"], False),
+    ]
+    # The page that failed is read again; the others come from the page cache
+    assert read_pages(content) == [
+        ("cache", ["level 50"], False), ("ocr", ["level 100"], False), ("cache", ["level 150"], False),
+    ]
+    assert fake_engine.calls == [50, 100, 150, 100]
+    # Now the whole document is cached
+    assert [source for source, _, _ in read_pages(content)] == ["cache"] * 3
+    assert fake_engine.calls == [50, 100, 150, 100]
+
+
+def scanned_pdf(page_count: int, text_pages=()) -> bytes:
+    """A PDF whose pages are drawings without a text layer, except `text_pages` (0-based) which have text."""
+    import fitz
+
+    doc = fitz.open()
+    for page_num in range(page_count):
+        page = doc.new_page(width=200, height=100)
+        # A different drawing on every page, so the stub engine reads different values
+        page.draw_rect(fitz.Rect(10, 10, 20 + 15 * page_num, 40), color=(0, 0, 0), fill=(0, 0, 0))
+        if page_num in text_pages:
+            page.insert_text((20, 80), f"Embedded text {page_num + 1}", fontsize=10)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def read_pdf(content: bytes):
+    return [
+        (page.page_num, page.page_count, page.source, page.blocks.texts, page.blocks.pages.tolist())
+        for page in ocr_service.iter_pages("scan.pdf", engine="stub", content=content)
+    ]
+
+
+def test_page_pool_returns_pages_in_order_with_their_page_numbers(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_CACHE_ENABLED", False)
+    # Spawned workers read their settings from the environment
+    monkeypatch.setenv("OCR_ENGINE", "stub")
+    content = scanned_pdf(7, text_pages=(2,))
+
+    monkeypatch.setattr(settings, "OCR_PAGE_WORKERS", 0)
+    serial = read_pdf(content)
+    monkeypatch.setattr(settings, "OCR_PAGE_WORKERS", 3)
+    monkeypatch.setattr(settings, "OCR_PARALLEL_MIN_PAGES", 2)
+    try:
+        parallel = read_pdf(content)
+        assert ocr_service._page_pool is not None
+    finally:
+        ocr_service.shutdown()
+
+    assert parallel == serial
+    assert [page[:3] for page in parallel] == [
+        (page_num, 7, "text" if page_num == 2 else "ocr") for page_num in range(7)
+    ]
+    for page_num, _, _, texts, pages in parallel:
+        assert texts and pages == [page_num + 1] * len(texts)
+    # Every scanned page read something of its own
+    invoice_numbers = {texts[1] for _, _, source, texts, _ in parallel if source == "ocr"}
+    assert len(invoice_numbers) == 6
+
+
+def test_pages_are_rendered_in_memory_the_same_as_through_a_png(monkeypatch, tmp_path):
+    import cv2
+    import fitz
+
+    from app.services.ocr_service import render_page_image
+
+    doc = fitz.open(stream=scanned_pdf(1), filetype="pdf")
+    # An odd width makes the pixmap rows padded
+    page = doc.new_page(width=101, height=50)
+    page.draw_circle(fitz.Point(50, 25), 20, color=(1, 0, 0), fill=(0, 0, 1))
+    for page in doc:
+        image = render_page_image(page)
+        pix = page.get_pixmap(dpi=settings.OCR_RENDER_DPI, colorspace=fitz.csRGB, alpha=False)
+        from_png = cv2.imdecode(np.frombuffer(pix.tobytes("png"), dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert image.dtype == np.uint8 and image.flags["C_CONTIGUOUS"]
+        assert np.array_equal(image, from_png)
+    doc.close()
+
+    # No temporary page images are written
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "OCR_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "OCR_PAGE_WORKERS", 0)
+    assert len(read_pdf(scanned_pdf(2))) == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_each_engine_keeps_its_own_cache_entries(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_service_module, "ocr_cache", OCRCache(str(tmp_path / "cache"), max_bytes=1 << 20))
+    monkeypatch.setattr(settings, "OCR_PAGE_WORKERS", 0)
+    content = scanned_pdf(2, text_pages=(1,))
+
+    stub = read_pdf(content)
+    text_layer = [
+        (page.source, page.blocks.texts)
+        for page in ocr_service.iter_pages("scan.pdf", engine="text_layer", content=content)
+    ]
+
+    # The stub's reading of the scanned page is not served to the text layer engine
+    assert stub[0][2] == "ocr" and len(stub[0][3]) == 5
+    assert text_layer == [("text", []), (stub[1][2], stub[1][3])]
+
+
+def test_region_pass_reads_the_header_and_footer_in_page_coordinates(fake_engine, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ROI_HEADER_FRACTION", 0.25)
+    monkeypatch.setattr(settings, "OCR_ROI_FOOTER_FRACTION", 0.2)
+    # Header, body and footer in different gray levels
+    page = np.full((1000, 400), 120, dtype=np.uint8)
+    page[:250] = 50
+    page[800:] = 200
+    out = io.BytesIO()
+    Image.fromarray(page).save(out, format="PNG")
+
+    result = ocr_service.ocr_regions("scan.png", engine="fake", content=out.getvalue())
+
+    # The body is never read
+    assert sorted(fake_engine.calls) == [50, 200]
+    assert (result.page_num, result.page_count, result.source) == (0, 1, "roi")
+    assert result.blocks.texts == ["level 50", "level 200"]
+    assert result.blocks.positions[:, :, 1].tolist() == [[10, 10, 30, 30], [810, 810, 830, 830]]
+
+
+def test_region_pass_skips_pages_with_a_text_layer(fake_engine):
+    assert ocr_service.ocr_regions("scan.pdf", engine="fake", content=scanned_pdf(1, text_pages=(0,))) is None
+    assert fake_engine.calls == []
+
+
+def test_overlapping_bands_are_merged(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ROI_HEADER_FRACTION", 0.3)
+    monkeypatch.setattr(settings, "OCR_ROI_FOOTER_FRACTION", 0.35)
+    assert ocr_service_module._roi_bands(1000) == [(0, 300), (650, 1000)]
+
+    monkeypatch.setattr(settings, "OCR_ROI_FOOTER_FRACTION", 0.8)
+    assert ocr_service_module._roi_bands(1000) == [(0, 1000)]
+
+
+def test_tiff_frames_become_pages_in_order(fake_engine):
+    pages = list(ocr_service.iter_pages("scan.tiff", engine="fake", content=tiff([10, 60, 110, 160])))
+
+    assert [(page.page_num, page.page_count) for page in pages] == [(0, 4), (1, 4), (2, 4), (3, 4)]
+    assert [page.blocks.texts for page in pages] == [["level 10"], ["level 60"], ["level 110"], ["level 160"]]
+    assert [page.blocks.pages.tolist() for page in pages] == [[1], [2], [3], [4]]
+
+
+@pytest.mark.parametrize("format_name, extension", [("PNG", "png"), ("JPEG", "jpg")])
+def test_single_image_files_are_one_page(fake_engine, format_name, extension):
+    out = io.BytesIO()
+    Image.new("RGB", (120, 80), (90, 90, 90)).save(out, format=format_name)
+
+    pages = list(ocr_service.iter_pages(f"scan.{extension}", engine="fake", content=out.getvalue()))
+
+    assert [(page.page_num, page.page_count, page.blocks.texts) for page in pages] == [(0, 1, ["level 90"])]
+
+
+@pytest.mark.parametrize("mode", ["1", "L", "P", "RGB", "CMYK"])
+def test_frames_of_every_mode_decode_to_bgr(mode):
+    image = Image.new("RGB", (30, 20), (255, 0, 0)).convert(mode)
+
+    frame = next(ocr_service_module.image_frames(image))
+
+    assert frame.shape == (20, 30, 3) and frame.dtype == np.uint8
+    if mode in ("RGB", "P", "CMYK"):
+        # Red comes last in BGR order
+        assert frame[0, 0].tolist()[2] > 200 and frame[0, 0].tolist()[0] < 50
+
+
+def test_exif_orientation_is_applied():
+    image = Image.new("RGB", (60, 20), (0, 0, 0))
+    exif = Image.Exif()
+    # Rotated 90 degrees clockwise by the camera
+    exif[0x0112] = 6
+    out = io.BytesIO()
+    image.save(out, format="JPEG", exif=exif)
+
+    frame = next(ocr_service_module.image_frames(Image.open(io.BytesIO(out.getvalue()))))
+
+    assert frame.shape == (60, 20, 3)
+
+
+def text_pdf(text: str) -> bytes:
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=200)
+    page.insert_textbox(fitz.Rect(10, 10, 390, 190), text, fontsize=10)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def test_document_language_comes_from_the_text_layer(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_LANGUAGES", ["en", "es", "fr"])
+    monkeypatch.setattr(settings, "OCR_DEFAULT_LANGUAGE", "en")
+    spanish = text_pdf("Factura numero 1042. Fecha de vencimiento 30 dias. Gracias por su pedido, importe con IVA.")
+
+    assert ocr_service.detect_document_language("invoice.pdf", content=spanish) == ("es", "text_layer")
+    assert ocr_service.detect_document_language("invoice.pdf", content=text_pdf("Total 12.00")) == ("en", "default")
+
+    monkeypatch.setattr(settings, "OCR_LANGUAGES", ["en"])
+    assert ocr_service.detect_document_language("invoice.pdf", content=spanish) == ("en", "default")
+
+
+def test_pages_are_read_with_the_engine_of_their_language(fake_engine, monkeypatch):
+    languages = []
+    monkeypatch.setattr(FakeEngine, "ocr", lambda self, image, cls=True: languages.append(self.lang) or [[]])
+
+    list(ocr_service.iter_pages("scan.tiff", engine="fake", lang="es", content=tiff([10, 20])))
+
+    assert languages == ["es", "es"]
+    assert ocr_engines.get_engine("fake", "es") is not ocr_engines.get_engine("fake", "en")
@@ -0,0 +1,106 @@
+# server/tests/test_orientation.py
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services.ocr_blocks import OcrBlocks
+from app.services.ocr_engines import OCREngine
+from app.services.orientation import PageOrienter
+
+
+class InkBalanceEngine(OCREngine):
+    """Calls a line upside down when the top half of its crop holds more ink than the bottom half."""
+
+    name = "ink_balance"
+    classifies_angles = True
+
+    def __init__(self, labels=None):
+        super().__init__()
+        self.labels = labels
+        self.crops = 0
+
+    def classify_angles(self, crops):
+        self.crops += len(crops)
+        if self.labels is not None:
+            return [(label, 0.9) for label, _ in zip(self.labels, crops)]
+        results = []
+        for crop in crops:
+            ink = crop.min(axis=2) < 128
+            half = ink.shape[0] // 2
+            results.append(("180" if ink[:half].sum() > ink[half:].sum() else "0", 0.9))
+        return results
+
+
+def upright_page() -> np.ndarray:
+    """Seven lines of strokes on a baseline bar, staggered so no column gap runs down the page."""
+    page = np.full((900, 700, 3), 255, dtype=np.uint8)
+    for i, top in enumerate(range(100, 800, 100)):
+        for left in range(80 + 3 * i, 600, 24):
+            page[top:top + 30, left:left + 14] = 20
+        # The baseline, which makes the bottom of an upright line heavier
+        page[top + 30:top + 40, 80:620] = 20
+    return page
+
+
+@pytest.fixture
+def orienter():
+    return PageOrienter(sample_lines=5, min_agreement=0.75)
+
+
+@pytest.mark.parametrize("turns", [0, 1, 2, 3])
+def test_pages_are_turned_upright(orienter, turns):
+    upright = upright_page()
+    image = np.ascontiguousarray(np.rot90(upright, turns))
+
+    turned, orientation = orienter.orient(image, InkBalanceEngine())
+
+    assert np.array_equal(turned, upright)
+    assert orientation.rotation == (-turns) % 4
+    assert not orientation.needs_line_cls
+    assert orientation.votes == 5
+    assert (orientation.height, orientation.width) == image.shape[:2]
+
+
+@pytest.mark.parametrize("turns", [1, 2, 3])
+def test_positions_map_back_to_the_page_as_rendered(orienter, turns):
+    image = np.ascontiguousarray(np.rot90(upright_page(), turns))
+    turned, orientation = orienter.orient(image, InkBalanceEngine())
+    # The first line's baseline in the upright image
+    box = [[80, 130], [620, 130], [620, 140], [80, 140]]
+
+    x0, y0, x1, y1 = orientation.unrotate(OcrBlocks.build(["line"], [box], [0.9], 1)).bounds()[0].astype(int)
+
+    assert np.array_equal(np.rot90(image[y0:y1, x0:x1], orientation.rotation), turned[130:140, 80:620])
+
+
+def test_an_inconclusive_vote_keeps_per_line_classification(orienter):
+    engine = InkBalanceEngine(labels=itertools.cycle(["0", "180"]))
+
+    turned, orientation = orienter.orient(upright_page(), engine)
+
+    assert orientation.needs_line_cls
+    assert orientation.rotation == 0
+    assert np.array_equal(turned, upright_page())
+
+
+def test_pages_without_enough_lines_are_not_voted_on(orienter):
+    engine = InkBalanceEngine()
+    blank = np.full((900, 700, 3), 255, dtype=np.uint8)
+
+    _, orientation = orienter.orient(blank, engine)
+
+    assert orientation.needs_line_cls
+    assert (orientation.votes, engine.crops) == (0, 0)
+
+
+def test_only_pages_oriented_by_the_vote_count_skipped_lines(orienter):
+    _, oriented = orienter.orient(upright_page(), InkBalanceEngine())
+    _, inconclusive = orienter.orient(upright_page(), InkBalanceEngine(labels=itertools.cycle(["0", "180"])))
+
+    orienter.record(oriented, line_count=40)
+    orienter.record(inconclusive, line_count=40)
+
+    stats = orienter.stats()
+    assert (stats["pages"], stats["line_cls_pages"], stats["lines_skipped"]) == (2, 1, 40)
+    assert stats["rotations"]["0"] == 2
@@ -0,0 +1,215 @@
+# server/tests/test_pipeline.py
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.queue import Queue
+from app.models.result import ProcessingResult
+from app.services.ocr_blocks import OcrBlocks
+from app.services.ocr_service import PageResult
+from app.services.pipeline import DocumentContext, DocumentPipeline, missing_required_fields
+
+BOX = [[10, 10], [90, 10], [90, 30], [10, 30]]
+
+
+class FakeOCR:
+    def __init__(self, page_count: int):
+        self.page_count = page_count
+        self.pages_read = 0
+
+    def iter_pages(self, file_path, engine=None, lang=None, content=None):
+        for page_num in range(self.page_count):
+            self.pages_read += 1
+            blocks = OcrBlocks.build([f"page {page_num + 1}"], [BOX], [0.9], page_num + 1)
+            yield PageResult(page_num=page_num, page_count=self.page_count, blocks=blocks, source="ocr")
+
+
+class FakeAI:
+    """Finds every required field once the document has `found_after` pages of blocks."""
+
+    def __init__(self, found_after: int = 0):
+        self.found_after = found_after
+        self.extracted_block_counts: List[int] = []
+
+    def extract_data(self, ocr_result, record=True):
+        self.extracted_block_counts.append(len(ocr_result))
+        found = self.found_after and len(ocr_result) >= self.found_after
+        fields = {field: "x" if found else None for field in settings.OCR_REQUIRED_FIELDS}
+        return {
+            "extracted_data": fields,
+            "field_confidence": {field: 1.0 for field in fields},
+            "confidence_score": 0.5,
+        }
+
+
+def run_ocr(db, page_count: int, ai: FakeAI):
+    item = Queue(document_id=1, status="processing", priority=1, language="en")
+    db.add(item)
+    db.commit()
+    ocr = FakeOCR(page_count)
+    context = DocumentContext(
+        document_id=1, queue_id=item.id, queue_item=item, document=SimpleNamespace(file_path="invoice.pdf"),
+    )
+    DocumentPipeline(ocr, ai).ocr(db, context)
+    db.refresh(item)
+    return context, item, ocr
+
+
+@pytest.fixture
+def progress_settings(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ROI_ENABLED", False)
+    monkeypatch.setattr(settings, "OCR_EARLY_STOP_ENABLED", False)
+    monkeypatch.setattr(settings, "OCR_PROGRESS_EXTRACT_PAGES", 5)
+    monkeypatch.setattr(settings, "OCR_PROGRESS_EXTRACT_SECONDS", 3600.0)
+
+
+def test_partial_fields_are_extracted_every_few_pages(db, progress_settings):
+    ai = FakeAI()
+    context, item, _ = run_ocr(db, 20, ai)
+
+    # After pages 1, 6, 11 and 16; the extract stage follows the last page
+    assert ai.extracted_block_counts == [1, 6, 11, 16]
+    assert len(context.blocks) == 20
+    assert context.blocks.texts[-1] == "page 20"
+    assert (item.pages_processed, item.pages_total) == (20, 20)
+    assert item.partial_result["confidence_score"] == 0.5
+
+
+def test_early_stop_extracts_after_every_page(db, progress_settings, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_EARLY_STOP_ENABLED", True)
+    monkeypatch.setattr(settings, "OCR_LINE_ITEMS_REQUIRED", False)
+    ai = FakeAI(found_after=3)
+    context, item, ocr = run_ocr(db, 20, ai)
+
+    assert ai.extracted_block_counts == [1, 2, 3]
+    assert context.ocr_mode == "early_stop"
+    assert context.skipped_pages == list(range(4, 21))
+    assert len(context.blocks) == 3
+    assert item.pages_processed == ocr.pages_read == 3
+
+
+class FakeRoiOCR(FakeOCR):
+    """Reads `roi_block_count` blocks from the header and footer of page one."""
+
+    def __init__(self, page_count: int, roi_block_count: int):
+        super().__init__(page_count)
+        self.roi_block_count = roi_block_count
+
+    def ocr_regions(self, file_path, engine=None, lang=None, content=None):
+        texts = [f"band {i + 1}" for i in range(self.roi_block_count)]
+        blocks = OcrBlocks.build(texts, [BOX] * len(texts), [0.9] * len(texts), 1)
+        return PageResult(page_num=0, page_count=self.page_count, blocks=blocks, source="roi")
+
+
+def run_roi(db, ocr: FakeRoiOCR, ai: FakeAI):
+    item = Queue(document_id=1, status="processing", priority=1, language="en")
+    db.add(item)
+    db.commit()
+    context = DocumentContext(
+        document_id=1, queue_id=item.id, queue_item=item, document=SimpleNamespace(file_path="invoice.pdf"),
+    )
+    DocumentPipeline(ocr, ai).ocr(db, context)
+    return context
+
+
+def test_region_pass_skips_the_full_ocr_when_it_finds_every_field(db, progress_settings, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ROI_ENABLED", True)
+    ocr = FakeRoiOCR(10, roi_block_count=2)
+    ai = FakeAI(found_after=2)
+    context = run_roi(db, ocr, ai)
+
+    assert ocr.pages_read == 0
+    assert context.ocr_mode == "roi"
+    assert context.skipped_pages == list(range(2, 11))
+    assert context.blocks.texts == ["band 1", "band 2"]
+    assert ai.extracted_block_counts == [2]
+
+
+def test_region_pass_falls_back_to_full_ocr_when_fields_are_missing(db, progress_settings, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ROI_ENABLED", True)
+    ocr = FakeRoiOCR(3, roi_block_count=1)
+    ai = FakeAI(found_after=2)
+    context = run_roi(db, ocr, ai)
+
+    assert ocr.pages_read == 3
+    assert context.ocr_mode == "full"
+    assert context.skipped_pages == []
+    # The band blocks are not mixed into the full pages
+    assert context.blocks.texts == ["page 1", "page 2", "page 3"]
+
+
+def test_required_line_items_keep_every_page(db, progress_settings, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_EARLY_STOP_ENABLED", True)
+    monkeypatch.setattr(settings, "OCR_LINE_ITEMS_REQUIRED", True)
+    context, item, ocr = run_ocr(db, 8, FakeAI(found_after=1))
+
+    assert ocr.pages_read == 8
+    assert context.ocr_mode == "full"
+    assert context.skipped_pages == []
+
+
+def test_fields_found_with_low_confidence_count_as_missing(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_REQUIRED_FIELDS", ["invoice_number", "total_amount"])
+    monkeypatch.setattr(settings, "OCR_REQUIRED_FIELD_MIN_CONFIDENCE", 0.8)
+    result = {
+        "extracted_data": {"invoice_number": "INV-1", "total_amount": 12.5},
+        "field_confidence": {"invoice_number": 0.95, "total_amount": 0.6},
+    }
+
+    assert missing_required_fields(result) == ["total_amount"]
+    assert missing_required_fields({}) == ["invoice_number", "total_amount"]
+
+
+class RecordingOCR(FakeOCR):
+    """Remembers the bytes it was given instead of a file to open."""
+
+    def __init__(self, page_count: int):
+        super().__init__(page_count)
+        self.contents = []
+
+    def iter_pages(self, file_path, engine=None, lang=None, content=None):
+        self.contents.append(content)
+        return super().iter_pages(file_path, engine=engine, lang=lang, content=content)
+
+
+class ExtractingAI(FakeAI):
+    def __init__(self):
+        super().__init__()
+        self.documents = []
+
+    def process_document(self, ocr_result, file_path=None):
+        self.documents.append(ocr_result)
+        return {
+            "extracted_data": {"invoice_number": "INV-7", "vendor_name": "ACME", "total_amount": 120.0},
+            "confidence_score": 0.9,
+        }
+
+
+def test_a_document_is_read_once_and_ocred_once(db, progress_settings, tmp_path):
+    file_path = tmp_path / "invoice.pdf"
+    file_path.write_bytes(b"%PDF- three pages")
+    document = Document(filename="invoice.pdf", content_type="application/pdf", file_path=str(file_path))
+    db.add(document)
+    db.commit()
+    item = Queue(document_id=document.id, status="processing", priority=1, language="en")
+    db.add(item)
+    db.commit()
+    ocr, ai = RecordingOCR(3), ExtractingAI()
+
+    context = DocumentPipeline(ocr, ai).run(db, DocumentContext(document_id=document.id, queue_id=item.id))
+
+    assert ocr.contents == [b"%PDF- three pages"]
+    assert ocr.pages_read == 3
+    # Extraction runs on the blocks of the OCR stage, not on the file
+    assert ai.documents == [context.blocks]
+    assert context.blocks.texts == ["page 1", "page 2", "page 3"]
+
+    result = db.query(ProcessingResult).one()
+    assert (result.invoice_number, result.vendor_name, result.status) == ("INV-7", "ACME", "pending_validation")
+    assert result.raw_extraction_data["ocr_mode"] == "full"
+    assert len(result.raw_extraction_data["ocr_result"]) == 3
+    assert db.get(Queue, item.id).status == "completed"
+    assert db.get(Document, document.id).status == "processed"
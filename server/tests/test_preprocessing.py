@@ -0,0 +1,124 @@
+# server/tests/test_preprocessing.py
+import cv2
+import numpy as np
+import pytest
+
+from app.services.ocr_blocks import OcrBlocks
+from app.services.preprocessing import (
+    ImagePreprocessor,
+    _adaptive_threshold,
+    _area_resize,
+    _to_gray,
+    text_line_runs,
+)
+
+LINE_TOPS = [140, 240, 340, 440, 540, 640, 740]
+LINE_HEIGHT = 40
+
+
+def scanned_page() -> np.ndarray:
+    """A white BGR page inside a dark scanner border, with seven 40 pixel text lines."""
+    page = np.full((1000, 800, 3), 255, dtype=np.uint8)
+    page[:20] = page[-20:] = 0
+    page[:, :15] = page[:, -15:] = 0
+    for top in LINE_TOPS:
+        # Letter-like strokes rather than solid bars
+        for left in range(120, 620, 24):
+            page[top:top + LINE_HEIGHT, left:left + 14] = 30
+    return page
+
+
+def preprocessor(**options) -> ImagePreprocessor:
+    defaults = dict(
+        grayscale=True, crop_borders=True, target_text_height=32,
+        binarize=False, binarize_window=31, binarize_offset=10,
+    )
+    return ImagePreprocessor(**{**defaults, **options})
+
+
+def test_grayscale_matches_the_float_luma():
+    image = np.random.default_rng(0).integers(0, 256, (64, 48, 3), dtype=np.uint8)
+
+    expected = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(int)
+
+    assert np.abs(_to_gray(image).astype(int) - expected).max() <= 1
+
+
+@pytest.mark.parametrize("channels", [1, 3])
+def test_area_resize_averages_each_source_block(channels):
+    shape = (60, 90, channels) if channels == 3 else (60, 90)
+    image = np.random.default_rng(1).integers(0, 256, shape, dtype=np.uint8)
+
+    resized = _area_resize(image, 30, 45)
+    expected = cv2.resize(image, (45, 30), interpolation=cv2.INTER_AREA)
+
+    assert resized.shape == expected.shape
+    assert np.abs(resized.astype(int) - expected.astype(int)).max() <= 1
+
+
+def test_adaptive_threshold_matches_a_brute_force_window_mean():
+    gray = np.random.default_rng(2).integers(0, 256, (23, 31), dtype=np.uint8)
+    window, offset = 7, 5
+
+    expected = np.empty_like(gray)
+    half = window // 2
+    for y in range(gray.shape[0]):
+        for x in range(gray.shape[1]):
+            neighbourhood = gray[max(y - half, 0):y + half + 1, max(x - half, 0):x + half + 1]
+            expected[y, x] = 0 if gray[y, x] < neighbourhood.mean() - offset else 255
+
+    assert np.array_equal(_adaptive_threshold(gray, window, offset), expected)
+
+
+def test_text_lines_are_found_and_table_rules_ignored():
+    ink = scanned_page()[20:-20, 15:-15, 0] < 128
+    # A full-height table rule
+    ink[:, 700] = True
+
+    starts, ends = text_line_runs(ink)
+
+    assert (starts + 20).tolist() == LINE_TOPS
+    assert (ends - starts).tolist() == [LINE_HEIGHT] * len(LINE_TOPS)
+
+
+def test_borders_are_cropped_and_large_text_downscaled():
+    result = preprocessor().process(scanned_page())
+
+    scale, dx, dy = result.coordinate_map
+    assert scale == pytest.approx(0.8)
+    assert dx > 15 and dy > 20
+    assert result.image.ndim == 3 and result.image.shape[2] == 3
+    assert result.image.shape[0] < 0.8 * 1000 and result.image.shape[1] < 0.8 * 800
+    assert set(result.timings) == {"grayscale", "crop", "resize"}
+
+
+def test_positions_map_back_to_the_original_page():
+    result = preprocessor().process(scanned_page())
+    ink_rows = np.flatnonzero((result.image[:, :, 0] < 128).any(axis=1))
+    first_top = int(ink_rows[0])
+    box = [[0, first_top], [10, first_top], [10, first_top + 5], [0, first_top + 5]]
+
+    mapped = result.coordinate_map.apply(OcrBlocks.build(["line"], [box], [0.9], 1))
+
+    assert abs(mapped.positions[0, 0, 1] - LINE_TOPS[0]) <= 2
+
+
+def test_small_text_is_never_upscaled():
+    page = scanned_page()
+    result = preprocessor(target_text_height=100).process(page)
+
+    assert result.coordinate_map.scale == 1.0
+
+
+def test_blank_pages_are_left_whole():
+    page = np.full((200, 100, 3), 255, dtype=np.uint8)
+    result = preprocessor(binarize=True).process(page)
+
+    assert result.coordinate_map == (1.0, 0.0, 0.0)
+    assert result.image.shape == (200, 100, 3)
+
+
+def test_signature_changes_with_the_options():
+    assert preprocessor().signature != preprocessor(binarize=True).signature
+    assert preprocessor().signature != preprocessor(target_text_height=24).signature
+    assert preprocessor().signature == preprocessor().signature
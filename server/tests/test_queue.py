@@ -0,0 +1,37 @@
+# server/tests/test_queue.py
+from datetime import datetime, timedelta
+
+from app import crud
+from app.models.queue import Queue
+
+
+def add_item(db, status: str, started_minutes_ago=None) -> int:
+    item = Queue(document_id=1, status=status, priority=1)
+    if started_minutes_ago is not None:
+        item.process_start_time = datetime.now() - timedelta(minutes=started_minutes_ago)
+    db.add(item)
+    db.commit()
+    return item.id
+
+
+def test_requeue_stale_queues_only_old_processing_items(db):
+    stale = add_item(db, "processing", started_minutes_ago=90)
+    running_here = add_item(db, "processing", started_minutes_ago=90)
+    recent = add_item(db, "processing", started_minutes_ago=5)
+    completed = add_item(db, "completed", started_minutes_ago=90)
+
+    requeued = crud.queue.requeue_stale(
+        db, started_before=datetime.now() - timedelta(hours=1), exclude=[running_here]
+    )
+
+    assert requeued == [stale]
+    statuses = {item.id: item.status for item in db.query(Queue)}
+    assert statuses == {stale: "queued", running_here: "processing", recent: "processing", completed: "completed"}
+
+
+def test_requeued_items_are_claimed_again(db):
+    stale = add_item(db, "processing", started_minutes_ago=90)
+    crud.queue.requeue_stale(db, started_before=datetime.now() - timedelta(hours=1))
+
+    assert crud.queue.claim_batch(db, limit=4) == [(stale, 1)]
+    assert crud.queue.claim_batch(db, limit=4) == []
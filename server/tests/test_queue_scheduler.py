@@ -0,0 +1,133 @@
+# server/tests/test_queue_scheduler.py
+from datetime import datetime, timedelta
+
+from app import crud
+from app.models.queue import Queue
+from app.services.queue_scheduler import FairShareScheduler
+
+SLOT = 10.0
+AGING = 600.0
+START = 1_700_000_000.0
+
+
+def enqueue(db, scheduler, owner_id, at: float, priority: int = 1) -> int:
+    item = Queue(document_id=1, status="pending", priority=priority)
+    db.add(item)
+    db.commit()
+    scheduler.enqueue(db, queue_id=item.id, owner_id=owner_id, now=START + at)
+    return item.id
+
+
+def claim_all(db):
+    return [queue_id for queue_id, _ in crud.queue.claim_batch(db, limit=1000)]
+
+
+def test_a_burst_from_one_owner_does_not_hold_up_the_others(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    burst = [enqueue(db, scheduler, owner_id=1, at=0) for _ in range(50)]
+    other = enqueue(db, scheduler, owner_id=2, at=5)
+
+    order = claim_all(db)
+
+    # The burst's items are a slot apart, so the other owner goes ahead of all but the first
+    assert order.index(other) == 1
+    assert [queue_id for queue_id in order if queue_id != other] == burst
+
+
+def test_owners_take_turns(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    first = [enqueue(db, scheduler, owner_id=1, at=0) for _ in range(3)]
+    second = [enqueue(db, scheduler, owner_id=2, at=1) for _ in range(3)]
+
+    assert claim_all(db) == [first[0], second[0], first[1], second[1], first[2], second[2]]
+
+
+def test_weighted_owners_get_more_turns(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {1: 2.0})
+    heavy = [enqueue(db, scheduler, owner_id=1, at=0) for _ in range(4)]
+    light = [enqueue(db, scheduler, owner_id=2, at=0) for _ in range(2)]
+
+    # Turns at 0, 5, 10, 15 against 0 and 10
+    assert claim_all(db) == [heavy[0], light[0], heavy[1], heavy[2], light[1], heavy[3]]
+
+
+def test_higher_priority_goes_first_among_documents_queued_together(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    low = enqueue(db, scheduler, owner_id=1, at=0, priority=1)
+    high = enqueue(db, scheduler, owner_id=2, at=0, priority=5)
+
+    assert claim_all(db) == [high, low]
+
+
+def test_waiting_documents_age_past_newer_high_priority_work(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    low = enqueue(db, scheduler, owner_id=1, at=0, priority=1)
+    # One priority level ahead, but queued more than two aging intervals later
+    newer = enqueue(db, scheduler, owner_id=2, at=2 * AGING + 1, priority=2)
+    # Four levels ahead, so still first
+    urgent = enqueue(db, scheduler, owner_id=3, at=2 * AGING + 1, priority=5)
+
+    assert claim_all(db) == [urgent, low, newer]
+
+
+def test_a_steady_stream_of_high_priority_work_does_not_starve_low_priority(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    low = enqueue(db, scheduler, owner_id=1, at=0, priority=1)
+
+    # A priority 5 document every minute, claimed as fast as it comes
+    claimed_at = None
+    for minute in range(100):
+        enqueue(db, scheduler, owner_id=2, at=minute * 60, priority=5)
+        if crud.queue.claim_batch(db, limit=1)[0][0] == low:
+            claimed_at = minute * 60
+            break
+
+    assert claimed_at is not None
+    assert claimed_at <= 5 * AGING + 60
+
+
+def test_an_idle_owner_starts_at_the_front(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    backlog = [enqueue(db, scheduler, owner_id=1, at=0) for _ in range(5)]
+    # The workers are behind: the first queued turn is past
+    late = enqueue(db, scheduler, owner_id=2, at=AGING / 2)
+
+    assert claim_all(db)[:2] == [backlog[0], late]
+
+
+def test_an_idle_owner_starts_at_most_one_aging_interval_back(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    backlog = [enqueue(db, scheduler, owner_id=1, at=0) for _ in range(5)]
+    # Turn 25 rather than 0: behind the backlog's turns 0 to 20, which have waited an interval longer
+    late = enqueue(db, scheduler, owner_id=2, at=AGING + 25)
+
+    assert claim_all(db) == backlog[:3] + [late] + backlog[3:]
+
+
+def test_without_slots_documents_are_claimed_in_queue_order(db):
+    scheduler = FairShareScheduler(0, AGING, {})
+    first = [enqueue(db, scheduler, owner_id=1, at=i) for i in range(3)]
+    other = enqueue(db, scheduler, owner_id=2, at=3)
+
+    assert claim_all(db) == first + [other]
+
+
+def test_wait_stats_per_owner(db):
+    scheduler = FairShareScheduler(SLOT, AGING, {})
+    claimed = [enqueue(db, scheduler, owner_id=1, at=0) for _ in range(2)]
+    waiting = enqueue(db, scheduler, owner_id=2, at=0)
+    for queue_id, wait in zip(claimed, (30, 90)):
+        item = db.get(Queue, queue_id)
+        item.status = "processing"
+        item.process_start_time = item.queued_time + timedelta(seconds=wait)
+    db.get(Queue, waiting).queued_time = datetime.now() - timedelta(seconds=120)
+    db.commit()
+
+    stats = scheduler.wait_stats(db)
+
+    assert stats["owners"][1]["claimed"] == 2
+    assert stats["owners"][1]["mean_wait"] == 60.0
+    assert stats["owners"][1]["max_wait"] == 90.0
+    assert stats["owners"][2]["queued"] == 1
+    assert 119 <= stats["owners"][2]["oldest_queued_wait"] <= 130
+    assert stats["overall"]["claimed"] == 2
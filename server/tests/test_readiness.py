@@ -0,0 +1,44 @@
+# server/tests/test_readiness.py
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services import ocr_engines
+from app.services.ocr_engines import get_engine
+
+
+def test_importing_the_app_loads_no_ocr_models():
+    code = (
+        "import sys, app.main\n"
+        "from app.services.ocr_service import ocr_service\n"
+        "assert not any(name.split('.')[0] in ('paddle', 'paddleocr') for name in sys.modules), 'Paddle imported'\n"
+        "assert not ocr_service.is_loaded\n"
+    )
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=server_dir, env=dict(os.environ, OCR_ENGINE="paddle"), check=True)
+
+
+def test_ready_reports_warming_up_until_the_models_are_warm(monkeypatch):
+    from app.main import app
+    from app.services.ocr_service import ocr_service
+
+    monkeypatch.setattr(ocr_engines, "_engines", type(ocr_engines._engines)())
+    monkeypatch.setattr(settings, "OCR_ENGINE", "stub")
+    client = TestClient(app)
+
+    monkeypatch.setattr(settings, "OCR_WARMUP_ON_STARTUP", False)
+    assert client.get("/ready").status_code == 200
+
+    monkeypatch.setattr(settings, "OCR_WARMUP_ON_STARTUP", True)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"
+
+    assert ocr_service.warm_up()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "ocr_models_loaded": True, "ocr_models_warm": True}
+    assert get_engine("stub").is_warm
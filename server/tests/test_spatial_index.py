@@ -0,0 +1,106 @@
+# server/tests/test_spatial_index.py
+import random
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from app.services.ocr_blocks import OcrBlocks
+from app.services.spatial_index import SpatialIndex
+
+
+def random_blocks(seed: int, count: int, pages=(1, 2)) -> OcrBlocks:
+    """
+    Blocks of random sizes per page: some on shared text lines, some
+    overlapping, some as wide as the page, and some with equal tops.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for page in pages:
+        boxes = []
+        for _ in range(count):
+            x = rng.choice([rng.uniform(0, 600), 10.0 * rng.randint(0, 60)])
+            y = rng.choice([rng.uniform(0, 800), 20.0 * rng.randint(0, 40)])
+            width = rng.choice([rng.uniform(5, 200), 600.0])
+            height = rng.choice([10.0, 12.0, rng.uniform(4, 40)])
+            boxes.append([[x, y], [x + width, y], [x + width, y + height], [x, y + height]])
+        parts.append(OcrBlocks.build(["text"] * count, boxes, [0.9] * count, page))
+    return OcrBlocks.concat(parts)
+
+
+def nearest(bounds: np.ndarray, pages, index: int, accept, axis: int, start: float,
+            max_distance: Optional[float]) -> Optional[int]:
+    """The accepted block of the same page whose near edge is closest to `start`, ties to the lower index."""
+    best, best_gap = None, float("inf")
+    for candidate, box in enumerate(bounds.tolist()):
+        if candidate == index or pages[candidate] != pages[index] or not accept(box):
+            continue
+        if box[axis] - start < best_gap:
+            best, best_gap = candidate, box[axis] - start
+    if best is not None and max_distance is not None and best_gap > max_distance:
+        return None
+    return best
+
+
+def brute_right_of(bounds, pages, index, max_distance=None):
+    x0, y0, x1, y1 = bounds[index].tolist()
+    start = x1 - (y1 - y0) / 4
+    return nearest(bounds, pages, index, lambda box: box[0] >= start and y0 <= (box[1] + box[3]) / 2 <= y1,
+                   0, start, max_distance)
+
+
+def brute_below(bounds, pages, index, max_distance=None):
+    x0, y0, x1, y1 = bounds[index].tolist()
+    start = y1 - (y1 - y0) / 4
+    return nearest(bounds, pages, index, lambda box: box[1] >= start and box[0] <= x1 and box[2] >= x0,
+                   1, start, max_distance)
+
+
+# The median based default, cells smaller than most blocks (capped by MAX_CELLS), and a few large cells
+CELL_SIZES = [None, 0.5, 5.0, 300.0]
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+@pytest.mark.parametrize("max_distance", [None, 0.0, 40.0])
+def test_directional_lookups_match_brute_force(cell_size, max_distance):
+    blocks = random_blocks(CELL_SIZES.index(cell_size), 120)
+    index = SpatialIndex(blocks, cell_size=cell_size)
+    pages = blocks.pages.tolist()
+    for block in range(len(blocks)):
+        assert index.right_of(block, max_distance) == brute_right_of(index.bounds, pages, block, max_distance)
+        assert index.below(block, max_distance) == brute_below(index.bounds, pages, block, max_distance)
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_region_queries_match_brute_force(cell_size):
+    rng = random.Random(3)
+    blocks = random_blocks(3, 150, pages=(0, 1, 3))
+    index = SpatialIndex(blocks, cell_size=cell_size)
+    bounds, pages = index.bounds, blocks.pages
+    for _ in range(150):
+        x0, y0 = rng.uniform(-50, 700), rng.uniform(-50, 900)
+        x1, y1 = x0 + rng.choice([0.0, rng.uniform(0, 300)]), y0 + rng.uniform(0, 300)
+        hit = (bounds[:, 0] <= x1) & (bounds[:, 2] >= x0) & (bounds[:, 1] <= y1) & (bounds[:, 3] >= y0)
+        for page in (None, 0, 1, 2, 3):
+            expected = np.flatnonzero(hit if page is None else hit & (pages == page))
+            assert index.query(x0, y0, x1, y1, page=page).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_topmost_matches_a_stable_sort_by_top(cell_size):
+    blocks = random_blocks(4, 150)
+    index = SpatialIndex(blocks, cell_size=cell_size)
+    tops = index.bounds[:, 1]
+    for page in (1, 2):
+        on_page = np.flatnonzero(blocks.pages == page)
+        expected = on_page[np.argsort(tops[on_page], kind="stable")]
+        for count in (1, 5, 50, 500):
+            assert index.topmost(count, page=page).tolist() == expected[:count].tolist()
+    assert index.topmost(3).tolist() == index.topmost(3, page=1).tolist()
+
+
+def test_empty_index():
+    index = SpatialIndex(OcrBlocks.empty())
+    assert len(index) == 0
+    assert len(index.query(0, 0, 100, 100)) == 0
+    assert len(index.topmost(3)) == 0
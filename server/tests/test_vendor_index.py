@@ -0,0 +1,41 @@
+# server/tests/test_vendor_index.py
+from app.models.result import ProcessingResult
+from app.services.ocr_blocks import OcrBlocks
+from app.services.vendor_index import VendorIndex
+
+
+def add_result(db, invoice_number: str) -> ProcessingResult:
+    cells = [
+        ("ACME SUPPLY COMPANY", 40, 20), ("Industrial Parts and Tools", 40, 34),
+        (f"Invoice # {invoice_number}", 300, 20), ("Total: $120.00", 300, 400),
+    ]
+    boxes = [[[x, y], [x + 6.0 * len(text), y], [x + 6.0 * len(text), y + 10], [x, y + 10]] for text, x, y in cells]
+    blocks = OcrBlocks.build([text for text, _, _ in cells], boxes, [0.95] * len(cells), 1)
+    result = ProcessingResult(
+        document_id=1, vendor_name="Acme Supply", invoice_number=invoice_number, total_amount=120.0,
+        status="validated", raw_extraction_data={"ocr_result": blocks.to_dicts()},
+    )
+    db.add(result)
+    db.commit()
+    return result
+
+
+def test_a_result_validated_again_is_not_merged_twice(db):
+    index = VendorIndex(match_threshold=0.5)
+    first, second = add_result(db, "A1001"), add_result(db, "A1002")
+
+    for result in (first, second, first, second):
+        template = index.learn(db, result)
+
+    assert template.sample_count == 2
+    assert template.result_ids == [first.id, second.id]
+    assert index.stats()["samples_learned"] == 2
+
+
+def test_validating_the_same_result_again_counts_nothing(db):
+    index = VendorIndex(match_threshold=0.5)
+    result = add_result(db, "A1001")
+
+    assert index.learn(db, result).sample_count == 1
+    assert index.learn(db, result).sample_count == 1
+    assert index.stats()["samples_learned"] == 1